@@ -0,0 +1,183 @@
+"""Cost-based admission control for generated SQL.
+
+Before a query runs, ``EXPLAIN (FORMAT JSON)`` gives the planner's
+estimated total cost and row counts. ``CostGate`` compares them with
+configured limits: cheap queries run right away, expensive ones wait
+for one of a few "heavy" slots, and pathological ones (a cross join, an
+unbounded scan over hourly snapshots) are rejected without ever
+touching a Postgres core.
+
+Estimated cost is also tracked against measured execution time, so the
+limits can be tuned in milliseconds rather than planner units.
+"""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any
+
+
+class AdmissionBusyError(RuntimeError):
+    """Raised when a queued query finds no free heavy slot in time."""
+
+
+@dataclass(frozen=True)
+class PlanEstimate:
+    """Planner estimates for one query."""
+
+    total_cost: float
+    rows: float  # Rows returned by the top plan node
+    max_rows: float  # Largest row estimate of any plan node
+
+
+class Verdict(Enum):
+    """Outcome of an admission check."""
+
+    ADMIT = "admit"
+    QUEUE = "queue"
+    REJECT_COST = "reject_cost"
+    REJECT_ROWS = "reject_rows"
+
+
+@dataclass(frozen=True)
+class AdmissionStats:
+    """Snapshot of admission counters."""
+
+    checked: int
+    admitted: int
+    queued: int
+    waiting: int
+    rejected_cost: int
+    rejected_rows: int
+    rejected_busy: int
+    executed: int
+    mean_estimated_cost: float
+    mean_elapsed_ms: float
+    ms_per_cost_unit: float  # Measured time per planner cost unit
+    max_estimated_cost: float
+
+
+def parse_plan(explain: Any) -> PlanEstimate:
+    """Read the estimates from ``EXPLAIN (FORMAT JSON)`` output.
+
+    Args:
+        explain: The single value EXPLAIN returns, as JSON text or decoded
+
+    Returns:
+        PlanEstimate: Total cost and row estimates
+
+    Example:
+        >>> parse_plan('[{"Plan": {"Total Cost": 12.5, "Plan Rows": 1, '
+        ...            '"Plans": [{"Total Cost": 10.0, "Plan Rows": 400}]}}]')
+        PlanEstimate(total_cost=12.5, rows=1.0, max_rows=400.0)
+    """
+    document = json.loads(explain) if isinstance(explain, (str, bytes)) else explain
+    root = document[0]["Plan"]
+    max_rows = 0.0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        max_rows = max(max_rows, float(node.get("Plan Rows", 0)))
+        stack.extend(node.get("Plans", ()))
+    return PlanEstimate(
+        total_cost=float(root["Total Cost"]),
+        rows=float(root.get("Plan Rows", 0)),
+        max_rows=max_rows,
+    )
+
+
+class CostGate:
+    """Decide whether, and when, a query may run.
+
+    Queries above ``soft_cost`` share ``heavy_slots`` concurrent slots;
+    queries above ``hard_cost`` or with any plan node above ``hard_rows``
+    are rejected.
+    """
+
+    def __init__(
+        self, soft_cost: float, hard_cost: float, hard_rows: float, heavy_slots: int
+    ) -> None:
+        if soft_cost > hard_cost:
+            raise ValueError("soft_cost must not exceed hard_cost")
+        self._soft_cost = soft_cost
+        self._hard_cost = hard_cost
+        self._hard_rows = hard_rows
+        self._heavy = asyncio.Semaphore(heavy_slots)
+        self._checked = 0
+        self._admitted = 0
+        self._queued = 0
+        self._waiting = 0
+        self._rejected_cost = 0
+        self._rejected_rows = 0
+        self._rejected_busy = 0
+        self._executed = 0
+        self._cost_sum = 0.0
+        self._elapsed_sum = 0.0
+        self._max_cost = 0.0
+
+    def check(self, estimate: PlanEstimate) -> Verdict:
+        """Classify a plan against the limits and count the outcome."""
+        self._checked += 1
+        if estimate.total_cost > self._hard_cost:
+            self._rejected_cost += 1
+            return Verdict.REJECT_COST
+        if estimate.max_rows > self._hard_rows:
+            self._rejected_rows += 1
+            return Verdict.REJECT_ROWS
+        if estimate.total_cost > self._soft_cost:
+            self._queued += 1
+            return Verdict.QUEUE
+        self._admitted += 1
+        return Verdict.ADMIT
+
+    @asynccontextmanager
+    async def slot(self, verdict: Verdict, timeout: float) -> AsyncIterator[None]:
+        """Hold a heavy slot for queued queries; admitted ones pass through.
+
+        Raises:
+            AdmissionBusyError: If no heavy slot frees up within ``timeout``
+        """
+        if verdict is not Verdict.QUEUE:
+            yield
+            return
+        self._waiting += 1
+        try:
+            async with asyncio.timeout(timeout):
+                await self._heavy.acquire()
+        except TimeoutError as exc:
+            self._rejected_busy += 1
+            raise AdmissionBusyError(f"no heavy query slot within {timeout}s") from exc
+        finally:
+            self._waiting -= 1
+        try:
+            yield
+        finally:
+            self._heavy.release()
+
+    def record(self, estimate: PlanEstimate, elapsed_ms: float) -> None:
+        """Record the measured time of an executed query next to its estimate."""
+        self._executed += 1
+        self._cost_sum += estimate.total_cost
+        self._elapsed_sum += elapsed_ms
+        self._max_cost = max(self._max_cost, estimate.total_cost)
+
+    def stats(self) -> AdmissionStats:
+        """Return admission counters."""
+        executed = self._executed
+        return AdmissionStats(
+            checked=self._checked,
+            admitted=self._admitted,
+            queued=self._queued,
+            waiting=self._waiting,
+            rejected_cost=self._rejected_cost,
+            rejected_rows=self._rejected_rows,
+            rejected_busy=self._rejected_busy,
+            executed=executed,
+            mean_estimated_cost=self._cost_sum / executed if executed else 0.0,
+            mean_elapsed_ms=self._elapsed_sum / executed if executed else 0.0,
+            ms_per_cost_unit=self._elapsed_sum / self._cost_sum if self._cost_sum else 0.0,
+            max_estimated_cost=self._max_cost,
+        )
@@ -0,0 +1,119 @@
+"""Bounded in-process caches.
+
+Provides a small LRU cache with optional per-entry TTL that the
+request path uses to skip repeated LLM and database round trips.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Snapshot of cache counters."""
+
+    size: int
+    weight: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    hit_rate: float
+
+
+class LruCache(Generic[K, V]):
+    """Least-recently-used cache with an optional time-to-live.
+
+    Entries are evicted in LRU order once ``max_entries`` is exceeded,
+    or once the summed ``weigher`` result exceeds ``max_weight`` (used to
+    bound memory by approximate byte size). When ``ttl_seconds`` is set,
+    entries older than the TTL are treated as missing and dropped on access.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        max_weight: int | None = None,
+        weigher: Callable[[K, V], int] | None = None,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if (max_weight is None) != (weigher is None):
+            raise ValueError("max_weight and weigher must be given together")
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._max_weight = max_weight
+        self._weigher = weigher
+        self._weight = 0
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        """Return the cached value for ``key`` or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        stored_at, value = entry
+        if self._ttl is not None and self._clock() - stored_at >= self._ttl:
+            self._remove(key)
+            self._expirations += 1
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        """Store ``value`` under ``key``, evicting LRU entries if full."""
+        if key in self._entries:
+            self._remove(key)
+        if self._weigher is not None:
+            weight = self._weigher(key, value)
+            if self._max_weight is not None and weight > self._max_weight:
+                return  # Never cache a single entry larger than the whole budget
+            self._weight += weight
+        self._entries[key] = (self._clock(), value)
+        while len(self._entries) > self._max_entries or (
+            self._max_weight is not None and self._weight > self._max_weight
+        ):
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries, keeping the counters."""
+        self._entries.clear()
+        self._weight = 0
+
+    def _remove(self, key: K) -> None:
+        _, value = self._entries.pop(key)
+        if self._weigher is not None:
+            self._weight -= self._weigher(key, value)
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the cache counters."""
+        lookups = self._hits + self._misses
+        return CacheStats(
+            size=len(self._entries),
+            weight=self._weight,
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            expirations=self._expirations,
+            hit_rate=self._hits / lookups if lookups else 0.0,
+        )
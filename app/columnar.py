@@ -0,0 +1,267 @@
+"""In-process columnar copy of the analytics tables.
+
+With COLUMNAR_ENGINE enabled, ``videos`` and ``video_snapshots`` are
+copied into an embedded DuckDB database, which stores them as typed,
+compressed columns and scans tens of millions of rows in milliseconds.
+Validated queries are transpiled from the Postgres dialect with sqlglot
+and answered locally, without a network round trip.
+
+The copy is tagged with the data generation it was taken at. When the
+loader bumps the generation, the next query starts a background refresh
+and falls back to Postgres until the new copy is in place, so a local
+answer is never older than the generation it is cached under. Queries
+DuckDB cannot run (other tables, unsupported functions) also fall back.
+
+DuckDB is an optional dependency: ``pip install analytics-bot[columnar]``.
+"""
+
+import asyncio
+import contextlib
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from app.db import get_engine
+
+# Column types of the local copy; DuckDB compresses each column by type
+TABLES: dict[str, tuple[tuple[str, str], ...]] = {
+    "videos": (
+        ("id", "VARCHAR"),
+        ("creator_id", "VARCHAR"),
+        ("video_created_at", "TIMESTAMPTZ"),
+        ("views_count", "BIGINT"),
+        ("likes_count", "BIGINT"),
+        ("comments_count", "BIGINT"),
+        ("reports_count", "BIGINT"),
+        ("created_at", "TIMESTAMPTZ"),
+        ("updated_at", "TIMESTAMPTZ"),
+    ),
+    "video_snapshots": (
+        ("id", "VARCHAR"),
+        ("video_id", "VARCHAR"),
+        ("created_at", "TIMESTAMPTZ"),
+        ("updated_at", "TIMESTAMPTZ"),
+        ("views_count", "BIGINT"),
+        ("likes_count", "BIGINT"),
+        ("comments_count", "BIGINT"),
+        ("reports_count", "BIGINT"),
+        ("delta_views_count", "BIGINT"),
+        ("delta_likes_count", "BIGINT"),
+        ("delta_comments_count", "BIGINT"),
+        ("delta_reports_count", "BIGINT"),
+    ),
+}
+
+# Seconds to wait before retrying a failed refresh
+_RETRY_SECONDS = 60.0
+
+
+class ColumnarFallback(Exception):
+    """Raised when a query has to be answered by Postgres instead."""
+
+
+@dataclass(frozen=True)
+class ColumnarStats:
+    """Snapshot of the local engine's state and counters."""
+
+    generation: int | None
+    videos: int
+    snapshots: int
+    refreshes: int
+    refresh_failures: int
+    refresh_seconds: float
+    answered: int
+    fallbacks: int
+    mean_ms: float
+
+
+@dataclass(frozen=True)
+class _Copy:
+    database: Any  # duckdb.DuckDBPyConnection
+    generation: int
+    videos: int
+    snapshots: int
+
+
+class ColumnarStore:
+    """Answer aggregates from a DuckDB copy of the analytics tables."""
+
+    def __init__(self, timeout: float) -> None:
+        import duckdb  # noqa: F401  # Fail at startup if the extra is missing
+
+        self._timeout = timeout
+        self._copy: _Copy | None = None
+        self._refresh: asyncio.Task[None] | None = None
+        self._retry_at = 0.0
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._refresh_seconds = 0.0
+        self._answered = 0
+        self._fallbacks = 0
+        self._total_ms = 0.0
+
+    async def scalar(self, sql: str, generation: int) -> Any:
+        """Run a validated query locally and return its single value.
+
+        Args:
+            sql: Validated query in the Postgres dialect
+            generation: Data generation the result will be cached under
+
+        Raises:
+            ColumnarFallback: If the copy is stale or cannot run the query
+        """
+        current = self._copy
+        if current is None or current.generation != generation:
+            self.schedule_refresh()
+            self._fallbacks += 1
+            raise ColumnarFallback(f"local copy is not at generation {generation}")
+        try:
+            local_sql = to_duckdb(sql)
+        except SqlglotError as exc:
+            self._fallbacks += 1
+            raise ColumnarFallback(f"cannot transpile: {exc}") from exc
+
+        started = time.perf_counter()
+        cursor = current.database.cursor()
+        try:
+            async with asyncio.timeout(self._timeout):
+                row = await asyncio.to_thread(_fetchone, cursor, local_sql)
+        except TimeoutError as exc:
+            cursor.interrupt()
+            self._fallbacks += 1
+            raise ColumnarFallback(f"local query ran over {self._timeout}s") from exc
+        except Exception as exc:  # duckdb.Error; the module is imported lazily
+            self._fallbacks += 1
+            raise ColumnarFallback(f"local query failed: {exc}") from exc
+        finally:
+            cursor.close()
+        if row is None or len(row) != 1:
+            self._fallbacks += 1
+            raise ColumnarFallback("query did not return a single value")
+        self._answered += 1
+        self._total_ms += (time.perf_counter() - started) * 1000
+        return row[0]
+
+    def stats(self) -> ColumnarStats:
+        """Return the generation and size of the local copy and query counters."""
+        current = self._copy
+        return ColumnarStats(
+            generation=current.generation if current else None,
+            videos=current.videos if current else 0,
+            snapshots=current.snapshots if current else 0,
+            refreshes=self._refreshes,
+            refresh_failures=self._refresh_failures,
+            refresh_seconds=self._refresh_seconds,
+            answered=self._answered,
+            fallbacks=self._fallbacks,
+            mean_ms=self._total_ms / self._answered if self._answered else 0.0,
+        )
+
+    async def refresh(self) -> None:
+        """Replace the local copy with the current contents of Postgres."""
+        import structlog
+
+        logger = structlog.get_logger()
+        started = time.perf_counter()
+        try:
+            self._copy = await _take_copy()
+        except Exception as exc:
+            self._refresh_failures += 1
+            self._retry_at = time.monotonic() + _RETRY_SECONDS
+            logger.warning("columnar_refresh_failed", error=str(exc))
+            raise
+        self._refreshes += 1
+        self._refresh_seconds = time.perf_counter() - started
+        logger.info(
+            "columnar_refreshed",
+            generation=self._copy.generation,
+            videos=self._copy.videos,
+            snapshots=self._copy.snapshots,
+            seconds=round(self._refresh_seconds, 2),
+        )
+
+    def schedule_refresh(self) -> None:
+        """Start a background refresh unless one is running or backing off."""
+        if self._refresh is not None and not self._refresh.done():
+            return
+        if time.monotonic() < self._retry_at:
+            return
+        self._refresh = asyncio.create_task(self._refresh_quietly())
+
+    async def _refresh_quietly(self) -> None:
+        # Logged and counted by refresh(); queries keep using Postgres
+        with contextlib.suppress(Exception):
+            await self.refresh()
+
+
+def to_duckdb(sql: str) -> str:
+    """Translate a Postgres query to DuckDB SQL with Postgres arithmetic.
+
+    Postgres sums integers as ``numeric``, so ``SUM(x) / COUNT(*)`` keeps
+    its fraction; DuckDB sums them as integers, which the session's
+    integer division would truncate. Sums are cast to DECIMAL to match.
+    """
+
+    tree = sqlglot.parse_one(sql, read="postgres")
+    for node in list(tree.find_all(exp.Sum)):
+        # A window sum is cast as a whole: SUM(x) OVER (...)
+        target = node.parent if isinstance(node.parent, exp.Window) else node
+        if target is not None and not isinstance(target.parent, exp.Cast):
+            target.replace(exp.cast(target.copy(), exp.DataType.build("DECIMAL(38, 6)")))
+    return tree.sql(dialect="duckdb")
+
+
+def _fetchone(cursor: Any, sql: str) -> Any:
+    return cursor.execute(sql).fetchone()
+
+
+async def _take_copy() -> _Copy:
+    """Export both tables from one Postgres snapshot and load them into DuckDB."""
+    with tempfile.TemporaryDirectory(prefix="columnar-") as directory:
+        async with get_engine().connect() as connection:
+            raw = await connection.get_raw_connection()
+            driver = raw.driver_connection
+            assert driver is not None, "pooled connection has no driver connection"
+            async with driver.transaction(isolation="repeatable_read", readonly=True):
+                await driver.execute("SET LOCAL DateStyle = 'ISO'")
+                zone = await driver.fetchval("SHOW TimeZone")
+                generation = await driver.fetchval(
+                    "SELECT generation FROM data_generation WHERE id = 1"
+                )
+                for table, columns in TABLES.items():
+                    names = ", ".join(name for name, _ in columns)
+                    await driver.copy_from_query(
+                        f"SELECT {names} FROM {table}",
+                        output=str(Path(directory) / f"{table}.csv"),
+                        format="csv",
+                    )
+        return await asyncio.to_thread(_build, Path(directory), zone, generation or 0)
+
+
+def _build(directory: Path, zone: str, generation: int) -> _Copy:
+    import duckdb
+
+    database = duckdb.connect(":memory:")
+    # Postgres semantics: integer division truncates, dates follow the session
+    # zone. GLOBAL, because per-query cursors do not inherit session settings
+    database.execute("SET GLOBAL integer_division = true")
+    database.execute(f"SET GLOBAL TimeZone = '{zone}'")
+    counts = {}
+    for table, columns in TABLES.items():
+        definition = ", ".join(f"{name} {column_type} NOT NULL" for name, column_type in columns)
+        database.execute(f"CREATE TABLE {table} ({definition})")
+        database.execute(f"COPY {table} FROM '{directory / table}.csv' (FORMAT csv, HEADER false)")
+        row = database.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        counts[table] = row[0] if row else 0
+    return _Copy(
+        database=database,
+        generation=generation,
+        videos=counts["videos"],
+        snapshots=counts["video_snapshots"],
+    )
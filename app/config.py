@@ -5,8 +5,9 @@ type validation and sensible defaults.
 """
 
 from functools import lru_cache
+from typing import Literal
 
-from pydantic import Field
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -24,9 +25,64 @@ class Settings(BaseSettings):
 
     Optional environment variables:
         - OPENROUTER_MODEL: LLM model to use (default: deepseek/deepseek-chat)
+        - TELEGRAM_MODE: Receive updates by polling or webhook (default: polling)
+        - TELEGRAM_API_URL: Bot API server, e.g. a local fake (default: Telegram's)
+        - WEBHOOK_URL: Public URL Telegram posts updates to (required for webhook)
+        - WEBHOOK_SECRET: Secret token Telegram sends with updates (required for webhook)
+        - WEBHOOK_HOST: Address the webhook server binds to (default: 0.0.0.0)
+        - WEBHOOK_PORT: Port of the webhook server (default: 8080)
+        - WEBHOOK_REGISTER: Register WEBHOOK_URL with Telegram at startup (default: true)
         - LLM_TIMEOUT: Seconds to wait for LLM response (default: 30)
         - DB_TIMEOUT: Seconds to wait for DB query (default: 10)
-        - RATE_LIMIT_SECONDS: Min seconds between user requests (default: 3)
+        - DATABASE_REPLICA_URLS: Comma-separated read replica URLs (default: none)
+        - REPLICA_MAX_LAG_SECONDS: Replication lag above which a replica is skipped (default: 30)
+        - REPLICA_CHECK_INTERVAL_SECONDS: Seconds between replica health checks (default: 5)
+        - DB_POOL_SIZE: Persistent connections per database pool (default: 5)
+        - DB_MAX_OVERFLOW: Extra connections opened under load (default: 10)
+        - DB_POOL_TIMEOUT: Seconds to wait for a free pooled connection (default: 30)
+        - DB_POOL_RECYCLE: Seconds after which a connection is replaced (default: 1800)
+        - DB_POOL_PRE_PING: Test connections on checkout (default: true)
+        - DB_POOL_WARMUP: Connections opened at startup (default: 2)
+        - DB_ENGINE: Query execution path, sqlalchemy or asyncpg (default: sqlalchemy)
+        - PREPARED_STATEMENT_CACHE_SIZE: Prepared statements kept per connection (default: 128)
+        - DB_LOCK_TIMEOUT_MS: Milliseconds a query may wait for a lock (default: 1000)
+        - COLUMNAR_ENGINE: Answer queries from an in-process DuckDB copy (default: false)
+        - COLUMNAR_TIMEOUT_SECONDS: Seconds before a local query falls back (default: 2)
+        - RATE_LIMIT_SECONDS: Seconds for a user to earn another request (default: 3)
+        - RATE_LIMIT_BURST: Requests a user may send at once (default: 3)
+        - RATE_LIMIT_GLOBAL_PER_SECOND: Requests per second of all users, 0 for none (default: 25)
+        - RATE_LIMIT_GLOBAL_BURST: Requests of all users at once (default: 50)
+        - RATE_LIMIT_BACKEND: Where rate limits are kept, memory or sqlite (default: memory)
+        - RATE_LIMIT_SQLITE_PATH: SQLite file shared by bot processes (default: rate_limits.sqlite3)
+        - WORKER_CONCURRENCY: Questions answered at once (default: 16)
+        - WORKER_QUEUE_SIZE: Questions waiting before the bot reports overload (default: 200)
+        - LLM_CONCURRENCY: Questions waiting on the LLM at once (default: 16)
+        - DB_CONCURRENCY: Questions querying the database at once (default: 10)
+        - LLM_HTTP2: Negotiate HTTP/2 with OpenRouter (default: true)
+        - LLM_MAX_CONNECTIONS: Connection pool size for OpenRouter (default: 20)
+        - LLM_MAX_KEEPALIVE_CONNECTIONS: Idle connections kept open (default: 10)
+        - LLM_KEEPALIVE_EXPIRY: Seconds an idle connection is kept (default: 60)
+        - LLM_STREAM: Stream completions and stop at the first statement (default: true)
+        - LLM_MAX_TOKENS: Maximum tokens the LLM may generate (default: 300)
+        - LLM_STOP: Comma-separated stop sequences, up to 4 (default: ;)
+        - INTENT_PARSER: Answer common questions from SQL templates (default: true)
+        - SQL_CACHE_MAX_ENTRIES: Cached question->SQL entries (default: 1024)
+        - SQL_CACHE_TTL_SECONDS: Lifetime of a cached SQL query (default: 3600)
+        - SEMANTIC_CACHE: Reuse the SQL of paraphrased questions (default: false)
+        - SEMANTIC_CACHE_THRESHOLD: Similarity needed to reuse SQL (default: 0.85)
+        - SEMANTIC_CACHE_MAX_ENTRIES: Questions kept for paraphrase lookup (default: 4096)
+        - SEMANTIC_CACHE_PATH: File the semantic cache is persisted to (default: none)
+        - RESULT_CACHE_MAX_ENTRIES: Cached SQL results (default: 4096)
+        - RESULT_CACHE_MAX_BYTES: Approximate memory budget of result cache (default: 8 MiB)
+        - GENERATION_POLL_SECONDS: Seconds between checks for a new data load (default: 1)
+        - ROLLUP_REWRITE: Answer eligible aggregates from daily rollups (default: true)
+        - PREFIX_SUM_INDEX: Answer day-range delta sums from memory (default: true)
+        - QUERY_ADMISSION: Check planner estimates before running SQL (default: true)
+        - QUERY_COST_SOFT_LIMIT: Planner cost above which queries are queued (default: 50000)
+        - QUERY_COST_HARD_LIMIT: Planner cost above which queries are rejected (default: 5000000)
+        - QUERY_ROWS_HARD_LIMIT: Estimated rows of any plan node to reject at (default: 50000000)
+        - QUERY_HEAVY_CONCURRENCY: Queued queries allowed to run at once (default: 2)
+        - STATS_INTERVAL_SECONDS: Seconds between runtime stats log lines (default: 60)
     """
 
     model_config = SettingsConfigDict(
@@ -41,6 +97,85 @@ class Settings(BaseSettings):
         alias="DATABASE_URL",
         description="PostgreSQL async connection URL",
     )
+    database_replica_urls: str = Field(
+        "",
+        alias="DATABASE_REPLICA_URLS",
+        description="Comma-separated read replica URLs for generated queries",
+    )
+    replica_max_lag_seconds: float = Field(
+        30,
+        alias="REPLICA_MAX_LAG_SECONDS",
+        description="Replication lag above which a replica gets no queries",
+        ge=0,
+    )
+    replica_check_interval_seconds: int = Field(
+        5,
+        alias="REPLICA_CHECK_INTERVAL_SECONDS",
+        description="Interval between replica health and lag checks",
+        ge=1,
+        le=300,
+    )
+    db_pool_size: int = Field(
+        5,
+        alias="DB_POOL_SIZE",
+        description="Persistent connections kept by each database pool",
+        ge=1,
+        le=100,
+    )
+    db_max_overflow: int = Field(
+        10,
+        alias="DB_MAX_OVERFLOW",
+        description="Connections opened beyond the pool size under load",
+        ge=0,
+        le=100,
+    )
+    db_pool_timeout: int = Field(
+        30,
+        alias="DB_POOL_TIMEOUT",
+        description="Maximum wait for a free pooled connection",
+        ge=1,
+        le=300,
+    )
+    db_pool_recycle: int = Field(
+        1800,
+        alias="DB_POOL_RECYCLE",
+        description="Age in seconds after which a pooled connection is replaced (-1 disables)",
+        ge=-1,
+    )
+    db_pool_pre_ping: bool = Field(
+        True,
+        alias="DB_POOL_PRE_PING",
+        description="Test connections on checkout instead of failing on first use",
+    )
+    db_pool_warmup: int = Field(
+        2,
+        alias="DB_POOL_WARMUP",
+        description="Connections opened at startup, capped at the pool size",
+        ge=0,
+    )
+    db_engine: Literal["sqlalchemy", "asyncpg"] = Field(
+        "sqlalchemy",
+        alias="DB_ENGINE",
+        description="Run generated SQL through an ORM session or directly on asyncpg",
+    )
+    prepared_statement_cache_size: int = Field(
+        128,
+        alias="PREPARED_STATEMENT_CACHE_SIZE",
+        description="Prepared query shapes kept per connection by the asyncpg engine",
+        ge=1,
+        le=10_000,
+    )
+    columnar_engine: bool = Field(
+        False,
+        alias="COLUMNAR_ENGINE",
+        description="Answer queries from an in-process DuckDB copy of the tables",
+    )
+    columnar_timeout_seconds: float = Field(
+        2.0,
+        alias="COLUMNAR_TIMEOUT_SECONDS",
+        description="Time a local query may take before Postgres answers instead",
+        gt=0,
+    )
 
     # Telegram Bot configuration
     telegram_token: str = Field(
@@ -48,6 +183,44 @@ class Settings(BaseSettings):
         alias="TELEGRAM_TOKEN",
         description="Token from @BotFather",
     )
+    telegram_mode: Literal["polling", "webhook"] = Field(
+        "polling",
+        alias="TELEGRAM_MODE",
+        description="Receive updates by long polling or through a webhook server",
+    )
+    telegram_api_url: str = Field(
+        "",
+        alias="TELEGRAM_API_URL",
+        description="Base URL of the Bot API server; empty for api.telegram.org",
+    )
+    webhook_url: str = Field(
+        "",
+        alias="WEBHOOK_URL",
+        description="Public HTTPS URL Telegram posts updates to; its path is served locally",
+    )
+    webhook_secret: str = Field(
+        "",
+        alias="WEBHOOK_SECRET",
+        description="Secret token Telegram sends with every webhook update",
+        pattern=r"^[A-Za-z0-9_-]{0,256}$",
+    )
+    webhook_host: str = Field(
+        "0.0.0.0",  # The server sits behind a proxy or load balancer
+        alias="WEBHOOK_HOST",
+        description="Address the webhook server binds to",
+    )
+    webhook_port: int = Field(
+        8080,
+        alias="WEBHOOK_PORT",
+        description="Port the webhook server listens on",
+        ge=1,
+        le=65535,
+    )
+    webhook_register: bool = Field(
+        True,
+        alias="WEBHOOK_REGISTER",
+        description="Register WEBHOOK_URL with Telegram at startup",
+    )
 
     # LLM Provider configuration
     openrouter_api_key: str = Field(
@@ -61,6 +234,160 @@ class Settings(BaseSettings):
         description="Model identifier for SQL generation",
     )
 
+    # LLM connection pool configuration
+    llm_http2: bool = Field(
+        True,
+        alias="LLM_HTTP2",
+        description="Multiplex LLM requests over HTTP/2 when the server supports it",
+    )
+    llm_max_connections: int = Field(
+        20,
+        alias="LLM_MAX_CONNECTIONS",
+        description="Maximum number of open connections to the LLM API",
+        ge=1,
+        le=1000,
+    )
+    llm_max_keepalive_connections: int = Field(
+        10,
+        alias="LLM_MAX_KEEPALIVE_CONNECTIONS",
+        description="Maximum number of idle connections kept alive",
+        ge=0,
+        le=1000,
+    )
+    llm_keepalive_expiry: float = Field(
+        60.0,
+        alias="LLM_KEEPALIVE_EXPIRY",
+        description="Seconds an idle LLM connection stays in the pool",
+        ge=0,
+        le=3600,
+    )
+    llm_stream: bool = Field(
+        True,
+        alias="LLM_STREAM",
+        description="Stream completions and close the stream once a statement is complete",
+    )
+    llm_max_tokens: int = Field(
+        300,
+        alias="LLM_MAX_TOKENS",
+        description="Maximum number of tokens the LLM may generate per question",
+        ge=16,
+        le=8192,
+    )
+    llm_stop: str = Field(
+        ";",
+        alias="LLM_STOP",
+        description="Comma-separated sequences at which the LLM stops generating",
+    )
+
+    # Question -> SQL cache configuration
+    intent_parser: bool = Field(
+        True,
+        alias="INTENT_PARSER",
+        description="Answer recognised questions from SQL templates instead of the LLM",
+    )
+    sql_cache_max_entries: int = Field(
+        1024,
+        alias="SQL_CACHE_MAX_ENTRIES",
+        description="Maximum number of cached question->SQL entries",
+        ge=1,
+        le=1_000_000,
+    )
+    sql_cache_ttl_seconds: int = Field(
+        3600,
+        alias="SQL_CACHE_TTL_SECONDS",
+        description="Seconds a cached question->SQL entry stays valid",
+        ge=1,
+        le=7 * 24 * 3600,
+    )
+    semantic_cache: bool = Field(
+        False,  # Off until validated on a paraphrase corpus with near-miss negatives
+        alias="SEMANTIC_CACHE",
+        description="Reuse the SQL of a similar question about the same entities",
+    )
+    semantic_cache_threshold: float = Field(
+        0.85,
+        alias="SEMANTIC_CACHE_THRESHOLD",
+        description="Cosine similarity at which a cached question counts as a paraphrase",
+        gt=0,
+        le=1,
+    )
+    semantic_cache_max_entries: int = Field(
+        4096,
+        alias="SEMANTIC_CACHE_MAX_ENTRIES",
+        description="Maximum number of questions kept for paraphrase lookup",
+        ge=1,
+        le=1_000_000,
+    )
+    semantic_cache_path: str = Field(
+        "",
+        alias="SEMANTIC_CACHE_PATH",
+        description="File the semantic cache is saved to on shutdown; empty to keep it in memory",
+    )
+
+    # Query result cache configuration
+    result_cache_max_entries: int = Field(
+        4096,
+        alias="RESULT_CACHE_MAX_ENTRIES",
+        description="Maximum number of cached SQL results",
+        ge=1,
+        le=10_000_000,
+    )
+    result_cache_max_bytes: int = Field(
+        8 * 1024 * 1024,
+        alias="RESULT_CACHE_MAX_BYTES",
+        description="Approximate memory budget of the SQL result cache",
+        ge=1024,
+    )
+    generation_poll_seconds: float = Field(
+        1.0,
+        alias="GENERATION_POLL_SECONDS",
+        description="Interval between checks of the data generation for a new load",
+        gt=0,
+        le=60,
+    )
+    rollup_rewrite: bool = Field(
+        True,
+        alias="ROLLUP_REWRITE",
+        description="Answer day-granular delta aggregates from the daily rollup tables",
+    )
+    prefix_sum_index: bool = Field(
+        True,
+        alias="PREFIX_SUM_INDEX",
+        description="Answer day-range delta sums from in-memory prefix sums of the rollups",
+    )
+
+    # Admission control configuration (PostgreSQL planner cost units)
+    query_admission: bool = Field(
+        True,
+        alias="QUERY_ADMISSION",
+        description="Run EXPLAIN before each query and apply the cost limits",
+    )
+    query_cost_soft_limit: float = Field(
+        50_000,
+        alias="QUERY_COST_SOFT_LIMIT",
+        description="Estimated cost above which a query waits for a heavy slot",
+        gt=0,
+    )
+    query_cost_hard_limit: float = Field(
+        5_000_000,
+        alias="QUERY_COST_HARD_LIMIT",
+        description="Estimated cost above which a query is rejected",
+        gt=0,
+    )
+    query_rows_hard_limit: float = Field(
+        50_000_000,
+        alias="QUERY_ROWS_HARD_LIMIT",
+        description="Estimated rows of any plan node above which a query is rejected",
+        gt=0,
+    )
+    query_heavy_concurrency: int = Field(
+        2,
+        alias="QUERY_HEAVY_CONCURRENCY",
+        description="Queries above the soft cost limit allowed to run at once",
+        ge=1,
+        le=64,
+    )
+
     # Timeout configuration (in seconds)
     llm_timeout: int = Field(
         30,
@@ -76,15 +403,108 @@ class Settings(BaseSettings):
         ge=1,
         le=60,
     )
+    db_lock_timeout_ms: int = Field(
+        1000,
+        alias="DB_LOCK_TIMEOUT_MS",
+        description="Maximum time a query may wait for a lock, in milliseconds",
+        ge=1,
+        le=60_000,
+    )
 
     # Rate limiting configuration
     rate_limit_seconds: int = Field(
         3,
         alias="RATE_LIMIT_SECONDS",
-        description="Minimum seconds between requests from same user",
+        description="Seconds for a user's token bucket to refill one request",
         ge=1,
         le=300,
     )
+    rate_limit_burst: int = Field(
+        3,
+        alias="RATE_LIMIT_BURST",
+        description="Requests a user may send at once before being limited",
+        ge=1,
+        le=100,
+    )
+    rate_limit_global_per_second: float = Field(
+        25.0,
+        alias="RATE_LIMIT_GLOBAL_PER_SECOND",
+        description="Requests per second accepted from all users together; 0 disables the limit",
+        ge=0,
+        le=10_000,
+    )
+    rate_limit_global_burst: int = Field(
+        50,
+        alias="RATE_LIMIT_GLOBAL_BURST",
+        description="Requests from all users accepted at once",
+        ge=1,
+        le=100_000,
+    )
+    rate_limit_backend: Literal["memory", "sqlite"] = Field(
+        "memory",
+        alias="RATE_LIMIT_BACKEND",
+        description="Keep token buckets in process memory or in a SQLite file",
+    )
+    rate_limit_sqlite_path: str = Field(
+        "rate_limits.sqlite3",
+        alias="RATE_LIMIT_SQLITE_PATH",
+        description="SQLite file of token buckets shared by bot processes on one host",
+    )
+
+    # Worker pool configuration
+    worker_concurrency: int = Field(
+        16,
+        alias="WORKER_CONCURRENCY",
+        description="Questions answered at once",
+        ge=1,
+        le=1024,
+    )
+    worker_queue_size: int = Field(
+        200,
+        alias="WORKER_QUEUE_SIZE",
+        description="Questions waiting for a worker before new ones are refused",
+        ge=1,
+        le=100_000,
+    )
+    llm_concurrency: int = Field(
+        16,
+        alias="LLM_CONCURRENCY",
+        description="Questions waiting on the LLM at once",
+        ge=1,
+        le=1024,
+    )
+    db_concurrency: int = Field(
+        10,
+        alias="DB_CONCURRENCY",
+        description="Questions querying the database at once",
+        ge=1,
+        le=1024,
+    )
+
+    # Observability configuration
+    stats_interval_seconds: int = Field(
+        60,
+        alias="STATS_INTERVAL_SECONDS",
+        description="Interval between periodic runtime stats log lines",
+        ge=1,
+        le=3600,
+    )
+
+    @model_validator(mode="after")
+    def _check_webhook(self) -> "Settings":
+        if self.telegram_mode == "webhook" and not (self.webhook_url and self.webhook_secret):
+            raise ValueError("TELEGRAM_MODE=webhook requires WEBHOOK_URL and WEBHOOK_SECRET")
+        return self
+
+    @property
+    def stop_sequences(self) -> list[str]:
+        """Return the configured LLM stop sequences, at most four as the API allows."""
+        return [stop for stop in self.llm_stop.split(",") if stop.strip()][:4]
+
+    @property
+    def replica_urls(self) -> list[str]:
+        """Return the configured read replica URLs."""
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
 
 
 @lru_cache
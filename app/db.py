@@ -2,9 +2,19 @@
 
 This module provides SQLAlchemy async database configuration,
 base model class, and session factory utilities.
+
+Engines live in a per-process registry keyed by database URL, so the
+bot, the executor and the scripts share one pool per database instead
+of each building (and leaking) their own. Pool size, overflow, recycle
+and pre-ping come from ``Settings``; ``warm_up`` opens connections at
+startup and ``dispose_engines`` closes every pool on shutdown.
 """
 
+import asyncio
 from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
 
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
@@ -13,6 +23,7 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import get_settings
 
@@ -27,23 +38,131 @@ class Base(DeclarativeBase):
     pass
 
 
-def create_engine() -> AsyncEngine:
+@dataclass(frozen=True)
+class PoolStats:
+    """Snapshot of connection pool utilization."""
+
+    size: int
+    checked_out: int
+    checked_in: int
+    overflow: int  # Connections open beyond pool size (negative while filling)
+    waiting: int  # Checkouts currently waiting for a connection
+    peak_waiting: int
+
+
+class CountingQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that counts checkouts waiting for a connection.
+
+    SQLAlchemy reports checked-out and overflow connections but not the
+    callers blocked on a full pool, which is what saturation looks like.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.peak_waiting = 0
+
+    def _do_get(self) -> Any:
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            return super()._do_get()
+        finally:
+            self.waiting -= 1
+
+    def recreate(self) -> "CountingQueuePool":
+        pool = super().recreate()
+        assert isinstance(pool, CountingQueuePool)
+        pool.peak_waiting = self.peak_waiting
+        return pool
+
+
+_engines: dict[str, AsyncEngine] = {}
+_session_factories: dict[str, async_sessionmaker[AsyncSession]] = {}
+
+
+def create_engine(url: str | None = None, pool_size: int | None = None) -> AsyncEngine:
     """Create and configure async SQLAlchemy engine.
 
-    Uses connection pooling with pre-ping to verify connections
-    before use, preventing stale connection issues.
+    Pool settings come from ``Settings``. Prefer ``get_engine``, which
+    shares one engine per database across the process.
+
+    Args:
+        url: Database URL (default: DATABASE_URL)
+        pool_size: Override of DB_POOL_SIZE, e.g. for parallel loaders
 
     Returns:
         AsyncEngine: Configured async database engine
     """
     settings = get_settings()
     return create_async_engine(
-        settings.database_url,
-        pool_pre_ping=True,  # Verify connections before use
+        url or settings.database_url,
+        poolclass=CountingQueuePool,
+        pool_size=pool_size or settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,  # Verify connections before use
         echo=False,  # Set to True for SQL query logging
     )
 
 
+def get_engine(url: str | None = None, pool_size: int | None = None) -> AsyncEngine:
+    """Return the process-wide engine for a database, creating it on first use.
+
+    Args:
+        url: Database URL (default: DATABASE_URL)
+        pool_size: Pool size used if this call creates the engine
+
+    Returns:
+        AsyncEngine: Shared engine for ``url``
+    """
+    url = url or get_settings().database_url
+    engine = _engines.get(url)
+    if engine is None:
+        engine = _engines[url] = create_engine(url, pool_size)
+    return engine
+
+
+async def dispose_engines() -> None:
+    """Close the pools of every registered engine and empty the registry."""
+    engines = list(_engines.values())
+    _engines.clear()
+    _session_factories.clear()
+    await asyncio.gather(*(engine.dispose() for engine in engines))
+
+
+async def warm_up(engine: AsyncEngine, connections: int) -> None:
+    """Open up to ``connections`` pooled connections ahead of the first request.
+
+    Args:
+        engine: Engine whose pool to fill
+        connections: Connections to open, capped at the pool size
+    """
+    pool = engine.pool
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        connections = min(connections, pool.size())
+    # Hold every connection until all are open, so each one is new
+    async with AsyncExitStack() as stack:
+        for _ in range(connections):
+            await stack.enter_async_context(engine.connect())
+
+
+def pool_stats(engine: AsyncEngine) -> PoolStats:
+    """Return utilization counters of an engine's pool."""
+    pool = engine.pool
+    if not isinstance(pool, CountingQueuePool):
+        return PoolStats(0, 0, 0, 0, 0, 0)
+    return PoolStats(
+        size=pool.size(),
+        checked_out=pool.checkedout(),
+        checked_in=pool.checkedin(),
+        overflow=pool.overflow(),
+        waiting=pool.waiting,
+        peak_waiting=pool.peak_waiting,
+    )
+
+
 def create_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
     """Create async session factory bound to the given engine.
 
@@ -64,12 +183,21 @@ def create_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSessi
     )
 
 
+def get_session_factory(url: str | None = None) -> async_sessionmaker[AsyncSession]:
+    """Return the session factory bound to the shared engine of ``url``."""
+    url = url or get_settings().database_url
+    factory = _session_factories.get(url)
+    if factory is None:
+        factory = _session_factories[url] = create_session_factory(get_engine(url))
+    return factory
+
+
+@asynccontextmanager
 async def get_session() -> AsyncIterator[AsyncSession]:
-    """Dependency injection provider for database sessions.
+    """Provide a database session from the shared engine.
 
     Yields an async session that is automatically closed when done.
-    Intended for use with FastAPI-style dependency injection or
-    as a context manager in async functions.
+    The connection goes back to the process-wide pool.
 
     Yields:
         AsyncSession: Database session for queries and transactions
@@ -78,7 +206,5 @@ async def get_session() -> AsyncIterator[AsyncSession]:
         async with get_session() as session:
             result = await session.execute(query)
     """
-    engine = create_engine()
-    session_factory = create_session_factory(engine)
-    async with session_factory() as session:
+    async with get_session_factory()() as session:
         yield session
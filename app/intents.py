@@ -0,0 +1,490 @@
+"""Rule-based answers to common questions, in front of the LLM.
+
+Most questions follow a handful of patterns: how many videos (of a
+creator, published in a period, above a threshold), a metric's total or
+maximum, and a metric's growth on a day or over a range of days. The
+parser recognises these in Russian, extracts the metric, dates and
+creator id, and renders SQL from templates without an LLM round trip.
+
+The parser only answers when it understands every word of the question:
+dates are extracted first, and any remaining word outside its vocabulary
+("каждого", "покажи", a second metric) sends the question to the LLM.
+Dates without a year resolve to the most recent such day, as in
+``app.question_cache``.
+"""
+
+import re
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from app.llm import LlmResponse, SqlGenerator
+from app.sql_guard import validate_sql
+
+VIDEO_COUNT = "video_count"
+METRIC_TOTAL = "metric_total"
+METRIC_AGGREGATE = "metric_aggregate"
+METRIC_GROWTH = "metric_growth"
+
+# Metric name (column without delta_ prefix) by word prefix
+_METRICS = {
+    "просмотр": "views_count",
+    "лайк": "likes_count",
+    "коммент": "comments_count",
+    "жалоб": "reports_count",
+    "репорт": "reports_count",
+}
+_AGGREGATES = {
+    "максимальн": "MAX",
+    "наибольш": "MAX",
+    "минимальн": "MIN",
+    "наименьш": "MIN",
+    "средн": "AVG",
+}
+_COMPARATORS = {"больше": ">", "более": ">", "свыше": ">", "меньше": "<", "менее": "<"}
+_CREATOR_PREFIXES = ("креатор", "создател", "автор", "блогер", "канал")
+_VIDEO_PREFIXES = ("видео", "ролик")
+_PUBLISHED_PREFIXES = (
+    "опубликов", "публикац", "вышл", "вышед", "выход", "выложен", "выложил",
+    "загружен", "загрузил", "появил", "создан",
+)  # fmt: skip
+_GROWTH_PREFIXES = ("прирост", "вырос", "выросл", "увелич", "прибав", "нов")
+_NEGATIONS = frozenset(("не", "кроме", "без"))
+_DAY_WORDS = frozenset(("день", "сутки"))  # "За день" asks for growth, not a total
+_FILLERS = frozenset(
+    (
+        "сколько", "всего", "всех", "все", "всем", "итого", "общее", "общий", "общая",
+        "суммарно", "суммарное", "суммарный", "количество", "число", "какое", "какой",
+        "какая", "каково", "было", "был", "была", "были", "есть", "сейчас", "текущее",
+        "в", "во", "на", "за", "у", "с", "со", "от", "по", "и", "к", "id", "айди",
+        "идентификатором", "системе", "базе", "данных", "время", "включительно",
+        "набрали", "набрало", "набрал", "набравших", "получили", "получило", "получил",
+        "имеют", "имеющих", "штук", "сумма", "сумме", "сумму",
+    )
+)  # fmt: skip
+
+_MONTHS = {
+    form: number
+    for number, forms in enumerate(
+        (
+            ("январь", "января", "январе"),
+            ("февраль", "февраля", "феврале"),
+            ("март", "марта", "марте"),
+            ("апрель", "апреля", "апреле"),
+            ("май", "мая", "мае"),
+            ("июнь", "июня", "июне"),
+            ("июль", "июля", "июле"),
+            ("август", "августа", "августе"),
+            ("сентябрь", "сентября", "сентябре"),
+            ("октябрь", "октября", "октябре"),
+            ("ноябрь", "ноября", "ноябре"),
+            ("декабрь", "декабря", "декабре"),
+        ),
+        1,
+    )
+    for form in forms
+}
+_RELATIVE_DAYS = {"позавчера": -2, "вчера": -1, "сегодня": 0}
+
+_MONTH = "|".join(sorted(_MONTHS, key=len, reverse=True))
+_YEAR = r"(?:\s+(?P<{}>\d{{4}})(?:\s*(?:года|год|г)\b\.?)?)?"
+_DATES_RE = re.compile(
+    rf"\b(?:с|со)\s+(?P<from_day>\d{{1,2}})(?:\s+(?P<from_month>{_MONTH}))?{_YEAR.format('from_year')}"
+    rf"\s+по\s+(?P<to_day>\d{{1,2}})\s+(?P<to_month>{_MONTH}){_YEAR.format('to_year')}"
+    rf"|\bмежду\s+(?P<low_day>\d{{1,2}})(?:\s+(?P<low_month>{_MONTH}))?{_YEAR.format('low_year')}"
+    rf"\s+и\s+(?P<high_day>\d{{1,2}})\s+(?P<high_month>{_MONTH}){_YEAR.format('high_year')}"
+    rf"|\b(?:в|во|за)\s+(?P<month>{_MONTH}){_YEAR.format('month_year')}"
+    rf"|\b(?P<day>\d{{1,2}})\s+(?P<day_month>{_MONTH}){_YEAR.format('day_year')}"
+    rf"|\b(?P<relative>{'|'.join(_RELATIVE_DAYS)})\b"
+)
+# Stems of spelled-out day ordinals: "первое декабря", "двадцать третьего ноября"
+_ORDINALS = {
+    stem: number
+    for number, stem in enumerate(
+        (
+            "перв", "втор", "трет", "четверт", "пят", "шест", "седьм", "восьм", "девят",
+            "десят", "одиннадцат", "двенадцат", "тринадцат", "четырнадцат", "пятнадцат",
+            "шестнадцат", "семнадцат", "восемнадцат", "девятнадцат", "двадцат",
+        ),
+        1,
+    )
+}  # fmt: skip
+_ORDINALS["тридцат"] = 30
+_ORDINAL_DAY_RE = re.compile(
+    r"\b(?:(?P<tens>двадцать|тридцать)\s+)?"
+    rf"(?P<unit>{'|'.join(sorted(_ORDINALS, key=len, reverse=True))})"
+    rf"(?:ое|ого|ье|ьего|ий|ему|ому|ом)\s+(?=(?:{_MONTH})\b)"
+)
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_DOTTED_DATE_RE = re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(\d{4})\b")
+_THOUSANDS_RE = re.compile(r"\b\d{1,3}(?:[ \u00a0]\d{3})+\b")
+_CREATOR_ID_RE = re.compile(r"[0-9a-f]{8}(?:-?[0-9a-f]{4}){3}-?[0-9a-f]{12}")
+_ANY_CASE_ID_RE = re.compile(_CREATOR_ID_RE.pattern, re.IGNORECASE)
+_TOKEN_RE = re.compile(rf"@date|{_CREATOR_ID_RE.pattern}|\d+|[a-zа-я]+")
+
+
+class _NotUnderstood(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Intent:
+    """A recognised question, ready to render as SQL.
+
+    ``metric`` is a ``videos`` column such as ``views_count``; growth
+    questions sum its ``delta_`` counterpart over snapshots. ``start`` is
+    inclusive and ``end`` exclusive.
+    """
+
+    kind: str
+    metric: str | None = None
+    aggregate: str | None = None
+    start: date | None = None
+    end: date | None = None
+    creator_id: str | None = None
+    threshold: tuple[str, str, int] | None = None  # (metric, operator, value)
+
+    def to_sql(self) -> str:
+        """Render the intent as a single-value SQL query."""
+        if self.kind == METRIC_GROWTH:
+            return self._growth_sql()
+        if self.kind == VIDEO_COUNT:
+            projection = "COUNT(*)"
+        elif self.kind == METRIC_AGGREGATE:
+            projection = f"{self.aggregate}({self.metric})"
+        else:
+            projection = f"SUM({self.metric})"
+        conditions = []
+        if self.creator_id is not None:
+            conditions.append(f"creator_id = '{self.creator_id}'")
+        if self.start is not None and self.end is not None:
+            conditions.append(f"video_created_at >= '{self.start.isoformat()}'")
+            conditions.append(f"video_created_at < '{self.end.isoformat()}'")
+        if self.threshold is not None:
+            metric, operator, value = self.threshold
+            conditions.append(f"{metric} {operator} {value}")
+        return _select(projection, "videos", conditions)
+
+    def _growth_sql(self) -> str:
+        assert self.start is not None and self.end is not None
+        period = [
+            f"created_at >= '{self.start.isoformat()}'",
+            f"created_at < '{self.end.isoformat()}'",
+        ]
+        if self.creator_id is None:
+            return _select(f"SUM(delta_{self.metric})", "video_snapshots", period)
+        return _select(
+            f"SUM(s.delta_{self.metric})",
+            "video_snapshots s JOIN videos v ON v.id = s.video_id",
+            [f"s.{condition}" for condition in period] + [f"v.creator_id = '{self.creator_id}'"],
+        )
+
+
+@dataclass(frozen=True)
+class Entities:
+    """What a question is about, and the words around it.
+
+    ``values`` holds resolved periods, creator ids, numbers, metrics,
+    aggregates, comparators and whether creators are mentioned; ``words``
+    the remaining non-filler words.
+    """
+
+    values: frozenset[str]
+    words: str
+
+
+@dataclass(frozen=True)
+class IntentStats:
+    """Coverage and latency of the rule-based parser."""
+
+    questions: int
+    answered: int
+    fallbacks: int
+    coverage: float
+    mean_us: float  # Parsing time, answered or not
+    intents: dict[str, int] = field(default_factory=dict)
+
+
+def parse_question(question: str, today: date | None = None) -> Intent | None:
+    """Recognise a common question, or return None if the LLM should answer it.
+
+    Args:
+        question: Natural language question in Russian
+        today: Reference date for relative and year-less dates (defaults to today)
+
+    Returns:
+        Intent | None: Recognised intent
+
+    Example:
+        >>> parse_question("Сколько просмотров было 1 декабря?", date(2025, 12, 2))
+        Intent(kind='metric_growth', metric='views_count', aggregate=None, \
+start=datetime.date(2025, 12, 1), end=datetime.date(2025, 12, 2), creator_id=None, \
+threshold=None)
+    """
+    try:
+        return _parse(question, today or date.today())
+    except _NotUnderstood:
+        return None
+
+
+def extract_entities(question: str, today: date | None = None) -> Entities | None:
+    """Extract the values a question is about, for comparing paraphrases.
+
+    Two questions with the same entities differ only in wording, so they
+    can share SQL if their wording is also similar enough. Words that
+    change the meaning without naming a value (growth markers such as
+    "новых" or "за день", and negations) count as entities too.
+
+    Args:
+        question: Natural language question in Russian
+        today: Reference date for relative and year-less dates (defaults to today)
+
+    Returns:
+        Entities | None: Entities and remaining words; None if a date is invalid
+
+    Example:
+        >>> extract_entities("Просмотры за первое декабря", date(2025, 12, 2))
+        Entities(values=frozenset({'2025-12-01..2025-12-02', 'views_count'}), words='просмотры')
+    """
+    try:
+        text, periods, ids = _prepare(question, today or date.today())
+    except _NotUnderstood:
+        return None
+    values = {f"{start.isoformat()}..{end.isoformat()}" for start, end in periods}
+    words = []
+    previous = ""
+    for token in _TOKEN_RE.findall(text):
+        before, previous = previous, token
+        if token == "@date":
+            continue
+        if token.isdigit() or _CREATOR_ID_RE.fullmatch(token):
+            values.add(ids.get(token, token))
+            continue
+        if (metric := _prefixed(token, _METRICS)) is not None:
+            values.add(metric)
+        elif (function := _prefixed(token, _AGGREGATES)) is not None:
+            values.add(function)
+        elif token in _COMPARATORS:
+            values.add(_COMPARATORS[token])
+        elif token.startswith(_CREATOR_PREFIXES):
+            values.add("creator")  # "Сколько креаторов" is not "сколько видео"
+        elif token.startswith(_GROWTH_PREFIXES) or (before == "за" and token in _DAY_WORDS):
+            values.add("growth")
+        elif token in _NEGATIONS:
+            values.add("not")
+        if token not in _FILLERS:
+            words.append(token)
+    return Entities(frozenset(values), " ".join(words))
+
+
+def _prepare(question: str, today: date) -> tuple[str, list[tuple[date, date]], dict[str, str]]:
+    """Lowercase the question and replace every date expression with ``@date``.
+
+    Ids are compared as stored, so the original spelling of each one is
+    returned keyed by its lowercased form.
+    """
+    ids = {match[0].lower(): match[0] for match in _ANY_CASE_ID_RE.finditer(question)}
+    text = question.lower().replace("ё", "е")
+    text = _ORDINAL_DAY_RE.sub(_numbered_day, text)
+    text = _ISO_DATE_RE.sub(lambda m: _spelled(int(m[1]), int(m[2]), int(m[3])), text)
+    text = _DOTTED_DATE_RE.sub(lambda m: _spelled(int(m[3]), int(m[2]), int(m[1])), text)
+    periods: list[tuple[date, date]] = []
+    text = _DATES_RE.sub(lambda m: _period(m, today, periods), text)
+    text = _THOUSANDS_RE.sub(lambda m: re.sub(r"\s", "", m[0]), text)
+    return text, periods, ids
+
+
+def _parse(question: str, today: date) -> Intent:
+    text, periods, ids = _prepare(question, today)
+    if len(periods) > 1:
+        raise _NotUnderstood
+
+    metrics: list[str] = []
+    aggregate = None
+    creator_id = None
+    video = growth = published = creator_word = False
+    comparator: str | None = None
+    threshold_value: int | None = None
+    threshold: tuple[str, str, int] | None = None
+    for token in _TOKEN_RE.findall(text):
+        if threshold_value is not None:
+            # "больше 1000 просмотров": the metric the threshold applies to
+            metric = _prefixed(token, _METRICS)
+            if metric is None or comparator is None:
+                raise _NotUnderstood
+            threshold = (metric, comparator, threshold_value)
+            comparator = threshold_value = None
+        elif comparator is not None:
+            if not token.isdigit():
+                raise _NotUnderstood
+            threshold_value = int(token)
+        elif token == "@date" or token in _FILLERS:
+            continue
+        elif _CREATOR_ID_RE.fullmatch(token):
+            if creator_id is not None:
+                raise _NotUnderstood
+            creator_id = ids[token]
+        elif token in _COMPARATORS:
+            if threshold is not None:
+                raise _NotUnderstood
+            comparator = _COMPARATORS[token]
+        elif (metric := _prefixed(token, _METRICS)) is not None:
+            metrics.append(metric)
+        elif (function := _prefixed(token, _AGGREGATES)) is not None:
+            aggregate = function
+        elif token.startswith(_CREATOR_PREFIXES):
+            creator_word = True
+        elif token.startswith(_VIDEO_PREFIXES):
+            video = True
+        elif token.startswith(_PUBLISHED_PREFIXES):
+            published = True
+        elif token.startswith(_GROWTH_PREFIXES):
+            growth = True
+        else:
+            raise _NotUnderstood
+    if comparator is not None or threshold_value is not None:
+        raise _NotUnderstood
+    if (creator_id is not None) != creator_word:
+        raise _NotUnderstood  # An id without "креатор" could be a video id
+    start, end = periods[0] if periods else (None, None)
+
+    if not metrics:
+        if not video or aggregate:
+            raise _NotUnderstood
+        if (start is None and growth) or (start is not None and not (published or growth)):
+            raise _NotUnderstood  # "Новые видео" needs a period, a period needs "вышло"
+        return Intent(VIDEO_COUNT, start=start, end=end, creator_id=creator_id, threshold=threshold)
+    if len(metrics) > 1 or threshold is not None or published:
+        raise _NotUnderstood
+    if aggregate is not None:
+        if start is not None or growth:
+            raise _NotUnderstood
+        return Intent(METRIC_AGGREGATE, metrics[0], aggregate=aggregate, creator_id=creator_id)
+    if start is not None:
+        return Intent(METRIC_GROWTH, metrics[0], start=start, end=end, creator_id=creator_id)
+    if growth:
+        raise _NotUnderstood  # Growth over an unspecified period
+    return Intent(METRIC_TOTAL, metrics[0], creator_id=creator_id)
+
+
+def _prefixed(token: str, table: dict[str, str]) -> str | None:
+    for prefix, value in table.items():
+        if token.startswith(prefix):
+            return value
+    return None
+
+
+def _numbered_day(match: re.Match[str]) -> str:
+    """Turn "двадцать первое" into "21"."""
+    tens = {"двадцать": 20, "тридцать": 30}.get(match["tens"] or "", 0)
+    return f"{tens + _ORDINALS[match['unit']]} "
+
+
+def _spelled(year: int, month: int, day: int) -> str:
+    """Spell a numeric date the way the date grammar expects it."""
+    names = [form for form, number in _MONTHS.items() if number == month]
+    if not names:
+        raise _NotUnderstood
+    return f"{day} {names[1]} {year}"  # Genitive: "5 ноября 2025"
+
+
+def _period(match: re.Match[str], today: date, periods: list[tuple[date, date]]) -> str:
+    """Resolve one date expression to a [start, end) range of days."""
+    groups = match.groupdict()
+    if groups["relative"]:
+        day = today + timedelta(days=_RELATIVE_DAYS[groups["relative"]])
+        periods.append((day, day + timedelta(days=1)))
+    elif groups["month"]:
+        month = _MONTHS[groups["month"]]
+        year = _year(groups["month_year"]) or (
+            today.year if month <= today.month else today.year - 1
+        )
+        first = date(year, month, 1)
+        periods.append((first, (first + timedelta(days=31)).replace(day=1)))
+    elif groups["day"]:
+        day = _day(groups["day"], groups["day_month"], groups["day_year"], today)
+        periods.append((day, day + timedelta(days=1)))
+    else:
+        prefix = ("from", "to") if groups["from_day"] else ("low", "high")
+        last = _day(
+            groups[f"{prefix[1]}_day"],
+            groups[f"{prefix[1]}_month"],
+            groups[f"{prefix[1]}_year"],
+            today,
+        )
+        month = _MONTHS[groups[f"{prefix[0]}_month"] or groups[f"{prefix[1]}_month"]]
+        day_number = int(groups[f"{prefix[0]}_day"])
+        year = _year(groups[f"{prefix[0]}_year"]) or (
+            last.year if (month, day_number) <= (last.month, last.day) else last.year - 1
+        )
+        first = _date(year, month, day_number)
+        if first > last:
+            raise _NotUnderstood
+        periods.append((first, last + timedelta(days=1)))
+    return " @date "
+
+
+def _day(day: str, month_name: str, year: str | None, today: date) -> date:
+    """Resolve "5 ноября [2025]"; without a year, the latest such day up to today."""
+    month = _MONTHS[month_name]
+    explicit = _year(year)
+    if explicit is not None:
+        return _date(explicit, month, int(day))
+    candidate = _date(today.year, month, int(day))
+    return candidate if candidate <= today else _date(today.year - 1, month, int(day))
+
+
+def _year(value: str | None) -> int | None:
+    return int(value) if value else None
+
+
+def _date(year: int, month: int, day: int) -> date:
+    try:
+        return date(year, month, day)
+    except ValueError as exc:
+        raise _NotUnderstood from exc
+
+
+def _select(projection: str, source: str, conditions: list[str]) -> str:
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"SELECT {projection} FROM {source}{where}"
+
+
+class IntentSqlGenerator:
+    """SQL generator that answers recognised questions from templates.
+
+    Wraps another generator (normally the cached LLM) and forwards only
+    the questions ``parse_question`` does not understand.
+    """
+
+    def __init__(self, generator: SqlGenerator, today: Callable[[], date] = date.today) -> None:
+        self._generator = generator
+        self._today = today
+        self._questions = 0
+        self._answered = 0
+        self._total_us = 0.0
+        self._intents: Counter[str] = Counter()
+
+    async def generate_sql(self, user_question: str) -> LlmResponse:
+        started = time.perf_counter()
+        intent = parse_question(user_question, self._today())
+        self._questions += 1
+        self._total_us += (time.perf_counter() - started) * 1_000_000
+        if intent is None:
+            return await self._generator.generate_sql(user_question)
+        self._answered += 1
+        self._intents[intent.kind] += 1
+        return LlmResponse(sql=validate_sql(intent.to_sql()))
+
+    def stats(self) -> IntentStats:
+        """Return how many questions were answered without the LLM."""
+        return IntentStats(
+            questions=self._questions,
+            answered=self._answered,
+            fallbacks=self._questions - self._answered,
+            coverage=self._answered / self._questions if self._questions else 0.0,
+            mean_us=self._total_us / self._questions if self._questions else 0.0,
+            intents=dict(self._intents),
+        )
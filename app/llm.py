@@ -1,4 +1,7 @@
+import json
+import time
 from dataclasses import dataclass
+from typing import Any, Protocol
 
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
@@ -6,6 +9,7 @@ from tenacity import retry, stop_after_attempt, wait_exponential
 from app.config import get_settings
 from app.prompt import build_prompt
 from app.sql_guard import SqlValidationError, validate_sql
+from app.sql_stream import SqlStreamExtractor
 
 
 class SqlGenerationError(RuntimeError):
@@ -17,41 +21,132 @@ class LlmResponse:
     sql: str
 
 
+class SqlGenerator(Protocol):
+    """Anything that turns a user question into validated SQL."""
+
+    async def generate_sql(self, user_question: str) -> LlmResponse: ...
+
+
+@dataclass(frozen=True)
+class LlmPoolStats:
+    """Snapshot of connection reuse in the OpenRouter HTTP pool."""
+
+    requests: int
+    connections_opened: int
+    connections_reused: int
+
+
+@dataclass(frozen=True)
+class LlmStreamStats:
+    """Snapshot of streamed completions."""
+
+    streams: int
+    early_closes: int  # Streams closed as soon as the statement was complete
+    mean_time_to_sql_ms: float
+    mean_chars: float  # Characters read per stream
+
+
 class OpenRouterClient:
     def __init__(self) -> None:
         settings = get_settings()
         self._api_key = settings.openrouter_api_key
         self._model = settings.openrouter_model
         self._base_url = "https://openrouter.ai/api/v1"
+        self._client: httpx.AsyncClient | None = None
+        self._requests = 0
+        self._connections_opened = 0
+        self._streams = 0
+        self._early_closes = 0
+        self._stream_ms = 0.0
+        self._stream_chars = 0
+
+    async def open(self) -> None:
+        """Open the pooled HTTP client.
+
+        The pool is shared by every call and every retry, so the TCP and
+        TLS handshake is only paid when the pool has no live connection.
+        Calling ``open`` is optional; the pool is created on first use.
+        """
+        if self._client is not None:
+            return
+        settings = get_settings()
+        self._client = httpx.AsyncClient(
+            base_url=self._base_url,
+            timeout=settings.llm_timeout,
+            http2=settings.llm_http2,
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive_connections,
+                keepalive_expiry=settings.llm_keepalive_expiry,
+            ),
+            headers={
+                "Authorization": f"Bearer {self._api_key}",
+                "Content-Type": "application/json",
+            },
+        )
+
+    async def close(self) -> None:
+        """Close the pooled HTTP client and its connections."""
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
+
+    def stats(self) -> LlmPoolStats:
+        """Return connection reuse counters since the client was created."""
+        return LlmPoolStats(
+            requests=self._requests,
+            connections_opened=self._connections_opened,
+            connections_reused=max(self._requests - self._connections_opened, 0),
+        )
+
+    def stream_stats(self) -> LlmStreamStats:
+        """Return counters of streamed completions."""
+        streams = self._streams
+        return LlmStreamStats(
+            streams=streams,
+            early_closes=self._early_closes,
+            mean_time_to_sql_ms=self._stream_ms / streams if streams else 0.0,
+            mean_chars=self._stream_chars / streams if streams else 0.0,
+        )
+
+    async def _trace(self, event: str, info: dict[str, Any]) -> None:
+        # httpcore only emits connect_tcp when the pool has to dial a new socket
+        if event == "connection.connect_tcp.complete":
+            self._connections_opened += 1
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
     async def generate_sql(self, user_question: str) -> LlmResponse:
         settings = get_settings()
         prompt = build_prompt(user_question)
-        headers = {
-            "Authorization": f"Bearer {self._api_key}",
-            "Content-Type": "application/json",
-        }
-        payload = {
+        payload: dict[str, Any] = {
             "model": self._model,
             "messages": [
                 {"role": "system", "content": "Ты генерируешь SQL для PostgreSQL."},
                 {"role": "user", "content": prompt},
             ],
             "temperature": 0.0,
+            "max_tokens": settings.llm_max_tokens,
         }
+        if settings.stop_sequences:
+            payload["stop"] = settings.stop_sequences
 
-        async with httpx.AsyncClient(
-            base_url=self._base_url, timeout=settings.llm_timeout
-        ) as client:
-            response = await client.post("/chat/completions", headers=headers, json=payload)
+        await self.open()
+        assert self._client is not None
+        self._requests += 1
+        if settings.llm_stream:
+            raw_sql = await self._stream(payload)
+        else:
+            response = await self._client.post(
+                "/chat/completions", json=payload, extensions={"trace": self._trace}
+            )
             response.raise_for_status()
             data = response.json()
 
-        try:
-            raw_sql = data["choices"][0]["message"]["content"]
-        except (KeyError, IndexError) as exc:
-            raise SqlGenerationError("Invalid LLM response format") from exc
+            try:
+                raw_sql = data["choices"][0]["message"]["content"]
+            except (KeyError, IndexError) as exc:
+                raise SqlGenerationError("Invalid LLM response format") from exc
 
         try:
             cleaned = validate_sql(raw_sql)
@@ -59,3 +154,43 @@ class OpenRouterClient:
             raise SqlGenerationError(f"SQL validation failed: {exc}") from exc
 
         return LlmResponse(sql=cleaned)
+
+    async def _stream(self, payload: dict[str, Any]) -> str:
+        """Read a streamed completion until its first SQL statement is complete.
+
+        Leaving the stream early resets it (HTTP/2) or closes the
+        connection (HTTP/1.1), so the rest of the completion is never
+        waited for.
+        """
+        assert self._client is not None
+        started = time.perf_counter()
+        extractor = SqlStreamExtractor()
+        self._streams += 1
+        async with self._client.stream(
+            "POST",
+            "/chat/completions",
+            json={**payload, "stream": True},
+            extensions={"trace": self._trace},
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                # Server-sent events; blank lines and ": comments" keep the stream alive
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError as exc:
+                    raise SqlGenerationError("Invalid LLM stream chunk") from exc
+                if "error" in chunk:
+                    raise SqlGenerationError(f"LLM stream failed: {chunk['error']}")
+                choices = chunk.get("choices") or [{}]
+                content = choices[0].get("delta", {}).get("content") or ""
+                if extractor.feed(content) is not None:
+                    self._early_closes += 1
+                    break
+        self._stream_ms += (time.perf_counter() - started) * 1000
+        self._stream_chars += len(extractor.text)
+        return extractor.finish()
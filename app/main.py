@@ -1,20 +1,38 @@
 import asyncio
-from datetime import datetime
+import math
+from collections.abc import Callable
+from dataclasses import asdict
+from functools import partial
+from pathlib import Path
+from typing import Any
 
 import structlog
 from aiogram import Bot, Dispatcher, F
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.filters import CommandStart
 from aiogram.types import Message
 
 from app.config import get_settings
-from app.llm import OpenRouterClient, SqlGenerationError
-from app.query_executor import QueryExecutor, SqlExecutionError
+from app.db import dispose_engines, get_engine, pool_stats, warm_up
+from app.intents import IntentSqlGenerator
+from app.llm import OpenRouterClient, SqlGenerationError, SqlGenerator
+from app.query_executor import (
+    QueryExecutor,
+    QueryRejectedError,
+    QueryTimeoutError,
+    SqlExecutionError,
+)
+from app.question_cache import CachingSqlGenerator
+from app.rate_limit import MemoryBackend, RateLimitBackend, RateLimiter, SqliteBackend
+from app.semantic_cache import SemanticSqlCache
+from app.webhook import run_webhook
+from app.workers import WorkerPool
 
 logger = structlog.get_logger()
 
-# Simple in-memory rate limiter
-_user_last_request: dict[int, datetime] = {}
+_OVERLOADED = "Сервер сейчас перегружен, попробуйте позже."
 
 
 async def handle_start(message: Message) -> None:
@@ -24,54 +42,157 @@ async def handle_start(message: Message) -> None:
     )
 
 
-async def handle_query(message: Message, llm: OpenRouterClient, executor: QueryExecutor) -> None:
-    settings = get_settings()
-    user_id = message.from_user.id if message.from_user else 0
-
-    # Rate limiting check
-    now = datetime.now()
-    if user_id in _user_last_request:
-        elapsed = (now - _user_last_request[user_id]).total_seconds()
-        if elapsed < settings.rate_limit_seconds:
-            await message.answer(
-                f"Пожалуйста, подождите {settings.rate_limit_seconds - int(elapsed)} сек."
-            )
-            return
-
-    _user_last_request[user_id] = now
-
+async def handle_query(
+    message: Message, llm: SqlGenerator, executor: QueryExecutor, pool: WorkerPool
+) -> None:
     question = message.text or ""
     if not question.strip():
         await message.answer("Пожалуйста, отправь текстовый вопрос.")
         return
 
     try:
-        response = await llm.generate_sql(question)
-        result = await executor.fetch_scalar(response.sql)
+        async with pool.stage("llm"):
+            response = await llm.generate_sql(question)
+        async with pool.stage("db"):
+            result = await executor.fetch_scalar(response.sql)
         await message.answer(str(result.value))
+    except QueryRejectedError as exc:
+        logger.warning("query_rejected", reason=exc.reason, error=str(exc))
+        if exc.reason == "busy":
+            await message.answer(_OVERLOADED)
+        else:
+            await message.answer(
+                "Запрос слишком тяжёлый. Попробуйте сузить период или уточнить вопрос."
+            )
+    except QueryTimeoutError as exc:
+        logger.warning("query_timeout", error=str(exc))
+        await message.answer("Запрос выполнялся слишком долго. Попробуйте сузить период.")
     except (SqlGenerationError, SqlExecutionError) as exc:
         logger.warning("query_failed", error=str(exc))
         await message.answer("Ошибка обработки запроса. Попробуйте переформулировать.")
 
 
+async def report_stats(interval: float, sources: dict[str, Callable[[], Any]]) -> None:
+    """Periodically log stats snapshots of long-lived components."""
+    while True:
+        await asyncio.sleep(interval)
+        for component, snapshot in sources.items():
+            logger.info("stats", component=component, **asdict(snapshot()))
+
+
 async def main() -> None:
     settings = get_settings()
-    bot = Bot(token=settings.telegram_token)
+    session = (
+        AiohttpSession(api=TelegramAPIServer.from_base(settings.telegram_api_url))
+        if settings.telegram_api_url
+        else None
+    )
+    bot = Bot(token=settings.telegram_token, session=session)
     dp = Dispatcher()
     llm = OpenRouterClient()
     executor = QueryExecutor()
+    semantic = (
+        SemanticSqlCache(
+            llm,
+            threshold=settings.semantic_cache_threshold,
+            max_entries=settings.semantic_cache_max_entries,
+            ttl_seconds=settings.sql_cache_ttl_seconds,
+        )
+        if settings.semantic_cache
+        else None
+    )
+    semantic_path = Path(settings.semantic_cache_path) if settings.semantic_cache_path else None
+    if semantic is not None and semantic_path is not None:
+        logger.info("semantic_cache_loaded", entries=semantic.load(semantic_path))
+    generator = CachingSqlGenerator(semantic or llm)
+    intents = IntentSqlGenerator(generator) if settings.intent_parser else None
+    backend: RateLimitBackend = (
+        SqliteBackend(settings.rate_limit_sqlite_path)
+        if settings.rate_limit_backend == "sqlite"
+        else MemoryBackend()
+    )
+    limiter = RateLimiter(
+        backend,
+        interval=settings.rate_limit_seconds,
+        burst=settings.rate_limit_burst,
+        global_interval=(
+            1 / settings.rate_limit_global_per_second
+            if settings.rate_limit_global_per_second
+            else 0
+        ),
+        global_burst=settings.rate_limit_global_burst,
+    )
+    pool = WorkerPool(
+        workers=settings.worker_concurrency,
+        queue_size=settings.worker_queue_size,
+        stage_limits={"llm": settings.llm_concurrency, "db": settings.db_concurrency},
+    )
+    await llm.open()
+    await warm_up(get_engine(), settings.db_pool_warmup)
+    replica_task = asyncio.create_task(executor.monitor_replicas())
+    generation_task = asyncio.create_task(executor.watch_generation())
+    stats_sources: dict[str, Callable[[], Any]] = {
+        "workers": pool.stats,
+        "rate_limit": limiter.stats,
+        "llm_pool": llm.stats,
+        "llm_stream": llm.stream_stats,
+        "sql_cache": generator.stats,
+        "sql_flights": generator.flight_stats,
+        "result_cache": executor.stats,
+        "query_flights": executor.flight_stats,
+        "query_stats": executor.query_stats,
+        "query_admission": executor.admission_stats,
+        "query_limits": executor.execution_stats,
+        "prepared_statements": executor.prepared_stats,
+        "db_pool": lambda: pool_stats(get_engine()),
+        "replicas": executor.replica_stats,
+    }
+    if intents is not None:
+        stats_sources["intents"] = intents.stats
+    if semantic is not None:
+        stats_sources["semantic_cache"] = semantic.stats
+    if settings.prefix_sum_index:
+        stats_sources["prefix_sums"] = executor.prefix_sum_stats
+    if settings.columnar_engine:
+        stats_sources["columnar"] = executor.columnar_stats
+    stats_task = asyncio.create_task(report_stats(settings.stats_interval_seconds, stats_sources))
 
     dp.message.register(handle_start, CommandStart())
 
     async def query_handler(message: Message) -> None:
-        await handle_query(message, llm, executor)
+        user_id = message.from_user.id if message.from_user else 0
+        decision = await limiter.check(user_id)
+        if decision.limit == "global":
+            logger.warning("global_rate_limited", user_id=user_id)
+            await message.answer(_OVERLOADED)
+            return
+        if not decision.allowed:
+            await message.answer(f"Пожалуйста, подождите {math.ceil(decision.retry_after)} сек.")
+            return
+        job = partial(handle_query, message, intents or generator, executor, pool)
+        if not pool.submit(user_id, job):
+            logger.warning("worker_queue_full", user_id=user_id)
+            await message.answer(_OVERLOADED)
 
     dp.message.register(query_handler, F.text)
 
+    pool.start()
     try:
-        await dp.start_polling(bot)
+        if settings.telegram_mode == "webhook":
+            await run_webhook(dp, bot, settings)
+        else:
+            await dp.start_polling(bot)
     finally:
-        await executor.close()
+        stats_task.cancel()
+        await pool.close()
+        replica_task.cancel()
+        generation_task.cancel()
+        await llm.close()
+        if semantic is not None and semantic_path is not None:
+            semantic.save(semantic_path)
+        await dispose_engines()
+        if isinstance(backend, SqliteBackend):
+            backend.close()
         await bot.session.close()
 
 
@@ -4,9 +4,18 @@ Defines the database schema for storing video statistics and
 time-series snapshot data for analytics queries.
 """
 
-from datetime import datetime
-
-from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String
+from datetime import date, datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    SmallInteger,
+    String,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -45,6 +54,9 @@ class Video(Base):
     comments_count: Mapped[int] = mapped_column(BigInteger, default=0)
     reports_count: Mapped[int] = mapped_column(BigInteger, default=0)
 
+    # Hash of the source record, lets incremental loads skip unchanged videos
+    content_hash: Mapped[str | None] = mapped_column(String(32), nullable=True)
+
     # Relationships
     snapshots: Mapped[list["VideoSnapshot"]] = relationship(
         back_populates="video",
@@ -60,9 +72,13 @@ class VideoSnapshot(Base):
 
     The delta_* fields represent the change since the previous snapshot,
     making it easy to calculate daily growth without joining multiple rows.
+
+    The table is range-partitioned by created_at month (see app.partitions),
+    so the partition key is part of the primary key.
     """
 
     __tablename__ = "video_snapshots"
+    __table_args__ = ({"postgresql_partition_by": "RANGE (created_at)"},)
 
     # Primary key
     id: Mapped[str] = mapped_column(
@@ -76,9 +92,10 @@ class VideoSnapshot(Base):
         index=True,
     )
 
-    # Snapshot timestamp (indexed for time-range queries)
+    # Snapshot timestamp (partition key, indexed for time-range queries)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        primary_key=True,
         index=True,
     )
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
@@ -107,3 +124,104 @@ Index(
     VideoSnapshot.video_id,
     VideoSnapshot.created_at,
 )
+
+
+class DataGeneration(Base):
+    """Single-row counter bumped every time the dataset is reloaded.
+
+    Caches of query results are keyed on the current generation, so a
+    completed load invalidates them without any explicit flush.
+    """
+
+    __tablename__ = "data_generation"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True, default=1)
+    generation: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
+
+
+# Shared by every writer: the ORM load, the COPY loaders and partition retention
+BUMP_GENERATION_SQL = (
+    "UPDATE data_generation SET generation = generation + 1, updated_at = now() WHERE id = 1"
+)
+
+
+class IngestCheckpoint(Base):
+    """Progress of an incremental load, used to resume after a crash.
+
+    ``position`` counts the videos of the source file that have been
+    committed. The checkpoint only applies while ``fingerprint`` still
+    matches the source file, and is removed once the load completes.
+    ``watermark`` is the global snapshot watermark the load started from,
+    so a resumed load filters against the same value.
+    """
+
+    __tablename__ = "ingest_checkpoints"
+
+    source: Mapped[str] = mapped_column(String(512), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    position: Mapped[int] = mapped_column(BigInteger, default=0)
+    watermark: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+
+class SnapshotWatermark(Base):
+    """Newest snapshot time the incremental loader has stored, per video.
+
+    The row keyed ``GLOBAL_WATERMARK`` holds the newest time over all
+    videos. Reading these rows back avoids scanning ``video_snapshots``
+    for its maximums on every load.
+    """
+
+    __tablename__ = "snapshot_watermarks"
+
+    video_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+
+GLOBAL_WATERMARK = "*"
+
+
+class VideoDailyStats(Base):
+    """Per-video, per-day sums of snapshot deltas.
+
+    Maintained by the loader from video_snapshots; ``day`` is
+    ``DATE(created_at)`` in the database session time zone.
+    """
+
+    __tablename__ = "video_daily_stats"
+
+    video_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True, index=True)
+
+    delta_views_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    delta_likes_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    delta_comments_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    delta_reports_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    snapshot_count: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class CreatorDailyStats(Base):
+    """Per-creator, per-day sums of snapshot deltas.
+
+    Also answers global per-day totals, since every snapshot belongs to
+    exactly one creator.
+    """
+
+    __tablename__ = "creator_daily_stats"
+
+    creator_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True, index=True)
+
+    delta_views_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    delta_likes_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    delta_comments_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    delta_reports_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    snapshot_count: Mapped[int] = mapped_column(BigInteger, default=0)
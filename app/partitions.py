@@ -0,0 +1,124 @@
+"""Monthly partitions of ``video_snapshots``.
+
+``video_snapshots`` is range-partitioned by ``created_at`` month (UTC)
+without a default partition, so a row can only be written once the
+partition for its month exists. Writers call ``ensure_statements`` for
+the months they are about to write; ``PartitionSet`` remembers what has
+already been created so steady-state loads issue no DDL at all.
+
+Retention drops whole partitions instead of deleting rows.
+"""
+
+from collections.abc import Iterable
+from datetime import UTC, date, datetime
+
+PARENT = "video_snapshots"
+MONTHS_AHEAD = 3
+
+_LIST_SQL = (
+    "SELECT child.relname FROM pg_inherits "
+    "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+    f"WHERE parent.relname = '{PARENT}'"
+)
+
+
+def month_of(value: datetime | date) -> date:
+    """Return the first day of the UTC month containing ``value``.
+
+    Naive datetimes are taken as UTC, as the database driver sends them.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(UTC)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    """Shift a month start by ``count`` months."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the partition holding ``month``, e.g. ``video_snapshots_p202511``."""
+    return f"{PARENT}_p{month:%Y%m}"
+
+
+def parse_partition_name(name: str) -> date | None:
+    """Inverse of ``partition_name``; None for tables that do not follow it."""
+    prefix = f"{PARENT}_p"
+    suffix = name.removeprefix(prefix)
+    if suffix == name or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def create_partition_sql(month: date) -> str:
+    """DDL creating the partition for ``month`` if it does not exist yet."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+        f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+def list_partitions_sql() -> str:
+    """Query returning the name of every attached partition."""
+    return _LIST_SQL
+
+
+def months_between(first: date, last: date) -> list[date]:
+    """Every month start from ``first`` to ``last`` inclusive."""
+    months = []
+    month = month_of(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+class PartitionSet:
+    """Tracks which monthly partitions exist on the database."""
+
+    def __init__(self, existing: Iterable[str] = ()) -> None:
+        self._months = {month for month in map(parse_partition_name, existing) if month is not None}
+
+    def __contains__(self, month: date) -> bool:
+        return month in self._months
+
+    def months(self) -> list[date]:
+        """Months that have a partition, oldest first."""
+        return sorted(self._months)
+
+    def ensure_statements(self, timestamps: Iterable[datetime]) -> list[str]:
+        """DDL for the partitions still missing for ``timestamps``.
+
+        The months are recorded as created right away, so the caller must
+        run the statements before writing and must not discard them.
+        """
+        missing = sorted({month_of(value) for value in timestamps} - self._months)
+        self._months.update(missing)
+        return [create_partition_sql(month) for month in missing]
+
+    def ahead_statements(self, today: date, months: int = MONTHS_AHEAD) -> list[str]:
+        """DDL for the current month and the next ``months`` months."""
+        start = month_of(today)
+        return self.ensure_statements(
+            datetime(month.year, month.month, 1, tzinfo=UTC)
+            for month in months_between(start, add_months(start, months))
+        )
+
+    def expired(self, cutoff: date) -> list[date]:
+        """Months that end on or before ``cutoff`` and can be dropped whole."""
+        return sorted(month for month in self._months if add_months(month, 1) <= cutoff)
+
+    def drop_statements(self, cutoff: date) -> list[str]:
+        """DDL detaching and dropping every partition older than ``cutoff``."""
+        statements = []
+        for month in self.expired(cutoff):
+            self._months.discard(month)
+            statements.append(f"ALTER TABLE {PARENT} DETACH PARTITION {partition_name(month)}")
+            statements.append(f"DROP TABLE {partition_name(month)}")
+        return statements
@@ -0,0 +1,236 @@
+"""In-memory prefix sums of the daily delta rollups.
+
+Range questions ("views between A and B", "growth of creator X in
+November") are sums of a delta metric over a range of days. The index
+holds, for every metric, the running total per day since the first day
+with data: globally and per creator, in dense ``array('q')`` columns.
+A range sum is then the difference of two entries, answered without
+touching the database.
+
+The index is built from ``creator_daily_stats`` (see ``app.rollup``) in
+one snapshot together with the data generation, and is only used for
+that generation. After a load it is rebuilt in the background; queries
+run on the database until the new index is ready.
+"""
+
+import asyncio
+import contextlib
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from itertools import accumulate
+
+from sqlalchemy import text
+
+from app.db import get_engine
+from app.rollup import CREATOR_ROLLUP
+from app.sql_shapes import COUNT_METRIC, DELTA_METRICS, DeltaQuery, match_delta_query
+
+METRICS = (*DELTA_METRICS, COUNT_METRIC)
+
+# Seconds to wait before retrying a failed build
+_RETRY_SECONDS = 60.0
+
+# (creator_id, day, values in METRICS order) of one rollup row
+_Row = tuple[str, date, tuple[int, ...]]
+
+# Column of the rollup holding each metric
+_ROLLUP_COLUMNS = {**{metric: metric for metric in DELTA_METRICS}, COUNT_METRIC: "snapshot_count"}
+
+
+@dataclass(frozen=True)
+class PrefixSumStats:
+    """Snapshot of the index size and lookup counters."""
+
+    generation: int | None
+    days: int
+    creators: int
+    bytes: int
+    builds: int
+    build_failures: int
+    build_seconds: float
+    hits: int
+    misses: int
+    mean_us: float
+
+
+class _Series:
+    """Running totals of every metric over consecutive days from ``first``.
+
+    ``totals[metric][i]`` is the sum over the ``i`` days before
+    ``first + i``, so each array has one more entry than there are days.
+    """
+
+    def __init__(self, first: date, daily: dict[str, list[int]]) -> None:
+        self.first = first.toordinal()
+        self.days = len(daily[METRICS[0]])
+        self.totals = {
+            metric: array("q", accumulate(values, initial=0)) for metric, values in daily.items()
+        }
+
+    def range_sum(self, metric: str, start: date | None, end: date | None) -> int:
+        """Sum ``metric`` over the days in [start, end), clamped to the series."""
+        low = 0 if start is None else min(max(start.toordinal() - self.first, 0), self.days)
+        high = self.days if end is None else min(max(end.toordinal() - self.first, 0), self.days)
+        if high <= low:
+            return 0
+        totals = self.totals[metric]
+        return totals[high] - totals[low]
+
+    @property
+    def size(self) -> int:
+        return sum(totals.itemsize * len(totals) for totals in self.totals.values())
+
+
+@dataclass(frozen=True)
+class _Index:
+    generation: int
+    overall: _Series | None
+    creators: dict[str, _Series]
+
+
+class PrefixSumIndex:
+    """Answer day-range delta sums from in-memory prefix sums."""
+
+    def __init__(self) -> None:
+        self._index: _Index | None = None
+        self._build: asyncio.Task[None] | None = None
+        self._retry_at = 0.0
+        self._builds = 0
+        self._build_failures = 0
+        self._build_seconds = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._total_us = 0.0
+
+    def lookup(self, sql: str, generation: int) -> int | None:
+        """Return the value of a day-range delta sum, or None if it cannot be served.
+
+        Args:
+            sql: Validated SQL query
+            generation: Data generation the result will be cached under
+
+        Returns:
+            int | None: Sum (or snapshot count) of the range; None to run the query
+        """
+        started = time.perf_counter()
+        index = self._index
+        if index is None or index.generation != generation:
+            self.schedule_refresh()
+            self._misses += 1
+            return None
+        query = match_delta_query(sql)
+        value = _answer(index, query) if query is not None else None
+        if value is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._total_us += (time.perf_counter() - started) * 1_000_000
+        return value
+
+    def stats(self) -> PrefixSumStats:
+        """Return the generation and memory of the index and lookup counters."""
+        index = self._index
+        series = [] if index is None else [index.overall, *index.creators.values()]
+        return PrefixSumStats(
+            generation=index.generation if index else None,
+            days=index.overall.days if index and index.overall else 0,
+            creators=len(index.creators) if index else 0,
+            bytes=sum(item.size for item in series if item is not None),
+            builds=self._builds,
+            build_failures=self._build_failures,
+            build_seconds=self._build_seconds,
+            hits=self._hits,
+            misses=self._misses,
+            mean_us=self._total_us / self._hits if self._hits else 0.0,
+        )
+
+    async def refresh(self) -> None:
+        """Rebuild the index from the rollup table."""
+        import structlog
+
+        logger = structlog.get_logger()
+        started = time.perf_counter()
+        try:
+            self._index = await _load()
+        except Exception as exc:
+            self._build_failures += 1
+            self._retry_at = time.monotonic() + _RETRY_SECONDS
+            logger.warning("prefix_sums_build_failed", error=str(exc))
+            raise
+        self._builds += 1
+        self._build_seconds = time.perf_counter() - started
+        stats = self.stats()
+        logger.info(
+            "prefix_sums_built",
+            generation=stats.generation,
+            days=stats.days,
+            creators=stats.creators,
+            bytes=stats.bytes,
+            seconds=round(self._build_seconds, 3),
+        )
+
+    def schedule_refresh(self) -> None:
+        """Start a background rebuild unless one is running or backing off."""
+        if self._build is not None and not self._build.done():
+            return
+        if time.monotonic() < self._retry_at:
+            return
+        self._build = asyncio.create_task(self._refresh_quietly())
+
+    async def _refresh_quietly(self) -> None:
+        # Logged and counted by refresh(); queries keep using the database
+        with contextlib.suppress(Exception):
+            await self.refresh()
+
+
+def _answer(index: _Index, query: DeltaQuery) -> int | None:
+    if query.video_id is not None:
+        return None  # The index is kept per creator, not per video
+    if query.creator_id is None:
+        series = index.overall
+    else:
+        series = index.creators.get(query.creator_id)
+    if series is None:
+        return 0  # No snapshots at all, so every sum is empty
+    return series.range_sum(query.metric, query.start, query.end)
+
+
+async def _load() -> _Index:
+    """Read the generation and the creator rollup from one snapshot."""
+    columns = ", ".join(_ROLLUP_COLUMNS[metric] for metric in METRICS)
+    engine = get_engine().execution_options(isolation_level="REPEATABLE READ")
+    async with engine.connect() as connection:
+        generation = await connection.scalar(
+            text("SELECT generation FROM data_generation WHERE id = 1")
+        )
+        result = await connection.execute(
+            text(f"SELECT creator_id, day, {columns} FROM {CREATOR_ROLLUP}")
+        )
+        rows = [(row[0], row[1], tuple(row[2:])) for row in result]
+    return _build(generation or 0, rows)
+
+
+def _build(generation: int, rows: list[_Row]) -> _Index:
+    """Turn (creator_id, day, metrics) rows into dense prefix sums."""
+    by_creator: dict[str, list[_Row]] = {}
+    for row in rows:
+        by_creator.setdefault(row[0], []).append(row)
+    return _Index(
+        generation=generation,
+        overall=_series(rows) if rows else None,
+        creators={creator: _series(creator_rows) for creator, creator_rows in by_creator.items()},
+    )
+
+
+def _series(rows: list[_Row]) -> _Series:
+    """Build one series spanning the rows' days; days without rows count zero."""
+    first = min(day for _, day, _ in rows)
+    span = (max(day for _, day, _ in rows) - first).days + 1
+    daily = {metric: [0] * span for metric in METRICS}
+    for _, day, values in rows:
+        offset = (day - first).days
+        for metric, value in zip(METRICS, values, strict=True):
+            daily[metric][offset] += value
+    return _Series(first, daily)
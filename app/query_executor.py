@@ -2,15 +2,102 @@
 
 Executes validated SQL queries and ensures results are numeric.
 Handles PostgreSQL-specific return types like Decimal.
+
+Results are cached per (data generation, query fingerprint, parameters).
+The loader bumps the generation when a load commits, so cached results
+are never served for data that has since changed. The generation is
+kept in memory and re-read every GENERATION_POLL_SECONDS by
+``watch_generation``, so a cache hit costs no database round trip; a
+load is noticed within one poll. Execution counters are kept per
+fingerprint, so one query shape is tracked as one entity.
+
+Day-granular delta aggregates are answered from the daily rollup tables
+when ROLLUP_REWRITE is enabled; the original query remains the cache key
+and the fallback if the rewritten query fails.
+
+With QUERY_ADMISSION enabled, every statement is planned with EXPLAIN
+first and rejected or queued when the estimated cost is too high (see
+``app.admission``). Planning uses its own short checkout, and a queued
+statement checks out the connection it runs on only once it holds a
+slot, so waiting never pins a pooled connection or an open transaction.
+
+Queries run in a read-only transaction with ``statement_timeout`` and
+``lock_timeout`` set locally, so Postgres itself stops runaway queries.
+If the server does not answer shortly after DB_TIMEOUT, the executor
+gives up and cancels the backend with ``pg_cancel_backend``, sent over
+a dedicated unpooled connection so it still goes out when the pool is
+exhausted.
+
+DB_ENGINE=asyncpg skips the ORM session and runs recurring query shapes
+as prepared statements on the raw asyncpg connection (see
+``app.runners``).
+
+Day-range delta sums are answered from in-memory prefix sums when
+PREFIX_SUM_INDEX is enabled (see ``app.prefix_sums``).
+
+With COLUMNAR_ENGINE enabled, cache misses are first tried against the
+in-process DuckDB copy of the tables (see ``app.columnar``); Postgres
+answers whenever the copy is stale or cannot run the query.
 """
 
+import asyncio
+import sys
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from decimal import Decimal
+from typing import Any
 
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+import asyncpg
+from sqlalchemy import select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
 
+from app.admission import (
+    AdmissionBusyError,
+    AdmissionStats,
+    CostGate,
+    PlanEstimate,
+    Verdict,
+    parse_plan,
+)
+from app.cache import CacheStats, LruCache
+from app.columnar import ColumnarFallback, ColumnarStats, ColumnarStore
 from app.config import get_settings
+from app.db import get_engine, get_session_factory
+from app.models import DataGeneration
+from app.prefix_sums import PrefixSumIndex, PrefixSumStats
+from app.query_stats import QueryStats, QueryStatsSnapshot
+from app.replicas import Endpoint, ReplicaRouter, ReplicaStats
+from app.rollup import rewrite_for_rollup
+from app.runners import (
+    AsyncpgRunner,
+    PreparedStatementCache,
+    PreparedStatementStats,
+    SessionRunner,
+    StatementRunner,
+)
+from app.singleflight import SingleFlight, SingleFlightStats
+from app.sql_guard import CanonicalQuery, SqlParam, canonicalize
+
+ResultKey = tuple[int, str, tuple[SqlParam, ...]]
+
+# SQLSTATEs of statements stopped by statement_timeout and lock_timeout
+_QUERY_CANCELED = "57014"
+_LOCK_NOT_AVAILABLE = "55P03"
+
+# How long past statement_timeout the client waits before cancelling itself
+_CLIENT_GRACE_SECONDS = 1.0
+
+# Rough per-entry bookkeeping cost (tuple, int, OrderedDict node)
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+def _entry_size(key: ResultKey, value: int) -> int:
+    params = sum(sys.getsizeof(param) for param in key[2])
+    return sys.getsizeof(key[1]) + sys.getsizeof(key[2]) + params + _ENTRY_OVERHEAD_BYTES
 
 
 class SqlExecutionError(RuntimeError):
@@ -19,6 +106,57 @@ class SqlExecutionError(RuntimeError):
     pass
 
 
+class QueryRejectedError(SqlExecutionError):
+    """Raised when admission control refuses to run a query.
+
+    ``reason`` is ``"cost"`` or ``"rows"`` when the planner estimate is
+    over a hard limit, and ``"busy"`` when no heavy slot freed up in time.
+    """
+
+    def __init__(self, reason: str, estimate: PlanEstimate) -> None:
+        super().__init__(
+            f"Query rejected ({reason}): estimated cost {estimate.total_cost:.0f}, "
+            f"rows {estimate.max_rows:.0f}"
+        )
+        self.reason = reason
+        self.estimate = estimate
+
+
+class QueryTimeoutError(SqlExecutionError):
+    """Raised when a query runs past DB_TIMEOUT or waits too long for a lock."""
+
+
+class EndpointUnavailableError(SqlExecutionError):
+    """Raised when no transaction can be opened on a database endpoint."""
+
+
+# Failures while opening a transaction that mean the endpoint is unreachable
+_UNREACHABLE: tuple[type[BaseException], ...] = (
+    SQLAlchemyError,
+    OSError,
+    asyncpg.PostgresError,
+    asyncpg.InterfaceError,
+)
+
+
+@dataclass(frozen=True)
+class ExecutionStats:
+    """Counters of statements stopped by timeouts."""
+
+    statements: int
+    statement_timeouts: int  # Stopped by the server's statement_timeout
+    lock_timeouts: int  # Stopped by the server's lock_timeout
+    client_timeouts: int  # Abandoned by the client after the grace period
+    cancels_sent: int
+    cancel_failures: int
+
+
+_REJECT_REASONS = {Verdict.REJECT_COST: "cost", Verdict.REJECT_ROWS: "rows"}
+
+# Failed statements, whichever runner ran them
+_STATEMENT_ERRORS = SessionRunner.errors + AsyncpgRunner.errors
+
+
 @dataclass(frozen=True)
 class QueryResult:
     """Wrapper for query results to ensure type safety."""
@@ -30,18 +168,144 @@ class QueryExecutor:
     """Execute SQL queries against PostgreSQL with safety checks."""
 
     def __init__(self) -> None:
-        """Initialize with async engine and session factory."""
+        """Initialize with the shared engine, session factory and result cache."""
         settings = get_settings()
-        self._engine: AsyncEngine = create_async_engine(settings.database_url, pool_pre_ping=True)
-        self._session_factory = async_sessionmaker(self._engine, expire_on_commit=False)
+        self._session_factory = get_session_factory()
+        self._router = ReplicaRouter(
+            settings.database_url,
+            settings.replica_urls,
+            max_lag_seconds=settings.replica_max_lag_seconds,
+        )
+        self._results: LruCache[ResultKey, int] = LruCache(
+            max_entries=settings.result_cache_max_entries,
+            max_weight=settings.result_cache_max_bytes,
+            weigher=_entry_size,
+        )
+        self._generation: int | None = None
+        self._generation_read_at = 0.0  # time.monotonic() of the last read
+        self._flights: SingleFlight[ResultKey, QueryResult] = SingleFlight()
+        self._query_stats = QueryStats()
+        self._gate = CostGate(
+            soft_cost=settings.query_cost_soft_limit,
+            hard_cost=settings.query_cost_hard_limit,
+            hard_rows=settings.query_rows_hard_limit,
+            heavy_slots=settings.query_heavy_concurrency,
+        )
+        self._prepared = PreparedStatementCache(settings.prepared_statement_cache_size)
+        self._prefix_sums = PrefixSumIndex() if settings.prefix_sum_index else None
+        self._columnar = (
+            ColumnarStore(timeout=settings.columnar_timeout_seconds)
+            if settings.columnar_engine
+            else None
+        )
+        self._statements = 0
+        self._statement_timeouts = 0
+        self._lock_timeouts = 0
+        self._client_timeouts = 0
+        self._cancels_sent = 0
+        self._cancel_failures = 0
+        self._cancel_engines: dict[str, AsyncEngine] = {}
+
+    def stats(self) -> CacheStats:
+        """Return result cache counters."""
+        return self._results.stats()
+
+    def flight_stats(self) -> SingleFlightStats:
+        """Return how many concurrent identical queries were collapsed."""
+        return self._flights.stats()
+
+    def query_stats(self) -> QueryStatsSnapshot:
+        """Return per-fingerprint counters of the busiest query shapes."""
+        return self._query_stats.snapshot()
+
+    def admission_stats(self) -> AdmissionStats:
+        """Return admission counters and estimated-vs-actual cost."""
+        return self._gate.stats()
+
+    def prepared_stats(self) -> PreparedStatementStats:
+        """Return prepared statement cache counters of the asyncpg engine."""
+        return self._prepared.stats()
+
+    def replica_stats(self) -> ReplicaStats:
+        """Return routing counters and per-endpoint health and latency."""
+        return self._router.stats()
+
+    def prefix_sum_stats(self) -> PrefixSumStats | None:
+        """Return prefix-sum index counters, or None when PREFIX_SUM_INDEX is off."""
+        return self._prefix_sums.stats() if self._prefix_sums else None
+
+    def columnar_stats(self) -> ColumnarStats | None:
+        """Return local engine counters, or None when COLUMNAR_ENGINE is off."""
+        return self._columnar.stats() if self._columnar else None
+
+    async def monitor_replicas(self) -> None:
+        """Check replica health and lag periodically; returns at once without replicas."""
+        if not self._router.replicas:
+            return
+        settings = get_settings()
+        await self._router.monitor(
+            settings.replica_check_interval_seconds, timeout=settings.db_timeout
+        )
+
+    def execution_stats(self) -> ExecutionStats:
+        """Return timeout and cancellation counters."""
+        return ExecutionStats(
+            statements=self._statements,
+            statement_timeouts=self._statement_timeouts,
+            lock_timeouts=self._lock_timeouts,
+            client_timeouts=self._client_timeouts,
+            cancels_sent=self._cancels_sent,
+            cancel_failures=self._cancel_failures,
+        )
+
+    async def watch_generation(self) -> None:
+        """Re-read the data generation every GENERATION_POLL_SECONDS, forever."""
+        import structlog
+
+        logger = structlog.get_logger()
+        interval = get_settings().generation_poll_seconds
+        while True:
+            try:
+                await self._read_generation()
+            except _UNREACHABLE as exc:
+                logger.warning("generation_read_failed", error=str(exc))
+            await asyncio.sleep(interval)
+
+    async def _current_generation(self) -> int:
+        """Return the data generation, reading it only if the last read is too old.
 
-    async def close(self) -> None:
-        """Close database connections."""
-        await self._engine.dispose()
+        With ``watch_generation`` running this never waits on the database;
+        without it (scripts, tests) the generation is read at most once per
+        two poll intervals.
+        """
+        max_age = 2 * get_settings().generation_poll_seconds
+        if self._generation is None or time.monotonic() - self._generation_read_at > max_age:
+            return await self._read_generation()
+        return self._generation
+
+    async def _read_generation(self) -> int:
+        """Read the data generation and drop results cached for older ones."""
+        async with self._session_factory() as session:
+            generation = await session.scalar(
+                select(DataGeneration.generation).where(DataGeneration.id == 1)
+            )
+        generation = generation or 0
+        self._generation_read_at = time.monotonic()
+        if generation != self._generation:
+            self._results.clear()
+            self._generation = generation
+            if self._prefix_sums is not None:
+                self._prefix_sums.schedule_refresh()
+            if self._columnar is not None:
+                self._columnar.schedule_refresh()
+        return generation
 
     async def fetch_scalar(self, sql: str) -> QueryResult:
         """Execute SQL and return single numeric value.
 
+        Concurrent calls for the same canonical query share one execution,
+        unless the query reads the clock (see ``CanonicalQuery.volatile``).
+
         Args:
             sql: Validated SQL query to execute
 
@@ -51,40 +315,253 @@ class QueryExecutor:
         Raises:
             SqlExecutionError: If execution fails or result is non-numeric
         """
+        query = canonicalize(sql)
+
+        try:
+            key = (await self._current_generation(), query.fingerprint, query.params)
+        except Exception as exc:
+            raise SqlExecutionError(f"SQL execution failed: {exc}") from exc
+
+        if query.volatile:
+            # "Last 7 days" relative to NOW() changes without a new load, so
+            # the result is neither cached nor shared with another caller
+            return await self._execute(sql, query, key, cache=False)
+        cached = self._results.get(key)
+        if cached is not None:
+            self._query_stats.record_hit(query.fingerprint, query.template)
+            return QueryResult(value=cached)
+        if key in self._flights:
+            self._query_stats.record_hit(query.fingerprint, query.template)
+        return await self._flights.do(key, lambda: self._execute(sql, query, key))
+
+    async def _execute(
+        self, sql: str, query: CanonicalQuery, key: ResultKey, cache: bool = True
+    ) -> QueryResult:
+        """Run a cache-missed query, store its result and record its timing."""
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await self._run(sql, key, cache)
+            failed = False
+            return result
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._query_stats.record_execution(
+                query.fingerprint, query.template, elapsed_ms, failed=failed
+            )
+
+    @asynccontextmanager
+    async def _runner(self, endpoint: Endpoint) -> AsyncIterator[StatementRunner]:
+        """Open a read-only, time-limited transaction on an endpoint.
+
+        Raises:
+            EndpointUnavailableError: If the transaction cannot be opened
+        """
+        settings = get_settings()
+        timeouts = (settings.db_timeout * 1000, settings.db_lock_timeout_ms)
+        if settings.db_engine == "sqlalchemy":
+            async with get_session_factory(endpoint.url)() as session:
+                try:
+                    runner: StatementRunner = await SessionRunner.create(session)
+                    await runner.limit(*timeouts)
+                except _UNREACHABLE as exc:
+                    raise EndpointUnavailableError(f"{endpoint.name}: {exc}") from exc
+                yield runner
+            return
+
+        connection = get_engine(endpoint.url).connect()
+        try:
+            await connection.start()
+            raw = await connection.get_raw_connection()
+            driver = raw.driver_connection
+            assert driver is not None, "pooled connection has no driver connection"
+            transaction = driver.transaction(readonly=True)
+            await transaction.start()
+            runner = AsyncpgRunner(driver, self._prepared)
+            await runner.limit(*timeouts)
+        except _UNREACHABLE as exc:
+            if connection.sync_connection is not None:
+                await connection.invalidate()
+                await connection.close()
+            raise EndpointUnavailableError(f"{endpoint.name}: {exc}") from exc
+        try:
+            yield runner
+        except BaseException:
+            try:
+                await transaction.rollback()
+            except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError):
+                # Still busy with an abandoned statement; do not reuse it
+                await connection.invalidate()
+            raise
+        else:
+            await transaction.commit()
+        finally:
+            await connection.close()
+
+    async def _run(self, sql: str, key: ResultKey, cache: bool = True) -> QueryResult:
+        """Answer from memory if possible, else on a replica or the primary."""
+        import structlog
+
+        logger = structlog.get_logger()
+
+        source = None
+        if self._prefix_sums is not None:
+            value = self._prefix_sums.lookup(sql, generation=key[0])
+            if value is not None:
+                source = "prefix_sums"
+        if source is None and self._columnar is not None:
+            try:
+                value = await self._columnar.scalar(sql, generation=key[0])
+                source = "columnar"
+            except ColumnarFallback as exc:
+                logger.debug("columnar_fallback", sql=sql[:100], reason=str(exc))
+        if source is None:
+            endpoint = self._router.choose(generation=key[0])
+            try:
+                value = await self._run_on(endpoint, sql)
+            except EndpointUnavailableError as exc:
+                if endpoint is self._router.primary:
+                    raise
+                logger.warning("replica_failover", replica=endpoint.name, error=str(exc))
+                endpoint = self._router.fail_over(endpoint)
+                value = await self._run_on(endpoint, sql)
+            source = endpoint.name
+
+        # Debug logging to diagnose non-numeric results
+        logger.debug(
+            "sql_executed",
+            sql=sql[:100],
+            endpoint=source,
+            result_type=type(value).__name__,
+            result_value=str(value)[:100] if value is not None else None,
+        )
+
+        if value is None:
+            if cache:
+                self._results.put(key, 0)
+            return QueryResult(value=0)
+        if isinstance(value, bool):
+            raise SqlExecutionError(
+                f"SQL returned boolean ({value}), expected numeric. Query: {sql[:100]}"
+            )
+        # Handle int, float, and PostgreSQL Decimal types
+        if isinstance(value, (int, float, Decimal)):
+            if cache:
+                self._results.put(key, int(value))
+            return QueryResult(value=int(value))
+        raise SqlExecutionError(
+            f"SQL returned non-numeric result: {type(value).__name__} = {str(value)[:50]}. "
+            f"Query: {sql[:100]}"
+        )
+
+    async def _run_on(self, endpoint: Endpoint, sql: str) -> Any:
+        """Execute the query on one endpoint, preferring the rollup rewrite."""
         import structlog
 
         logger = structlog.get_logger()
         settings = get_settings()
 
+        rewritten = rewrite_for_rollup(sql) if settings.rollup_rewrite else None
+
+        started = time.perf_counter()
         try:
-            async with self._session_factory() as session:
-                result = await session.execute(
-                    text(sql).execution_options(timeout=settings.db_timeout)
-                )
-                value = result.scalar_one_or_none()
-
-                # Debug logging to diagnose non-numeric results
-                logger.debug(
-                    "sql_executed",
-                    sql=sql[:100],
-                    result_type=type(value).__name__,
-                    result_value=str(value)[:100] if value is not None else None,
-                )
-
-                if value is None:
-                    return QueryResult(value=0)
-                if isinstance(value, bool):
-                    raise SqlExecutionError(
-                        f"SQL returned boolean ({value}), expected numeric. Query: {sql[:100]}"
-                    )
-                # Handle int, float, and PostgreSQL Decimal types
-                if isinstance(value, (int, float, Decimal)):
-                    return QueryResult(value=int(value))
-                raise SqlExecutionError(
-                    f"SQL returned non-numeric result: {type(value).__name__} = {str(value)[:50]}. "
-                    f"Query: {sql[:100]}"
-                )
+            value = None
+            if rewritten is not None:
+                try:
+                    value = await self._scalar(endpoint, rewritten)
+                    logger.debug("sql_rollup_rewrite", sql=sql[:100], rewritten=rewritten)
+                except _STATEMENT_ERRORS as exc:
+                    logger.warning("sql_rollup_rewrite_failed", sql=sql[:100], error=str(exc))
+                    rewritten = None
+            if rewritten is None:
+                value = await self._scalar(endpoint, sql)
+        except EndpointUnavailableError:
+            raise
         except Exception as exc:
+            self._router.record(endpoint, (time.perf_counter() - started) * 1000, failed=True)
             if isinstance(exc, SqlExecutionError):
                 raise
             raise SqlExecutionError(f"SQL execution failed: {exc}") from exc
+        self._router.record(endpoint, (time.perf_counter() - started) * 1000)
+        return value
+
+    async def _scalar(self, endpoint: Endpoint, statement: str) -> Any:
+        """Run one statement through admission control and return its scalar.
+
+        The plan is read on its own checkout, which is returned before
+        the slot is awaited; the statement's connection is checked out
+        only once it is admitted.
+
+        Raises:
+            QueryRejectedError: If the plan is over a limit or no slot is free
+            QueryTimeoutError: If the statement ran out of time
+        """
+        settings = get_settings()
+        if not settings.query_admission:
+            async with self._runner(endpoint) as runner:
+                return await self._limited_scalar(endpoint, runner, statement)
+
+        async with self._runner(endpoint) as runner:
+            estimate = parse_plan(await runner.explain(statement))
+        verdict = self._gate.check(estimate)
+        if verdict in _REJECT_REASONS:
+            raise QueryRejectedError(_REJECT_REASONS[verdict], estimate)
+        try:
+            async with self._gate.slot(verdict, settings.db_timeout):
+                async with self._runner(endpoint) as runner:
+                    started = time.perf_counter()
+                    value = await self._limited_scalar(endpoint, runner, statement)
+                self._gate.record(estimate, (time.perf_counter() - started) * 1000)
+        except AdmissionBusyError as exc:
+            raise QueryRejectedError("busy", estimate) from exc
+        return value
+
+    async def _limited_scalar(
+        self, endpoint: Endpoint, runner: StatementRunner, statement: str
+    ) -> Any:
+        """Execute a statement, cancelling it on the server if the client gives up.
+
+        Raises:
+            QueryTimeoutError: If the server or the client stopped the statement
+        """
+        settings = get_settings()
+        self._statements += 1
+        try:
+            async with asyncio.timeout(settings.db_timeout + _CLIENT_GRACE_SECONDS):
+                return await runner.scalar(statement)
+        except TimeoutError as exc:
+            self._client_timeouts += 1
+            if runner.pid is not None:
+                await self._cancel_backend(endpoint, runner.pid)
+            raise QueryTimeoutError(f"Query abandoned after {settings.db_timeout}s") from exc
+        except runner.errors as exc:
+            sqlstate = runner.sqlstate(exc)
+            if sqlstate == _QUERY_CANCELED:
+                self._statement_timeouts += 1
+                raise QueryTimeoutError(f"Query exceeded {settings.db_timeout}s") from exc
+            if sqlstate == _LOCK_NOT_AVAILABLE:
+                self._lock_timeouts += 1
+                raise QueryTimeoutError(
+                    f"Query waited over {settings.db_lock_timeout_ms}ms for a lock"
+                ) from exc
+            raise
+
+    async def _cancel_backend(self, endpoint: Endpoint, pid: int) -> None:
+        """Ask the endpoint to cancel whatever its backend ``pid`` is running."""
+        import structlog
+
+        logger = structlog.get_logger()
+        engine = self._cancel_engines.get(endpoint.url)
+        if engine is None:
+            # Unpooled: the stuck statement may hold the last connection of the pool
+            engine = self._cancel_engines[endpoint.url] = create_async_engine(
+                endpoint.url, poolclass=NullPool
+            )
+        try:
+            async with asyncio.timeout(get_settings().db_timeout):
+                async with engine.connect() as connection:
+                    await connection.execute(text("SELECT pg_cancel_backend(:pid)"), {"pid": pid})
+            self._cancels_sent += 1
+        except (SQLAlchemyError, TimeoutError) as exc:
+            self._cancel_failures += 1
+            logger.warning("sql_cancel_failed", pid=pid, error=str(exc))
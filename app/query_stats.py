@@ -0,0 +1,115 @@
+"""Per-fingerprint query statistics.
+
+Every executed query is attributed to the fingerprint of its canonical
+template (see ``app.sql_guard.canonicalize``), so the same question
+asked about different dates or creators is tracked as one entity, much
+like ``pg_stat_statements`` does on the server.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+@dataclass
+class _Entry:
+    template: str
+    calls: int = 0
+    cache_hits: int = 0
+    executions: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+@dataclass(frozen=True)
+class FingerprintStats:
+    """Counters of one query shape."""
+
+    fingerprint: str
+    template: str
+    calls: int
+    cache_hits: int
+    executions: int
+    errors: int
+    mean_ms: float
+    max_ms: float
+
+
+@dataclass(frozen=True)
+class QueryStatsSnapshot:
+    """The busiest query shapes, by total execution time."""
+
+    fingerprints: int
+    evicted: int
+    top: list[FingerprintStats] = field(default_factory=list)
+
+
+class QueryStats:
+    """Bounded registry of per-fingerprint counters.
+
+    When more than ``max_fingerprints`` shapes have been seen, the least
+    recently used one is forgotten.
+    """
+
+    def __init__(self, max_fingerprints: int = 1000, top: int = 5) -> None:
+        if max_fingerprints < 1:
+            raise ValueError("max_fingerprints must be at least 1")
+        self._max = max_fingerprints
+        self._top = top
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._evicted = 0
+
+    def _entry(self, fingerprint: str, template: str) -> _Entry:
+        entry = self._entries.get(fingerprint)
+        if entry is None:
+            entry = self._entries[fingerprint] = _Entry(template=template)
+            if len(self._entries) > self._max:
+                self._entries.popitem(last=False)
+                self._evicted += 1
+        else:
+            self._entries.move_to_end(fingerprint)
+        return entry
+
+    def record_hit(self, fingerprint: str, template: str) -> None:
+        """Count a call answered from the result cache or a shared flight."""
+        entry = self._entry(fingerprint, template)
+        entry.calls += 1
+        entry.cache_hits += 1
+
+    def record_execution(
+        self, fingerprint: str, template: str, elapsed_ms: float, failed: bool = False
+    ) -> None:
+        """Count a call that ran on the database."""
+        entry = self._entry(fingerprint, template)
+        entry.calls += 1
+        entry.executions += 1
+        entry.errors += failed
+        entry.total_ms += elapsed_ms
+        entry.max_ms = max(entry.max_ms, elapsed_ms)
+
+    def get(self, fingerprint: str) -> FingerprintStats | None:
+        """Return the counters of one fingerprint, if it is tracked."""
+        entry = self._entries.get(fingerprint)
+        return None if entry is None else _freeze(fingerprint, entry)
+
+    def snapshot(self) -> QueryStatsSnapshot:
+        """Return the shapes with the highest total execution time."""
+        busiest = sorted(self._entries.items(), key=lambda item: item[1].total_ms, reverse=True)
+        return QueryStatsSnapshot(
+            fingerprints=len(self._entries),
+            evicted=self._evicted,
+            top=[_freeze(fingerprint, entry) for fingerprint, entry in busiest[: self._top]],
+        )
+
+
+def _freeze(fingerprint: str, entry: _Entry) -> FingerprintStats:
+    return FingerprintStats(
+        fingerprint=fingerprint,
+        template=entry.template,
+        calls=entry.calls,
+        cache_hits=entry.cache_hits,
+        executions=entry.executions,
+        errors=entry.errors,
+        mean_ms=entry.total_ms / entry.executions if entry.executions else 0.0,
+        max_ms=entry.max_ms,
+    )
@@ -0,0 +1,136 @@
+"""Question-to-SQL cache in front of the LLM.
+
+Questions are reduced to a normalized key so that trivially different
+phrasings of the same dashboard question share one cached SQL query:
+case, punctuation and whitespace are ignored, Russian word forms are
+folded to a common stem, and relative dates are resolved to absolute
+ISO dates (so "вчера" asked on different days never collides).
+
+The LLM is not told the current date, so for relative dates it writes
+clock-relative SQL (``CURRENT_DATE - INTERVAL '1 day'``). Such SQL is
+never cached: under a key resolved yesterday it would answer for today.
+"""
+
+import re
+from collections.abc import Callable
+from datetime import date, timedelta
+
+from app.cache import CacheStats, LruCache
+from app.config import get_settings
+from app.llm import LlmResponse, SqlGenerator
+from app.singleflight import SingleFlight, SingleFlightStats
+from app.sql_guard import canonicalize
+
+_WORD_RE = re.compile(r"[0-9a-zа-я]+(?:-[0-9a-zа-я]+)*")
+_CYRILLIC_RE = re.compile(r"^[а-я]+$")
+
+# Relative day words mapped to their offset from today
+_RELATIVE_DAYS = {
+    "позавчера": -2,
+    "вчера": -1,
+    "сегодня": 0,
+    "завтра": 1,
+}
+
+# Inflectional endings stripped by the light stemmer, longest first
+_ENDINGS = sorted(
+    (
+        "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ией",
+        "ах", "ях", "ов", "ев", "ей", "ий", "ый", "ой", "ая", "яя", "ое", "ее", "ые", "ие",
+        "ам", "ям", "ом", "ем", "ую", "юю", "ию",
+        "а", "я", "о", "е", "ы", "и", "у", "ю", "ь",
+    ),
+    key=len,
+    reverse=True,
+)  # fmt: skip
+_MIN_STEM = 3
+
+
+def _stem(word: str) -> str:
+    """Fold a Russian word form to a stem by stripping a known ending.
+
+    This is deliberately a light suffix stripper rather than a full
+    morphological analyzer: it only has to map the forms users type
+    ("просмотры", "просмотров", "просмотрам") onto one key.
+    """
+    if not _CYRILLIC_RE.match(word):
+        return word
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[: -len(ending)]
+    return word
+
+
+def normalize_question(question: str, today: date | None = None) -> str:
+    """Reduce a question to its cache key.
+
+    Args:
+        question: Natural language question in Russian
+        today: Reference date for relative dates (defaults to today)
+
+    Returns:
+        str: Normalized key
+
+    Example:
+        >>> normalize_question("Сколько  ПРОСМОТРОВ было вчера?", date(2025, 12, 2))
+        'скольк просмотр был 2025-12-01'
+    """
+    today = today or date.today()
+    tokens: list[str] = []
+    for word in _WORD_RE.findall(question.lower().replace("ё", "е")):
+        offset = _RELATIVE_DAYS.get(word)
+        if offset is not None:
+            tokens.append((today + timedelta(days=offset)).isoformat())
+        else:
+            tokens.append(_stem(word))
+    return " ".join(tokens)
+
+
+class CachingSqlGenerator:
+    """SQL generator that serves repeated questions from an LRU+TTL cache.
+
+    Wraps another generator (normally ``OpenRouterClient``) and only
+    forwards questions whose normalized key is not cached yet. Only
+    validated SQL is ever stored, because the wrapped generator raises
+    instead of returning SQL that failed the guard, and only if it does
+    not read the clock. Concurrent misses for
+    the same key are coalesced into a single call of the wrapped generator.
+    """
+
+    def __init__(
+        self,
+        generator: SqlGenerator,
+        cache: LruCache[str, str] | None = None,
+        today: Callable[[], date] = date.today,
+    ) -> None:
+        if cache is None:
+            settings = get_settings()
+            cache = LruCache(
+                max_entries=settings.sql_cache_max_entries,
+                ttl_seconds=settings.sql_cache_ttl_seconds,
+            )
+        self._generator = generator
+        self._cache = cache
+        self._today = today
+        self._flights: SingleFlight[str, LlmResponse] = SingleFlight()
+
+    async def generate_sql(self, user_question: str) -> LlmResponse:
+        key = normalize_question(user_question, self._today())
+        cached = self._cache.get(key)
+        if cached is not None:
+            return LlmResponse(sql=cached)
+        return await self._flights.do(key, lambda: self._generate(key, user_question))
+
+    async def _generate(self, key: str, user_question: str) -> LlmResponse:
+        response = await self._generator.generate_sql(user_question)
+        if not canonicalize(response.sql).volatile:
+            self._cache.put(key, response.sql)
+        return response
+
+    def stats(self) -> CacheStats:
+        """Return hit/miss/eviction counters of the question cache."""
+        return self._cache.stats()
+
+    def flight_stats(self) -> SingleFlightStats:
+        """Return how many concurrent LLM calls were collapsed."""
+        return self._flights.stats()
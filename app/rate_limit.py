@@ -0,0 +1,258 @@
+"""Token-bucket rate limiting of questions.
+
+Every user has a bucket of ``burst`` tokens that refills one token per
+``interval`` seconds; a question takes a token or is refused. A global
+bucket on top bounds the questions of all users together, e.g. to stay
+under Telegram's limit on messages a bot may send.
+
+A bucket is stored as a single number, the time at which it will be
+full again (the "generic cell rate algorithm" form of a token bucket).
+A bucket whose time has passed is full, which is the same as not having
+one, so it is dropped; memory is bounded by the users active within the
+last ``burst * interval`` seconds.
+
+Buckets live in a backend: ``MemoryBackend`` for one process, or
+``SqliteBackend`` to share limits between bot processes on one host.
+A question takes a token from the user's and the global bucket at once,
+or from neither, so a refused question never costs the user a token.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Protocol
+
+# SqliteBackend deletes full buckets every this many acquisitions
+_SWEEP_EVERY = 256
+
+GLOBAL_KEY = "global"
+
+
+@dataclass(frozen=True)
+class RateDecision:
+    """Outcome of a rate limit check."""
+
+    allowed: bool
+    retry_after: float  # Seconds until a question would be allowed
+    limit: str | None = None  # "user" or "global" when refused
+
+
+@dataclass(frozen=True)
+class RateLimitStats:
+    """Counters of rate limit decisions."""
+
+    checked: int
+    allowed: int
+    limited_user: int
+    limited_global: int
+    buckets: int  # Buckets currently stored in the backend
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """A token bucket to take from."""
+
+    key: str
+    interval: float  # Seconds to refill one token
+    burst: int  # Bucket capacity
+
+
+class RateLimitBackend(Protocol):
+    """Storage of token buckets."""
+
+    async def acquire(self, buckets: Sequence[Bucket], now: float) -> tuple[Bucket | None, float]:
+        """Take a token from every bucket in ``buckets``, or from none of them.
+
+        Args:
+            buckets: Buckets with distinct keys
+            now: Current Unix time
+
+        Returns:
+            tuple: None and 0 if the tokens were taken, otherwise the first
+                bucket with no token left and seconds until it has one
+        """
+        ...
+
+    def size(self) -> int:
+        """Return the number of stored buckets."""
+        ...
+
+
+def _take(full_at: float | None, interval: float, burst: int, now: float) -> float | None:
+    """Return the bucket's new full-at time, or None if it has no token left.
+
+    A bucket full at ``full_at`` holds ``burst - (full_at - now) / interval``
+    tokens; taking one moves ``full_at`` an ``interval`` later.
+    """
+    taken = max(full_at or now, now) + interval
+    return taken if taken - now <= burst * interval else None
+
+
+def _retry_after(full_at: float, interval: float, burst: int, now: float) -> float:
+    """Return the seconds until the refused bucket has a token again."""
+    return full_at + interval - now - burst * interval
+
+
+def _take_all(
+    buckets: Sequence[Bucket], full_ats: Sequence[float | None], now: float
+) -> tuple[list[float], Bucket | None, float]:
+    """Return the buckets' new full-at times, or the first bucket with no token left.
+
+    Nothing is taken until every bucket has been checked, so the new
+    times are empty whenever a bucket refuses.
+    """
+    taken: list[float] = []
+    for bucket, full_at in zip(buckets, full_ats, strict=True):
+        after = _take(full_at, bucket.interval, bucket.burst, now)
+        if after is None:
+            assert full_at is not None  # An empty bucket always has an entry
+            return [], bucket, _retry_after(full_at, bucket.interval, bucket.burst, now)
+        taken.append(after)
+    return taken, None, 0.0
+
+
+class MemoryBackend:
+    """Buckets in a dict of full-at times, oldest touched first."""
+
+    def __init__(self) -> None:
+        self._buckets: OrderedDict[str, float] = OrderedDict()
+
+    async def acquire(self, buckets: Sequence[Bucket], now: float) -> tuple[Bucket | None, float]:
+        self._evict(now)
+        full_ats = [self._buckets.get(bucket.key) for bucket in buckets]
+        taken, refused, wait = _take_all(buckets, full_ats, now)
+        for bucket, full_at in zip(buckets, taken, strict=False):
+            self._buckets[bucket.key] = full_at
+            self._buckets.move_to_end(bucket.key)
+        return refused, wait
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+    def _evict(self, now: float) -> None:
+        # Buckets are touched in order, so the full ones are mostly at the front
+        while self._buckets:
+            key, full_at = next(iter(self._buckets.items()))
+            if full_at > now:
+                return
+            del self._buckets[key]
+
+
+class SqliteBackend:
+    """Buckets in a SQLite file shared by all bot processes on the host."""
+
+    def __init__(self, path: str) -> None:
+        self._connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False, timeout=5.0
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets "
+            "(key TEXT PRIMARY KEY, full_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._lock = threading.Lock()
+        self._acquisitions = 0
+
+    async def acquire(self, buckets: Sequence[Bucket], now: float) -> tuple[Bucket | None, float]:
+        return await asyncio.to_thread(self._acquire, buckets, now)
+
+    def size(self) -> int:
+        with self._lock:
+            return int(self._connection.execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0])
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _acquire(self, buckets: Sequence[Bucket], now: float) -> tuple[Bucket | None, float]:
+        with self._lock:
+            connection = self._connection
+            # IMMEDIATE takes the write lock up front, so two processes
+            # cannot both read the same bucket and take its last token
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                full_ats = []
+                for bucket in buckets:
+                    row = connection.execute(
+                        "SELECT full_at FROM rate_buckets WHERE key = ?", (bucket.key,)
+                    ).fetchone()
+                    full_ats.append(row[0] if row else None)
+                taken, refused, wait = _take_all(buckets, full_ats, now)
+                connection.executemany(
+                    "INSERT INTO rate_buckets (key, full_at) VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET full_at = excluded.full_at",
+                    [
+                        (bucket.key, full_at)
+                        for bucket, full_at in zip(buckets, taken, strict=False)
+                    ],
+                )
+                self._acquisitions += 1
+                if self._acquisitions % _SWEEP_EVERY == 0:
+                    connection.execute("DELETE FROM rate_buckets WHERE full_at <= ?", (now,))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return refused, wait
+
+
+class RateLimiter:
+    """Per-user and global token buckets.
+
+    Args:
+        backend: Bucket storage
+        interval: Seconds for a user's bucket to refill one token
+        burst: Questions a user may send at once
+        global_interval: Seconds for the global bucket to refill one token; 0 disables it
+        global_burst: Capacity of the global bucket
+        clock: Source of Unix time, shared by all processes using the backend
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        interval: float,
+        burst: int,
+        global_interval: float = 0.0,
+        global_burst: int = 1,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._backend = backend
+        self._interval = interval
+        self._burst = burst
+        self._global_interval = global_interval
+        self._global_burst = global_burst
+        self._clock = clock
+        self._checked = 0
+        self._allowed = 0
+        self._limited_user = 0
+        self._limited_global = 0
+
+    async def check(self, user_id: int) -> RateDecision:
+        """Take a token for a question from ``user_id``'s and the global bucket together."""
+        self._checked += 1
+        buckets = [Bucket(f"user:{user_id}", self._interval, self._burst)]
+        if self._global_interval:
+            buckets.append(Bucket(GLOBAL_KEY, self._global_interval, self._global_burst))
+        refused, wait = await self._backend.acquire(buckets, self._clock())
+        if refused is None:
+            self._allowed += 1
+            return RateDecision(allowed=True, retry_after=0.0)
+        if refused.key == GLOBAL_KEY:
+            self._limited_global += 1
+            return RateDecision(allowed=False, retry_after=wait, limit="global")
+        self._limited_user += 1
+        return RateDecision(allowed=False, retry_after=wait, limit="user")
+
+    def stats(self) -> RateLimitStats:
+        """Return decision counters and the number of stored buckets."""
+        return RateLimitStats(
+            checked=self._checked,
+            allowed=self._allowed,
+            limited_user=self._limited_user,
+            limited_global=self._limited_global,
+            buckets=self._backend.size(),
+        )
@@ -0,0 +1,201 @@
+"""Read-replica routing for generated analytics queries.
+
+Validated read-only queries are spread round-robin over the replicas in
+DATABASE_REPLICA_URLS; the primary (DATABASE_URL), which also takes the
+loader's writes, only answers when no replica qualifies.
+
+A replica qualifies when its last health check succeeded, its
+replication lag is within REPLICA_MAX_LAG_SECONDS, and it has replayed
+the data generation the executor is about to cache results under (see
+``app.models.DataGeneration``). The last condition keeps a lagging
+replica from answering a question with pre-load data that would then be
+cached as current.
+
+Any Postgres instance works as a stand-in replica: an instance that is
+not in recovery reports no lag, so local databases can exercise routing
+and failover in tests.
+"""
+
+import asyncio
+import itertools
+import math
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db import get_engine
+
+# Lag is zero when the replica has replayed everything it received; an
+# idle primary would otherwise make the replay timestamp look stale
+HEALTH_SQL = """
+SELECT
+    CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END AS lag_seconds,
+    (SELECT generation FROM data_generation WHERE id = 1) AS generation
+"""
+
+# Weight of the newest sample in the per-endpoint latency average
+_LATENCY_ALPHA = 0.2
+
+
+@dataclass
+class Endpoint:
+    """A database endpoint and what the router knows about it."""
+
+    name: str
+    url: str
+    healthy: bool = False
+    lag_seconds: float = math.inf
+    generation: int = -1
+    queries: int = 0
+    failures: int = 0
+    latency_ms: float = 0.0  # Exponentially weighted moving average
+
+    @property
+    def host(self) -> str:
+        """Return ``host:port/database`` without credentials."""
+        url = make_url(self.url)
+        return f"{url.host}:{url.port or 5432}/{url.database}"
+
+
+@dataclass(frozen=True)
+class EndpointStats:
+    """Counters of one endpoint."""
+
+    name: str
+    host: str
+    healthy: bool
+    lag_seconds: float
+    generation: int
+    queries: int
+    failures: int
+    latency_ms: float
+
+
+@dataclass(frozen=True)
+class ReplicaStats:
+    """Routing counters across endpoints."""
+
+    replica_queries: int
+    primary_queries: int
+    failovers: int
+    endpoints: list[EndpointStats] = field(default_factory=list)
+
+
+class ReplicaRouter:
+    """Pick the endpoint for each read and track endpoint health."""
+
+    def __init__(
+        self,
+        primary_url: str,
+        replica_urls: list[str],
+        max_lag_seconds: float,
+        probe: Callable[[Endpoint], Awaitable[tuple[Any, Any]]] | None = None,
+    ) -> None:
+        self.primary = Endpoint(name="primary", url=primary_url, healthy=True, lag_seconds=0.0)
+        self.replicas = [
+            Endpoint(name=f"replica{index}", url=url) for index, url in enumerate(replica_urls, 1)
+        ]
+        self._max_lag = max_lag_seconds
+        self._probe = probe or _probe
+        self._turn = itertools.count()
+        self._failovers = 0
+
+    def choose(self, generation: int) -> Endpoint:
+        """Return the next qualifying replica, or the primary if there is none.
+
+        Args:
+            generation: Data generation the result will be cached under
+        """
+        eligible = [
+            replica
+            for replica in self.replicas
+            if replica.healthy
+            and replica.lag_seconds <= self._max_lag
+            and replica.generation >= generation
+        ]
+        if not eligible:
+            return self.primary
+        return eligible[next(self._turn) % len(eligible)]
+
+    def record(self, endpoint: Endpoint, elapsed_ms: float, failed: bool = False) -> None:
+        """Record the latency of a query answered by ``endpoint``."""
+        endpoint.queries += 1
+        endpoint.failures += failed
+        if endpoint.queries == 1:
+            endpoint.latency_ms = elapsed_ms
+        else:
+            endpoint.latency_ms += _LATENCY_ALPHA * (elapsed_ms - endpoint.latency_ms)
+
+    def fail_over(self, endpoint: Endpoint) -> Endpoint:
+        """Take an unreachable replica out of rotation and return the primary.
+
+        The replica rejoins after its next successful health check.
+        """
+        endpoint.healthy = False
+        endpoint.failures += 1
+        self._failovers += 1
+        return self.primary
+
+    async def check(self, timeout: float) -> None:
+        """Probe every replica for health, lag and replayed data generation."""
+        await asyncio.gather(*(self._check(replica, timeout) for replica in self.replicas))
+
+    async def _check(self, replica: Endpoint, timeout: float) -> None:
+        import structlog
+
+        logger = structlog.get_logger()
+        was_healthy = replica.healthy
+        try:
+            async with asyncio.timeout(timeout):
+                lag, generation = await self._probe(replica)
+        except (SQLAlchemyError, OSError) as exc:  # TimeoutError is an OSError
+            replica.healthy = False
+            if was_healthy:
+                logger.warning("replica_down", replica=replica.name, error=str(exc))
+            return
+        replica.healthy = True
+        replica.lag_seconds = math.inf if lag is None else float(lag)
+        replica.generation = -1 if generation is None else int(generation)
+        if not was_healthy:
+            logger.info("replica_up", replica=replica.name, lag_seconds=replica.lag_seconds)
+
+    async def monitor(self, interval: float, timeout: float) -> None:
+        """Re-check the replicas every ``interval`` seconds, forever."""
+        while True:
+            await self.check(timeout)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> ReplicaStats:
+        """Return routing counters and the state of every endpoint."""
+        return ReplicaStats(
+            replica_queries=sum(replica.queries for replica in self.replicas),
+            primary_queries=self.primary.queries,
+            failovers=self._failovers,
+            endpoints=[
+                EndpointStats(
+                    name=endpoint.name,
+                    host=endpoint.host,
+                    healthy=endpoint.healthy,
+                    lag_seconds=endpoint.lag_seconds,
+                    generation=endpoint.generation,
+                    queries=endpoint.queries,
+                    failures=endpoint.failures,
+                    latency_ms=endpoint.latency_ms,
+                )
+                for endpoint in (self.primary, *self.replicas)
+            ],
+        )
+
+
+async def _probe(endpoint: Endpoint) -> tuple[Any, Any]:
+    async with get_engine(endpoint.url).connect() as connection:
+        row = (await connection.execute(text(HEALTH_SQL))).one()
+    return row.lag_seconds, row.generation
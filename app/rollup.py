@@ -0,0 +1,112 @@
+"""Daily rollup tables and aggregate-aware query rewriting.
+
+``video_daily_stats`` and ``creator_daily_stats`` hold per-day sums of
+the snapshot deltas. The loader refreshes them after every load, and
+``rewrite_for_rollup`` routes eligible generated SQL to them so that
+per-day and per-creator aggregates no longer scan hourly snapshots.
+"""
+
+from datetime import date
+
+from sqlglot import exp
+
+from app.sql_shapes import COUNT_METRIC, DELTA_METRICS, match_delta_query
+
+VIDEO_ROLLUP = "video_daily_stats"
+CREATOR_ROLLUP = "creator_daily_stats"
+
+_SUMS = ", ".join(f"SUM(s.{metric})" for metric in DELTA_METRICS)
+_COLUMNS = ", ".join(DELTA_METRICS)
+
+
+def rollup_refresh_statements(since: date | None = None) -> list[str]:
+    """Return the SQL statements that rebuild the rollups.
+
+    Args:
+        since: First day to rebuild; None rebuilds everything
+
+    Returns:
+        list[str]: Statements to run, in order, in the load transaction
+    """
+    day_filter = f"WHERE day >= DATE '{since.isoformat()}'" if since else ""
+    snapshot_filter = f"WHERE s.created_at >= DATE '{since.isoformat()}'" if since else ""
+    return [
+        f"DELETE FROM {VIDEO_ROLLUP} {day_filter}",
+        f"DELETE FROM {CREATOR_ROLLUP} {day_filter}",
+        (
+            f"INSERT INTO {VIDEO_ROLLUP} (video_id, day, {_COLUMNS}, snapshot_count) "
+            f"SELECT s.video_id, DATE(s.created_at), {_SUMS}, COUNT(*) "
+            f"FROM video_snapshots s {snapshot_filter} GROUP BY 1, 2"
+        ),
+        (
+            f"INSERT INTO {CREATOR_ROLLUP} (creator_id, day, {_COLUMNS}, snapshot_count) "
+            f"SELECT v.creator_id, DATE(s.created_at), {_SUMS}, COUNT(*) "
+            f"FROM video_snapshots s JOIN videos v ON v.id = s.video_id {snapshot_filter} "
+            "GROUP BY 1, 2"
+        ),
+    ]
+
+
+def rollup_trim_statements(before: date) -> list[str]:
+    """Return the SQL statements that drop rollup days before ``before``.
+
+    Used by retention after old snapshot partitions have been dropped.
+    """
+    return [
+        f"DELETE FROM {table} WHERE day < DATE '{before.isoformat()}'"
+        for table in (VIDEO_ROLLUP, CREATOR_ROLLUP)
+    ]
+
+
+def rewrite_for_rollup(sql: str) -> str | None:
+    """Rewrite a day-granular delta aggregate to read from a rollup table.
+
+    Returns None when the query cannot be answered from the rollups, in
+    which case it must run against the base tables unchanged.
+
+    Example:
+        >>> rewrite_for_rollup(
+        ...     "SELECT SUM(delta_views_count) FROM video_snapshots "
+        ...     "WHERE DATE(created_at) = '2025-12-01'"
+        ... )
+        "SELECT SUM(delta_views_count) FROM creator_daily_stats \
+WHERE day >= '2025-12-01' AND day < '2025-12-02'"
+    """
+    query = match_delta_query(sql)
+    if query is None or (query.video_id is not None and query.creator_id is not None):
+        return None
+
+    if query.video_id is not None:
+        table, key = (
+            VIDEO_ROLLUP,
+            exp.EQ(this=exp.column("video_id"), expression=exp.Literal.string(query.video_id)),
+        )
+    elif query.creator_id is not None:
+        table, key = (
+            CREATOR_ROLLUP,
+            exp.EQ(this=exp.column("creator_id"), expression=exp.Literal.string(query.creator_id)),
+        )
+    else:
+        # Every snapshot belongs to exactly one creator, so global sums use the smaller table
+        table, key = CREATOR_ROLLUP, None
+
+    if query.metric == COUNT_METRIC:
+        projection = "COALESCE(SUM(snapshot_count), 0)"
+    else:
+        projection = f"SUM({query.metric})"
+    conditions: list[exp.Expression] = []
+    if query.start is not None:
+        conditions.append(
+            exp.GTE(this=exp.column("day"), expression=exp.Literal.string(query.start.isoformat()))
+        )
+    if query.end is not None:
+        conditions.append(
+            exp.LT(this=exp.column("day"), expression=exp.Literal.string(query.end.isoformat()))
+        )
+    if key is not None:
+        conditions.append(key)
+
+    rewritten = exp.select(projection).from_(table)
+    if conditions:
+        rewritten = rewritten.where(exp.and_(*conditions))
+    return rewritten.sql(dialect="postgres")
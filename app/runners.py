@@ -0,0 +1,288 @@
+"""Statement runners behind ``QueryExecutor``.
+
+A runner executes statements inside one read-only transaction.
+``SessionRunner`` goes through an SQLAlchemy ``AsyncSession``.
+``AsyncpgRunner`` uses the asyncpg connection under a pooled engine
+connection. It skips the session and ``text()`` result machinery.
+Parameterized query shapes (see ``app.sql_guard.canonicalize``) run as
+prepared statements, kept in a per-connection LRU. A recurring shape is
+parsed and planned by Postgres once per connection, not once per date
+or creator asked about.
+
+Parameters come out of the canonical template as Python literals; they
+are coerced to the types Postgres inferred for the placeholders. A
+value that cannot be coerced losslessly (``views_count > 1.5`` against
+a bigint placeholder) makes the runner execute the literal SQL instead,
+so results never differ from the session path.
+"""
+
+import weakref
+from collections.abc import Sequence
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Protocol
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import LruCache
+from app.sql_guard import SqlParam, canonicalize
+
+
+class StatementRunner(Protocol):
+    """Executes statements inside one read-only transaction."""
+
+    errors: tuple[type[Exception], ...]  # Exceptions raised for failed statements
+    pid: int | None  # Server process of the connection, for cancellation
+
+    async def limit(self, statement_timeout_ms: int, lock_timeout_ms: int) -> None:
+        """Bound the run time and lock waits of the transaction."""
+        ...
+
+    def savepoint(self) -> AbstractAsyncContextManager[Any]:
+        """Return a context manager that rolls back to a savepoint on error."""
+        ...
+
+    async def explain(self, statement: str) -> Any:
+        """Return the ``EXPLAIN (FORMAT JSON)`` output of a statement."""
+        ...
+
+    async def scalar(self, statement: str) -> Any:
+        """Execute a statement and return its single value."""
+        ...
+
+    def sqlstate(self, exc: Exception) -> str | None:
+        """Return the Postgres SQLSTATE of a failed statement, if known."""
+        ...
+
+
+class SessionRunner:
+    """Run statements through an SQLAlchemy session."""
+
+    errors: tuple[type[Exception], ...] = (SQLAlchemyError,)
+
+    def __init__(self, session: AsyncSession, pid: int | None) -> None:
+        self._session = session
+        self.pid = pid
+
+    @classmethod
+    async def create(cls, session: AsyncSession) -> "SessionRunner":
+        """Wrap a session, looking up the server pid of its connection."""
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        get_server_pid = getattr(raw.driver_connection, "get_server_pid", None)
+        return cls(session, get_server_pid() if get_server_pid is not None else None)
+
+    async def limit(self, statement_timeout_ms: int, lock_timeout_ms: int) -> None:
+        # set_config(..., true) is SET LOCAL in one round trip; the settings
+        # end with the transaction, so pooled connections keep their defaults
+        await self._session.execute(
+            text(
+                "SELECT set_config('transaction_read_only', 'on', true), "
+                "set_config('statement_timeout', :statement_timeout, true), "
+                "set_config('lock_timeout', :lock_timeout, true)"
+            ),
+            {
+                "statement_timeout": str(statement_timeout_ms),
+                "lock_timeout": str(lock_timeout_ms),
+            },
+        )
+
+    def savepoint(self) -> AbstractAsyncContextManager[Any]:
+        return self._session.begin_nested()
+
+    async def explain(self, statement: str) -> Any:
+        return await self._session.scalar(text(f"EXPLAIN (FORMAT JSON) {statement}"))
+
+    async def scalar(self, statement: str) -> Any:
+        result = await self._session.execute(text(statement))
+        return result.scalar_one_or_none()
+
+    def sqlstate(self, exc: Exception) -> str | None:
+        return getattr(exc.orig, "sqlstate", None) if isinstance(exc, DBAPIError) else None
+
+
+class ParamCoercionError(ValueError):
+    """Raised when a literal cannot be bound losslessly to a placeholder type."""
+
+
+_TEXT_TYPES = frozenset({"text", "varchar", "bpchar", "name", "uuid"})
+_INT_TYPES = frozenset({"int2", "int4", "int8"})
+
+
+def coerce_param(value: SqlParam, type_name: str, zone: ZoneInfo) -> Any:
+    """Convert a template literal to the Python type asyncpg binds for ``type_name``.
+
+    Args:
+        value: Literal taken out of the canonical template
+        type_name: Postgres type inferred for its placeholder
+        zone: Session time zone, applied to naive ``timestamptz`` literals
+
+    Returns:
+        Any: Value asyncpg can encode for the placeholder
+
+    Raises:
+        ParamCoercionError: If the conversion could change the query's meaning
+
+    Example:
+        >>> coerce_param("2025-11-28", "date", ZoneInfo("UTC"))
+        datetime.date(2025, 11, 28)
+    """
+    try:
+        if type_name in _TEXT_TYPES and isinstance(value, str):
+            return value
+        if type_name in _INT_TYPES:
+            number = Decimal(value)
+            if number != number.to_integral_value():
+                raise ParamCoercionError(f"{value!r} is not an integer")
+            return int(number)
+        if type_name == "numeric":
+            return Decimal(value)
+        if type_name in ("float4", "float8"):
+            return float(value)
+        if isinstance(value, str):
+            if type_name == "date":
+                return date.fromisoformat(value)
+            if type_name == "timestamp":
+                return datetime.fromisoformat(value).replace(tzinfo=None)
+            if type_name == "timestamptz":
+                moment = datetime.fromisoformat(value)
+                return moment if moment.tzinfo else moment.replace(tzinfo=zone)
+    except (ValueError, ArithmeticError) as exc:
+        raise ParamCoercionError(f"cannot bind {value!r} as {type_name}") from exc
+    raise ParamCoercionError(f"cannot bind {value!r} as {type_name}")
+
+
+@dataclass(frozen=True)
+class PreparedStatementStats:
+    """Snapshot of prepared statement cache counters."""
+
+    connections: int
+    statements: int
+    hits: int
+    misses: int
+    prepare_failures: int
+    literal_fallbacks: int  # Executions that bypassed the cache
+
+
+class PreparedStatementCache:
+    """Per-connection LRU of prepared statements keyed by query template.
+
+    Entries belong to the asyncpg connection they were prepared on and
+    vanish with it. Statements evicted from the LRU are deallocated by
+    asyncpg once nothing references them.
+    """
+
+    def __init__(self, max_statements: int) -> None:
+        if max_statements < 1:
+            raise ValueError("max_statements must be at least 1")
+        self._max = max_statements
+        self._connections: weakref.WeakKeyDictionary[
+            asyncpg.Connection, LruCache[str, PreparedStatement]
+        ] = weakref.WeakKeyDictionary()
+        self._hits = 0
+        self._misses = 0
+        self._prepare_failures = 0
+        self._literal_fallbacks = 0
+
+    async def get(self, connection: asyncpg.Connection, template: str) -> PreparedStatement | None:
+        """Return the prepared statement of a template, preparing it on a miss.
+
+        Returns ``None`` if Postgres cannot prepare the template, e.g. when
+        it cannot infer a placeholder's type.
+        """
+        statements = self._connections.get(connection)
+        if statements is None:
+            statements = self._connections[connection] = LruCache(max_entries=self._max)
+        prepared = statements.get(template)
+        if prepared is not None:
+            self._hits += 1
+            return prepared
+        self._misses += 1
+        try:
+            # A failed Parse aborts the transaction; keep it to a savepoint
+            async with connection.transaction():
+                prepared = await connection.prepare(template)
+        except asyncpg.PostgresError:
+            self._prepare_failures += 1
+            return None
+        statements.put(template, prepared)
+        return prepared
+
+    def record_fallback(self) -> None:
+        """Count an execution of literal SQL instead of a cached statement."""
+        self._literal_fallbacks += 1
+
+    def stats(self) -> PreparedStatementStats:
+        """Return prepared statement cache counters."""
+        caches = list(self._connections.values())
+        return PreparedStatementStats(
+            connections=len(caches),
+            statements=sum(cache.stats().size for cache in caches),
+            hits=self._hits,
+            misses=self._misses,
+            prepare_failures=self._prepare_failures,
+            literal_fallbacks=self._literal_fallbacks,
+        )
+
+
+class AsyncpgRunner:
+    """Run statements directly on an asyncpg connection."""
+
+    errors: tuple[type[Exception], ...] = (asyncpg.PostgresError,)
+
+    def __init__(self, connection: asyncpg.Connection, prepared: PreparedStatementCache) -> None:
+        self._connection = connection
+        self._prepared = prepared
+        self.pid: int | None = connection.get_server_pid()
+
+    async def limit(self, statement_timeout_ms: int, lock_timeout_ms: int) -> None:
+        # Read-only mode is set when the transaction starts; both SETs go in
+        # one simple-protocol round trip
+        await self._connection.execute(
+            f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}; "
+            f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"
+        )
+
+    def savepoint(self) -> AbstractAsyncContextManager[Any]:
+        transaction: AbstractAsyncContextManager[Any] = self._connection.transaction()
+        return transaction
+
+    async def explain(self, statement: str) -> Any:
+        return await self._connection.fetchval(f"EXPLAIN (FORMAT JSON) {statement}")
+
+    async def scalar(self, statement: str) -> Any:
+        query = canonicalize(statement)
+        if not query.params:
+            return await self._connection.fetchval(statement)
+        prepared = await self._prepared.get(self._connection, query.template)
+        if prepared is not None:
+            try:
+                args = self._coerce(query.params, prepared.get_parameters())
+            except ParamCoercionError:
+                pass
+            else:
+                return await prepared.fetchval(*args)
+        self._prepared.record_fallback()
+        return await self._connection.fetchval(statement)
+
+    def sqlstate(self, exc: Exception) -> str | None:
+        return getattr(exc, "sqlstate", None)
+
+    def _coerce(self, params: Sequence[SqlParam], types: Sequence[Any]) -> list[Any]:
+        try:
+            zone = ZoneInfo(self._connection.get_settings().TimeZone)
+        except (ZoneInfoNotFoundError, ValueError, AttributeError) as exc:
+            raise ParamCoercionError("unknown session time zone") from exc
+        if len(params) != len(types):
+            raise ParamCoercionError("placeholder count mismatch")
+        return [
+            coerce_param(value, pg_type.name, zone)
+            for value, pg_type in zip(params, types, strict=True)
+        ]
@@ -0,0 +1,240 @@
+"""Nearest-neighbour question cache for paraphrases.
+
+The exact cache in ``app.question_cache`` only matches questions that
+normalize to the same key. This cache also matches paraphrases such as
+"сколько просмотров 1 декабря" and "просмотры за первое декабря".
+
+Each question is split into entities (resolved dates, creator ids,
+numbers, metrics and aggregates, see ``app.intents.extract_entities``)
+and the remaining words. The words are embedded as hashed character
+3-gram vectors, which need no model and tolerate Russian inflection. A
+cached question's SQL is reused when its cosine similarity is at least
+SEMANTIC_CACHE_THRESHOLD and its entities are identical, so a paraphrase
+about another day, creator or metric never shares SQL.
+
+Vectors live in an inverted index (n-gram bucket -> entry weights), so a
+lookup only scores entries that share n-grams with the question. Entries
+are evicted least recently used and expire after SQL_CACHE_TTL_SECONDS.
+As in the exact cache, SQL that reads the clock is never stored.
+With SEMANTIC_CACHE_PATH set, the cache is saved on shutdown and loaded
+at startup.
+"""
+
+import json
+import math
+import os
+import time
+import zlib
+from array import array
+from collections import Counter, OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+from app.intents import Entities, extract_entities
+from app.llm import LlmResponse, SqlGenerator
+from app.question_cache import normalize_question
+from app.sql_guard import canonicalize
+
+# Hash space of the n-gram vectors; collisions only add noise to similarity
+_BUCKETS = 1 << 20
+_NGRAM = 3
+_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class SemanticCacheStats:
+    """Lookup counters of the semantic cache."""
+
+    entries: int
+    hits: int
+    misses: int
+    entity_mismatches: int  # Similar wording, but about something else
+    evictions: int
+    mean_similarity: float  # Of hits
+    mean_us: float
+
+
+@dataclass
+class _Entry:
+    question: str
+    sql: str
+    entities: frozenset[str]
+    words: str
+    buckets: "array[int]"
+    created: float
+
+
+def embed(words: str) -> dict[int, float]:
+    """Return the L2-normalized hashed character 3-gram vector of ``words``.
+
+    Words are stemmed first (see ``app.question_cache``), so inflected
+    forms of one word produce the same n-grams.
+    """
+    text = f" {normalize_question(words)} "
+    counts = Counter(
+        zlib.crc32(text[i : i + _NGRAM].encode()) % _BUCKETS for i in range(len(text) - _NGRAM + 1)
+    )
+    weights = {bucket: 1 + math.log(count) for bucket, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {bucket: weight / norm for bucket, weight in weights.items()} if norm else {}
+
+
+class SemanticSqlCache:
+    """SQL generator that reuses the SQL of a similar question about the same entities.
+
+    Wraps another generator (normally ``OpenRouterClient``) and forwards
+    only questions without a close enough cached neighbour.
+    """
+
+    def __init__(
+        self,
+        generator: SqlGenerator,
+        threshold: float,
+        max_entries: int,
+        ttl_seconds: float,
+        today: Callable[[], date] = date.today,
+    ) -> None:
+        self._generator = generator
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._today = today
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._postings: dict[int, dict[int, float]] = {}
+        self._next_id = 0
+        self._hits = 0
+        self._misses = 0
+        self._entity_mismatches = 0
+        self._evictions = 0
+        self._similarity = 0.0
+        self._total_us = 0.0
+
+    async def generate_sql(self, user_question: str) -> LlmResponse:
+        entities = extract_entities(user_question, self._today())
+        if entities is None:
+            return await self._generator.generate_sql(user_question)
+        cached = self.lookup(entities)
+        if cached is not None:
+            return LlmResponse(sql=cached)
+        response = await self._generator.generate_sql(user_question)
+        self.put(user_question, entities, response.sql)
+        return response
+
+    def lookup(self, entities: Entities) -> str | None:
+        """Return the SQL of the most similar cached question with the same entities."""
+        started = time.perf_counter()
+        scores: dict[int, float] = {}
+        for bucket, weight in embed(entities.words).items():
+            for entry_id, entry_weight in self._postings.get(bucket, {}).items():
+                scores[entry_id] = scores.get(entry_id, 0.0) + weight * entry_weight
+
+        found = None
+        now = time.time()
+        for entry_id, score in sorted(scores.items(), key=lambda item: -item[1]):
+            if score < self._threshold:
+                break
+            entry = self._entries[entry_id]
+            if now - entry.created > self._ttl:
+                self._remove(entry_id)
+            elif entry.entities != entities.values:
+                self._entity_mismatches += 1
+            else:
+                self._entries.move_to_end(entry_id)
+                self._similarity += score
+                found = entry.sql
+                break
+        self._total_us += (time.perf_counter() - started) * 1_000_000
+        if found is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return found
+
+    def put(
+        self, question: str, entities: Entities, sql: str, created: float | None = None
+    ) -> None:
+        """Cache the SQL generated for ``question``, evicting the least recently used entry."""
+        if canonicalize(sql).volatile:
+            return  # Means another day once the date changes
+        vector = embed(entities.words)
+        if not vector:
+            return  # Nothing but entities to compare, e.g. a bare date
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = _Entry(
+            question=question,
+            sql=sql,
+            entities=entities.values,
+            words=entities.words,
+            buckets=array("I", vector),
+            created=time.time() if created is None else created,
+        )
+        for bucket, weight in vector.items():
+            self._postings.setdefault(bucket, {})[entry_id] = weight
+        while len(self._entries) > self._max_entries:
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        for bucket in entry.buckets:
+            posting = self._postings[bucket]
+            del posting[entry_id]
+            if not posting:
+                del self._postings[bucket]
+
+    def stats(self) -> SemanticCacheStats:
+        """Return hit, miss and eviction counters."""
+        lookups = self._hits + self._misses
+        return SemanticCacheStats(
+            entries=len(self._entries),
+            hits=self._hits,
+            misses=self._misses,
+            entity_mismatches=self._entity_mismatches,
+            evictions=self._evictions,
+            mean_similarity=self._similarity / self._hits if self._hits else 0.0,
+            mean_us=self._total_us / lookups if lookups else 0.0,
+        )
+
+    def save(self, path: Path) -> None:
+        """Write the cache to ``path`` atomically, oldest entry first."""
+        payload = {
+            "version": _FORMAT_VERSION,
+            "entries": [
+                {
+                    "question": entry.question,
+                    "sql": entry.sql,
+                    "entities": sorted(entry.entities),
+                    "words": entry.words,
+                    "created": entry.created,
+                }
+                for entry in self._entries.values()
+            ],
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.tmp")
+        temporary.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(temporary, path)
+
+    def load(self, path: Path) -> int:
+        """Add the unexpired entries saved at ``path``; return how many were loaded.
+
+        A missing file or a file from another format version loads nothing.
+        """
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return 0
+        if payload.get("version") != _FORMAT_VERSION:
+            return 0
+        now = time.time()
+        loaded = 0
+        for item in payload["entries"]:
+            if now - item["created"] > self._ttl:
+                continue
+            entities = Entities(frozenset(item["entities"]), item["words"])
+            self.put(item["question"], entities, item["sql"], created=item["created"])
+            loaded += 1
+        return loaded
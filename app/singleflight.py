@@ -0,0 +1,65 @@
+"""Coalescing of concurrent identical work.
+
+When many callers ask for the same key at the same time, only the first
+one (the leader) runs the work; the others (followers) await the
+leader's result instead of repeating the LLM call or database query.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class SingleFlightStats:
+    """Snapshot of coalescing counters."""
+
+    in_flight: int
+    leaders: int
+    collapsed: int
+
+
+class SingleFlight(Generic[K, V]):
+    """Run at most one call per key at a time and share its outcome.
+
+    The work runs in its own task, so a cancelled leader does not cancel
+    the followers waiting on the same key. Exceptions are propagated to
+    every waiter. Nothing is cached once the call completes.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[K, asyncio.Future[V]] = {}
+        self._leaders = 0
+        self._collapsed = 0
+
+    def __contains__(self, key: object) -> bool:
+        """Return True if a call for ``key`` is currently running."""
+        return key in self._calls
+
+    async def do(self, key: K, work: Callable[[], Awaitable[V]]) -> V:
+        """Return the result of ``work``, sharing it with concurrent callers of ``key``."""
+        task = self._calls.get(key)
+        if task is None:
+            self._leaders += 1
+            task = asyncio.ensure_future(work())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._collapsed += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: K, done: asyncio.Future[V]) -> None:
+        if self._calls.get(key) is done:
+            del self._calls[key]
+
+    def stats(self) -> SingleFlightStats:
+        """Return coalescing counters."""
+        return SingleFlightStats(
+            in_flight=len(self._calls),
+            leaders=self._leaders,
+            collapsed=self._collapsed,
+        )
@@ -4,11 +4,24 @@ Provides multi-layer security for LLM-generated SQL queries:
 1. Extraction: Parse SQL from markdown/text wrappers
 2. Structure validation: Ensure SELECT-only, aggregate functions
 3. Forbidden keyword detection: Block destructive operations
+4. Predicate rewriting: Turn function-wrapped timestamp predicates into
+   half-open ranges that can use the created_at indexes and partitions
 
 All validation failures raise SqlValidationError with descriptive messages.
 """
 
+import hashlib
 import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from sqlglot.optimizer.normalize_identifiers import normalize_identifiers
+
+SqlParam = str | int | Decimal
 
 
 class SqlValidationError(ValueError):
@@ -21,6 +34,22 @@ class SqlValidationError(ValueError):
     pass
 
 
+@dataclass(frozen=True)
+class CanonicalQuery:
+    """Canonical form of a validated query.
+
+    Queries that differ only in formatting, keyword or identifier case,
+    table aliases or compared literal values share a ``template`` and a
+    ``fingerprint``; caches and statistics key on those.
+    """
+
+    sql: str  # Canonical text with literals inline (executable)
+    template: str  # Canonical text with compared literals as $1..$n
+    params: tuple[SqlParam, ...]
+    fingerprint: str
+    volatile: bool = False  # Result depends on when the query runs, e.g. NOW()
+
+
 # Validation patterns
 _SELECT_ONLY_RE = re.compile(r"^\s*select\s", re.IGNORECASE)
 _FORBIDDEN_RE = re.compile(
@@ -30,6 +59,55 @@ _FORBIDDEN_RE = re.compile(
 _CODE_FENCE_RE = re.compile(r"```(?:sql)?(.*?)```", re.IGNORECASE | re.DOTALL)
 _FIRST_SELECT_RE = re.compile(r"select\s+.*", re.IGNORECASE | re.DOTALL)
 _AGGREGATE_RE = re.compile(r"\b(count|sum|avg|min|max)\s*\(", re.IGNORECASE)
+# Quoted literals and identifiers are copied verbatim during canonicalization
+_QUOTED_RE = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_WHITESPACE_RE = re.compile(r"\s+")
+# Functions whose value changes between runs over the same data
+_VOLATILE_NODES = (
+    exp.CurrentDate,
+    exp.CurrentTime,
+    exp.CurrentTimestamp,
+    exp.CurrentDatetime,
+    exp.Localtime,
+    exp.Localtimestamp,
+    exp.Rand,
+)
+_VOLATILE_NAMES = frozenset(
+    {"now", "clock_timestamp", "statement_timestamp", "transaction_timestamp", "timeofday"}
+)
+# Postgres date/time input strings that resolve relative to the current time
+_RELATIVE_TIME_LITERALS = frozenset({"now", "today", "tomorrow", "yesterday"})
+_VOLATILE_RE = re.compile(
+    r"\b(current_date|current_time|current_timestamp|localtime|localtimestamp|random|"
+    r"now|clock_timestamp|statement_timestamp|transaction_timestamp|timeofday)\b"
+    r"|'(now|today|tomorrow|yesterday)'",
+    re.IGNORECASE,
+)
+# Operators whose literal operands become template parameters
+_PARAMETERIZED_IN = (
+    exp.EQ,
+    exp.NEQ,
+    exp.GT,
+    exp.GTE,
+    exp.LT,
+    exp.LTE,
+    exp.Between,
+    exp.In,
+    exp.Like,
+    exp.ILike,
+)
+
+# Timestamp columns of the schema whose wrapped predicates are rewritten
+_TIMESTAMP_COLUMNS = frozenset({"created_at", "updated_at", "video_created_at"})
+_COMPARISONS = (exp.EQ, exp.GT, exp.GTE, exp.LT, exp.LTE)
+# Comparison with its operands swapped: 'd' < DATE(col) is DATE(col) > 'd'
+_FLIPPED: dict[type[exp.Expression], type[exp.Expression]] = {
+    exp.EQ: exp.EQ,
+    exp.GT: exp.LT,
+    exp.GTE: exp.LTE,
+    exp.LT: exp.GT,
+    exp.LTE: exp.GTE,
+}
 
 
 def _extract_sql(raw: str) -> str:
@@ -72,6 +150,7 @@ def validate_sql(sql: str) -> str:
     2. Verifies query starts with SELECT
     3. Checks for forbidden keywords (INSERT, UPDATE, etc.)
     4. Ensures aggregate function is present
+    5. Rewrites function-wrapped date predicates into ranges
 
     Args:
         sql: Raw SQL string from LLM
@@ -104,4 +183,317 @@ def validate_sql(sql: str) -> str:
         raise SqlValidationError("SQL must use an aggregate function (COUNT, SUM, AVG, MIN, MAX)")
 
     # Clean trailing semicolon for consistency
-    return cleaned.strip().rstrip(";")
+    cleaned = cleaned.strip().rstrip(";")
+
+    # Layer 4: Make date predicates index- and partition-friendly
+    return rewrite_sargable(cleaned)
+
+
+def rewrite_sargable(sql: str) -> str:
+    """Rewrite function-wrapped timestamp predicates into half-open ranges.
+
+    ``DATE(col)``, ``col::date`` and ``EXTRACT(YEAR FROM col)`` hide the
+    column from its indexes. Comparisons of those expressions with a
+    literal are replaced by an equivalent range on the bare column,
+    evaluated in the same session time zone, e.g. ``DATE(created_at) =
+    '2025-11-28'`` becomes ``created_at >= '2025-11-28' AND created_at <
+    '2025-11-29'``. ``EXTRACT(YEAR ...) = y AND EXTRACT(MONTH ...) = m``
+    on the same column becomes a one-month range.
+
+    SQL without such predicates, or that cannot be parsed, is returned
+    unchanged.
+
+    Args:
+        sql: Validated SQL query
+
+    Returns:
+        str: Equivalent query with sargable date predicates
+
+    Example:
+        >>> rewrite_sargable(
+        ...     "SELECT COUNT(*) FROM video_snapshots WHERE created_at::date > '2025-11-28'"
+        ... )
+        "SELECT COUNT(*) FROM video_snapshots WHERE created_at >= '2025-11-29'"
+    """
+    try:
+        tree = sqlglot.parse_one(sql, read="postgres")
+    except SqlglotError:
+        return sql  # PostgreSQL will judge what sqlglot cannot parse
+    rewritten = tree.transform(_rewrite_year_month).transform(_rewrite_predicate)
+    if rewritten == tree:
+        return sql
+    return rewritten.sql(dialect="postgres")
+
+
+def _timestamp_column(node: exp.Expression | None) -> exp.Column | None:
+    if isinstance(node, exp.Column) and node.name.lower() in _TIMESTAMP_COLUMNS:
+        return node
+    return None
+
+
+def _day_of(node: exp.Expression) -> exp.Column | None:
+    """Return the column of ``DATE(col)`` or ``col::date``."""
+    if isinstance(node, exp.Date) and not node.expressions and not node.args.get("zone"):
+        return _timestamp_column(node.this)
+    if isinstance(node, exp.Cast) and node.to.is_type(exp.DataType.Type.DATE):
+        return _timestamp_column(node.this)
+    return None
+
+
+def _extract_of(node: exp.Expression, part: str) -> exp.Column | None:
+    """Return the column of ``EXTRACT(<part> FROM col)``."""
+    if isinstance(node, exp.Extract) and node.name.upper() == part:
+        return _timestamp_column(node.expression)
+    return None
+
+
+def _date_literal(node: exp.Expression | None) -> date | None:
+    if isinstance(node, exp.Cast) and node.to.is_type(exp.DataType.Type.DATE):
+        node = node.this
+    if not isinstance(node, exp.Literal) or not node.is_string:
+        return None
+    try:
+        return date.fromisoformat(node.name)
+    except ValueError:
+        return None
+
+
+def _int_literal(node: exp.Expression | None) -> int | None:
+    if isinstance(node, exp.Literal) and node.name.isdigit():
+        return int(node.name)
+    return None
+
+
+def _range(column: exp.Column, op: type[exp.Expression], start: date, end: date) -> exp.Expr:
+    """Translate ``f(column) <op> value`` where f maps [start, end) to value."""
+
+    def bound(comparison: type[exp.Expression], day: date) -> exp.Expression:
+        return comparison(this=column.copy(), expression=exp.Literal.string(day.isoformat()))
+
+    if op is exp.GTE:
+        return bound(exp.GTE, start)
+    if op is exp.GT:
+        return bound(exp.GTE, end)
+    if op is exp.LTE:
+        return bound(exp.LT, end)
+    if op is exp.LT:
+        return bound(exp.LT, start)
+    return exp.and_(bound(exp.GTE, start), bound(exp.LT, end))
+
+
+def _wrap(node: exp.Expr, original: exp.Expression) -> exp.Expr:
+    # A conjunction replacing a single comparison keeps its grouping
+    if isinstance(node, exp.And) and not isinstance(original.parent, (exp.And, exp.Where)):
+        return exp.Paren(this=node)
+    return node
+
+
+def _rewrite_predicate(node: exp.Expression) -> exp.Expr:
+    if isinstance(node, exp.Between):
+        column = _day_of(node.this)
+        low = _date_literal(node.args.get("low"))
+        high = _date_literal(node.args.get("high"))
+        if column is None or low is None or high is None:
+            return node
+        return _wrap(_range(column, exp.EQ, low, high + timedelta(days=1)), node)
+
+    if not isinstance(node, _COMPARISONS):
+        return node
+    op: type[exp.Expression] = type(node)
+    left, right = node.this, node.expression
+    if _date_literal(left) is not None or _int_literal(left) is not None:
+        left, right, op = right, left, _FLIPPED[op]
+
+    column = _day_of(left)
+    day = _date_literal(right)
+    if column is not None and day is not None:
+        return _wrap(_range(column, op, day, day + timedelta(days=1)), node)
+
+    column = _extract_of(left, "YEAR")
+    year = _int_literal(right)
+    if column is not None and year is not None and 1 <= year < date.max.year:
+        return _wrap(_range(column, op, date(year, 1, 1), date(year + 1, 1, 1)), node)
+    return node
+
+
+def _equality_part(node: exp.Expr, part: str) -> tuple[exp.Column, int] | None:
+    """Match ``EXTRACT(<part> FROM col) = n``, returning (col, n)."""
+    if not isinstance(node, exp.EQ):
+        return None
+    for left, right in ((node.this, node.expression), (node.expression, node.this)):
+        column = _extract_of(left, part)
+        value = _int_literal(right)
+        if column is not None and value is not None:
+            return column, value
+    return None
+
+
+def _rewrite_year_month(node: exp.Expression) -> exp.Expr:
+    if not isinstance(node, exp.And) or isinstance(node.parent, exp.And):
+        return node
+    conjuncts = list(node.flatten())
+    years: dict[str, tuple[int, exp.Column, int]] = {}
+    months: dict[str, tuple[int, int]] = {}
+    for index, conjunct in enumerate(conjuncts):
+        if (match := _equality_part(conjunct, "YEAR")) is not None:
+            years[match[0].sql()] = (index, match[0], match[1])
+        elif (match := _equality_part(conjunct, "MONTH")) is not None:
+            months[match[0].sql()] = (index, match[1])
+
+    replaced: dict[int, exp.Expr | None] = {}
+    for key, (year_index, column, year) in years.items():
+        if key not in months:
+            continue
+        month_index, month = months[key]
+        if not 1 <= month <= 12 or not 1 <= year < date.max.year:
+            continue
+        start = date(year, month, 1)
+        end = date(year + month // 12, month % 12 + 1, 1)
+        replaced[year_index] = _range(column, exp.EQ, start, end)
+        replaced[month_index] = None
+    if not replaced:
+        return node
+    kept = [replaced.get(index, conjunct) for index, conjunct in enumerate(conjuncts)]
+    return exp.and_(
+        *(
+            part
+            for conjunct in kept
+            if conjunct is not None
+            for part in (conjunct.flatten() if isinstance(conjunct, exp.And) else [conjunct])
+        )
+    )
+
+
+def _canonical_text(sql: str) -> str:
+    """Collapse whitespace and fold unquoted text to lower case.
+
+    Fallback for SQL that sqlglot cannot parse: quoted string literals and
+    quoted identifiers are kept exactly as written.
+    """
+    parts = _QUOTED_RE.split(sql.strip().rstrip(";").strip())
+    # re.split with one capture group alternates unquoted/quoted segments
+    for index in range(0, len(parts), 2):
+        parts[index] = _WHITESPACE_RE.sub(" ", parts[index].lower())
+    return "".join(parts).strip()
+
+
+def _fingerprint(template: str) -> str:
+    return hashlib.blake2b(template.encode(), digest_size=8).hexdigest()
+
+
+def canonicalize(sql: str) -> CanonicalQuery:
+    """Return the canonical form, parameters and fingerprint of a query.
+
+    The query is parsed into an AST and regenerated, so whitespace and
+    keyword case no longer matter. Unquoted identifiers are folded to lower
+    case, table aliases are renamed to ``t1``, ``t2``, ... in order of
+    appearance, and output column aliases that nothing refers to are
+    dropped. Literals compared against columns are then replaced by
+    ``$1``, ``$2``, ... placeholders, so the same question asked about a
+    different date or creator shares one fingerprint. Queries that read
+    the clock (``NOW()``, ``CURRENT_DATE``, ``'today'::date``) or call
+    ``random()`` are marked ``volatile``.
+
+    Args:
+        sql: Validated SQL query
+
+    Returns:
+        CanonicalQuery: Canonical text, template, parameters and fingerprint
+
+    Example:
+        >>> query = canonicalize(
+        ...     "select count(*) from Videos v where v.creator_id = 'AbC';"
+        ... )
+        >>> query.template
+        'SELECT COUNT(*) FROM videos AS t1 WHERE t1.creator_id = $1'
+        >>> query.params
+        ('AbC',)
+    """
+    try:
+        tree = sqlglot.parse_one(sql, read="postgres")
+    except SqlglotError:
+        text = _canonical_text(sql)
+        return CanonicalQuery(
+            sql=text,
+            template=text,
+            params=(),
+            fingerprint=_fingerprint(text),
+            volatile=_VOLATILE_RE.search(text) is not None,
+        )
+
+    tree = normalize_identifiers(tree, dialect="postgres")
+    _rename_table_aliases(tree)
+    _drop_unused_column_aliases(tree)
+    canonical = tree.sql(dialect="postgres")
+    volatile = _is_volatile(tree)  # Before literals become placeholders
+    params = _parameterize(tree)
+    template = tree.sql(dialect="postgres")
+    return CanonicalQuery(
+        sql=canonical,
+        template=template,
+        params=params,
+        fingerprint=_fingerprint(template),
+        volatile=volatile,
+    )
+
+
+def _is_volatile(tree: exp.Expr) -> bool:
+    """Return whether the query reads the clock or a random source."""
+    for node in tree.walk():
+        if isinstance(node, _VOLATILE_NODES):
+            return True
+        if isinstance(node, exp.Anonymous) and node.name.lower() in _VOLATILE_NAMES:
+            return True
+        if (
+            isinstance(node, exp.Literal)
+            and node.is_string
+            and node.name.strip().lower() in _RELATIVE_TIME_LITERALS
+        ):
+            return True
+    return False
+
+
+def _rename_table_aliases(tree: exp.Expr) -> None:
+    tables = list(tree.find_all(exp.Table))
+    names = [(table.alias or table.name).lower() for table in tables]
+    subqueries = {subquery.alias.lower() for subquery in tree.find_all(exp.Subquery)}
+    if len(set(names)) != len(names) or subqueries & set(names):
+        return  # Reused names would need scope analysis; keep them as written
+    aliases = {name: f"t{index}" for index, name in enumerate(names, 1)}
+    for table, name in zip(tables, names, strict=True):
+        table.set("alias", exp.TableAlias(this=exp.to_identifier(aliases[name])))
+    # With a single table, qualified and bare column references are the same
+    single = len(tables) == 1 and not subqueries
+    for column in tree.find_all(exp.Column):
+        if column.table.lower() in aliases:
+            qualifier = None if single else exp.to_identifier(aliases[column.table.lower()])
+            column.set("table", qualifier)
+
+
+def _drop_unused_column_aliases(tree: exp.Expr) -> None:
+    if not isinstance(tree, exp.Select):
+        return
+    referenced = {column.name for column in tree.find_all(exp.Column) if not column.table}
+    for projection in tree.expressions:
+        if isinstance(projection, exp.Alias) and projection.alias not in referenced:
+            projection.replace(projection.this)
+
+
+def _literal_value(literal: exp.Literal) -> SqlParam:
+    if literal.is_string:
+        return literal.name
+    text = literal.name
+    return int(text) if text.isdigit() else Decimal(text)
+
+
+def _parameterize(tree: exp.Expr) -> tuple[SqlParam, ...]:
+    params: list[SqlParam] = []
+    for literal in list(tree.find_all(exp.Literal, bfs=False)):
+        owner = literal.parent
+        if isinstance(owner, exp.Cast):
+            owner = owner.parent
+        if not isinstance(owner, _PARAMETERIZED_IN):
+            continue
+        params.append(_literal_value(literal))
+        literal.replace(exp.Parameter(this=exp.Literal.number(len(params))))
+    return tuple(params)
@@ -0,0 +1,328 @@
+"""Recognition of common analytics query shapes.
+
+Most questions reduce to "sum a snapshot delta (or count snapshots) over
+a range of days, optionally for one video or one creator". This module
+parses validated SQL and, when it has exactly that meaning, returns a
+structured description that faster execution paths (rollup tables,
+in-memory indexes) can answer without scanning raw snapshots.
+
+Matching is deliberately conservative: any construct that is not fully
+understood makes the query ineligible, and the caller runs it as is.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+SNAPSHOTS = "video_snapshots"
+VIDEOS = "videos"
+
+DELTA_METRICS = (
+    "delta_views_count",
+    "delta_likes_count",
+    "delta_comments_count",
+    "delta_reports_count",
+)
+COUNT_METRIC = "count"
+
+_SNAPSHOT_ONLY_COLUMNS = {"video_id", *DELTA_METRICS}
+_VIDEO_ONLY_COLUMNS = {"creator_id", "video_created_at", "content_hash"}
+_ALLOWED_SELECT_ARGS = {"expressions", "from_", "joins", "where", "kind"}
+# A timestamp literal that falls exactly on midnight, e.g. '2025-12-01' or '2025-12-01 00:00:00'
+_MIDNIGHT_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:[ T]00:00(?::00(?:\.0+)?)?)?$")
+
+
+@dataclass(frozen=True)
+class DeltaQuery:
+    """SUM of a delta metric, or COUNT(*) of snapshots, over a day range.
+
+    ``start`` is inclusive and ``end`` exclusive; None means unbounded.
+    Days are calendar days in the database session time zone, the same
+    days ``DATE(created_at)`` produces.
+    """
+
+    metric: str
+    start: date | None = None
+    end: date | None = None
+    video_id: str | None = None
+    creator_id: str | None = None
+
+
+class _NotEligible(Exception):
+    pass
+
+
+def match_delta_query(sql: str) -> DeltaQuery | None:
+    """Describe ``sql`` as a DeltaQuery, or return None if it has another shape.
+
+    Args:
+        sql: Validated SQL query
+
+    Returns:
+        DeltaQuery | None: Structured description of the query
+
+    Example:
+        >>> match_delta_query(
+        ...     "SELECT SUM(delta_views_count) FROM video_snapshots "
+        ...     "WHERE DATE(created_at) = '2025-12-01'"
+        ... )
+        DeltaQuery(metric='delta_views_count', start=datetime.date(2025, 12, 1), \
+end=datetime.date(2025, 12, 2), video_id=None, creator_id=None)
+    """
+    try:
+        tree = sqlglot.parse_one(sql, read="postgres")
+    except SqlglotError:
+        return None
+    try:
+        return _match(tree)
+    except _NotEligible:
+        return None
+
+
+def _match(tree: exp.Expr) -> DeltaQuery:
+    if not isinstance(tree, exp.Select):
+        raise _NotEligible
+    if any(value for key, value in tree.args.items() if key not in _ALLOWED_SELECT_ARGS):
+        raise _NotEligible
+
+    tables = _resolve_tables(tree)
+    metric = _match_metric(tree.expressions, tables)
+
+    start: date | None = None
+    end: date | None = None
+    video_id: str | None = None
+    creator_id: str | None = None
+    where = tree.args.get("where")
+    predicates = _conjuncts(where.this) if where is not None else []
+    for predicate in predicates:
+        day_range = _match_day_range(predicate, tables)
+        if day_range is not None:
+            low, high = day_range
+            if low is not None:
+                start = low if start is None else max(start, low)
+            if high is not None:
+                end = high if end is None else min(end, high)
+            continue
+        column, value = _match_equality(predicate, tables)
+        if column == "video_id":
+            if video_id is not None and video_id != value:
+                raise _NotEligible
+            video_id = value
+        else:
+            if creator_id is not None and creator_id != value:
+                raise _NotEligible
+            creator_id = value
+    return DeltaQuery(metric=metric, start=start, end=end, video_id=video_id, creator_id=creator_id)
+
+
+def _resolve_tables(tree: exp.Select) -> dict[str, str]:
+    """Map every table alias to its table; require snapshots [JOIN videos]."""
+    from_ = tree.args.get("from_")
+    if from_ is None or not isinstance(from_.this, exp.Table):
+        raise _NotEligible
+    tables: dict[str, str] = {}
+    _add_table(from_.this, tables)
+    joins = tree.args.get("joins") or []
+    if len(joins) > 1:
+        raise _NotEligible
+    for join in joins:
+        if join.side or join.kind not in ("", "INNER") or join.args.get("using"):
+            raise _NotEligible
+        if not isinstance(join.this, exp.Table):
+            raise _NotEligible
+        _add_table(join.this, tables)
+        if not _is_snapshot_video_join(join.args.get("on"), tables):
+            raise _NotEligible
+    if sorted(set(tables.values())) not in ([SNAPSHOTS], [SNAPSHOTS, VIDEOS]):
+        raise _NotEligible
+    if len(tables) != len(set(tables.values())):
+        raise _NotEligible
+    return tables
+
+
+def _add_table(table: exp.Table, tables: dict[str, str]) -> None:
+    if table.args.get("db") or table.args.get("catalog"):
+        raise _NotEligible
+    name = table.name.lower()
+    alias = (table.alias or table.name).lower()
+    if name not in (SNAPSHOTS, VIDEOS) or alias in tables:
+        raise _NotEligible
+    tables[alias] = name
+
+
+def _column(node: exp.Expression, tables: dict[str, str]) -> tuple[str, str] | None:
+    """Return (table, column) for a column reference, None for other nodes."""
+    if not isinstance(node, exp.Column):
+        return None
+    name = node.name.lower()
+    if node.table:
+        table = tables.get(node.table.lower())
+        if table is None:
+            raise _NotEligible
+        return table, name
+    # Only columns of a table in FROM resolve; anything else is an error in Postgres
+    if name in _SNAPSHOT_ONLY_COLUMNS:
+        if SNAPSHOTS not in tables.values():
+            raise _NotEligible
+        return SNAPSHOTS, name
+    if name in _VIDEO_ONLY_COLUMNS:
+        if VIDEOS not in tables.values():
+            raise _NotEligible
+        return VIDEOS, name
+    if VIDEOS in tables.values():
+        raise _NotEligible  # Ambiguous once videos is joined
+    return SNAPSHOTS, name
+
+
+def _is_snapshot_video_join(on: exp.Expression | None, tables: dict[str, str]) -> bool:
+    on = _unparen(on)
+    if not isinstance(on, exp.EQ):
+        return False
+    sides = {_column(on.this, tables), _column(on.expression, tables)}
+    return sides == {(SNAPSHOTS, "video_id"), (VIDEOS, "id")}
+
+
+def _match_metric(expressions: list[exp.Expression], tables: dict[str, str]) -> str:
+    if len(expressions) != 1:
+        raise _NotEligible
+    projection = expressions[0]
+    if isinstance(projection, exp.Alias):
+        projection = projection.this
+    if isinstance(projection, exp.Count) and isinstance(projection.this, exp.Star):
+        return COUNT_METRIC
+    if isinstance(projection, exp.Sum) and not projection.args.get("distinct"):
+        column = _column(projection.this, tables)
+        if column is not None and column[0] == SNAPSHOTS and column[1] in DELTA_METRICS:
+            return column[1]
+    raise _NotEligible
+
+
+def _conjuncts(node: exp.Expression) -> list[exp.Expression]:
+    unwrapped = _unparen(node)
+    if isinstance(unwrapped, exp.And):
+        return _conjuncts(unwrapped.this) + _conjuncts(unwrapped.expression)
+    return [node] if unwrapped is None else [unwrapped]
+
+
+def _unparen(node: exp.Expression | None) -> exp.Expression | None:
+    while isinstance(node, exp.Paren):
+        node = node.this
+    return node
+
+
+_FLIPPED: dict[type[exp.Binary], type[exp.Binary]] = {
+    exp.GT: exp.LT,
+    exp.GTE: exp.LTE,
+    exp.LT: exp.GT,
+    exp.LTE: exp.GTE,
+    exp.EQ: exp.EQ,
+}
+
+
+def _match_day_range(
+    predicate: exp.Expression, tables: dict[str, str]
+) -> tuple[date | None, date | None] | None:
+    """Translate a created_at predicate into a [start, end) day range."""
+    if isinstance(predicate, exp.Between):
+        if not _is_snapshot_day(predicate.this, tables):
+            return None
+        low = _date_literal(predicate.args.get("low"))
+        high = _date_literal(predicate.args.get("high"))
+        if low is None or high is None:
+            raise _NotEligible
+        return low, high + timedelta(days=1)
+
+    if not isinstance(predicate, (exp.GT, exp.GTE, exp.LT, exp.LTE, exp.EQ)):
+        return None
+    op: type[exp.Binary] = type(predicate)
+    left, right = predicate.this, predicate.expression
+    if _is_snapshot_day(right, tables) or _is_snapshot_created_at(right, tables):
+        left, right, op = right, left, _FLIPPED[op]
+
+    if _is_snapshot_day(left, tables):
+        day = _date_literal(right)
+        if day is None:
+            raise _NotEligible
+        next_day = day + timedelta(days=1)
+        return {
+            exp.EQ: (day, next_day),
+            exp.GTE: (day, None),
+            exp.GT: (next_day, None),
+            exp.LTE: (None, next_day),
+            exp.LT: (None, day),
+        }[op]
+
+    if _is_snapshot_created_at(left, tables):
+        # Only half-open ranges that start and end at midnight align with days
+        midnight = _midnight_literal(right)
+        if midnight is None or op not in (exp.GTE, exp.LT):
+            raise _NotEligible
+        return (midnight, None) if op is exp.GTE else (None, midnight)
+    return None
+
+
+def _is_snapshot_created_at(node: exp.Expression, tables: dict[str, str]) -> bool:
+    return _column(node, tables) == (SNAPSHOTS, "created_at")
+
+
+def _is_snapshot_day(node: exp.Expression, tables: dict[str, str]) -> bool:
+    """True for DATE(created_at) and created_at::date on the snapshots table."""
+    if isinstance(node, exp.Date) and not node.expressions:
+        return _is_snapshot_created_at(node.this, tables)
+    if isinstance(node, exp.Cast) and node.to.is_type(exp.DataType.Type.DATE):
+        return _is_snapshot_created_at(node.this, tables)
+    return False
+
+
+def _string_literal(node: exp.Expression | None) -> str | None:
+    if isinstance(node, exp.Cast) and node.to.is_type(
+        exp.DataType.Type.DATE, exp.DataType.Type.TIMESTAMP, exp.DataType.Type.TIMESTAMPTZ
+    ):
+        node = node.this
+    if isinstance(node, exp.Literal) and node.is_string:
+        return node.name
+    return None
+
+
+def _date_literal(node: exp.Expression | None) -> date | None:
+    value = _string_literal(node)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _midnight_literal(node: exp.Expression | None) -> date | None:
+    value = _string_literal(node)
+    match = _MIDNIGHT_RE.match(value) if value is not None else None
+    if match is None:
+        return None
+    try:
+        return date.fromisoformat(match.group(1))
+    except ValueError:
+        return None
+
+
+def _match_equality(predicate: exp.Expression, tables: dict[str, str]) -> tuple[str, str]:
+    """Match video_id = '...' or creator_id = '...' (either operand order)."""
+    if not isinstance(predicate, exp.EQ):
+        raise _NotEligible
+    for column_node, value_node in (
+        (predicate.this, predicate.expression),
+        (predicate.expression, predicate.this),
+    ):
+        column = _column(column_node, tables)
+        value = _string_literal(value_node)
+        if column is None or value is None:
+            continue
+        if column in ((SNAPSHOTS, "video_id"), (VIDEOS, "id")):
+            return "video_id", value
+        if column == (VIDEOS, "creator_id"):
+            return "creator_id", value
+    raise _NotEligible
@@ -0,0 +1,107 @@
+"""Incremental extraction of SQL from streamed LLM output.
+
+``app.sql_guard`` extracts the query from a finished completion. When the
+completion is streamed, ``SqlStreamExtractor`` is fed each chunk as it
+arrives and reports the statement as soon as it is complete, so the
+caller can close the stream instead of waiting for trailing text such
+as "This query counts..." or a second, alternative query.
+
+A statement starts after an opening code fence or at a line starting
+with SELECT, and ends at a semicolon outside quotes, at the closing
+fence, or, outside a fence, at a blank line with all parentheses closed.
+"""
+
+import re
+
+_FENCE = "```"
+# Opening fence with an optional language tag, up to the whitespace after it
+_FENCE_OPEN_RE = re.compile(r"```[A-Za-z]*\s")
+_LINE_SELECT_RE = re.compile(r"^[ \t]*select\b", re.IGNORECASE | re.MULTILINE)
+_BLANK_LINE_RE = re.compile(r"\n[ \t]*\n")
+
+
+class SqlStreamExtractor:
+    """Find the end of the first SQL statement in streamed text.
+
+    Example:
+        >>> extractor = SqlStreamExtractor()
+        >>> extractor.feed("```sql\\nSELECT COUNT(*)")
+        >>> extractor.feed(" FROM videos\\n```\\nThis counts all videos.")
+        'SELECT COUNT(*) FROM videos'
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._start: int | None = None  # Offset where the statement begins
+        self._fenced = False
+        self._position = 0  # Next offset to scan
+        self._quote: str | None = None
+        self._depth = 0
+        self.sql: str | None = None
+
+    @property
+    def text(self) -> str:
+        """Return everything received so far."""
+        return self._text
+
+    def feed(self, chunk: str) -> str | None:
+        """Add a chunk; return the statement once it is complete."""
+        if self.sql is not None:
+            return self.sql
+        self._text += chunk
+        if self._start is None and not self._find_start():
+            return None
+        return self._scan()
+
+    def finish(self) -> str:
+        """Return the complete statement, or all text if none was recognized."""
+        return self.sql if self.sql is not None else self._text
+
+    def _find_start(self) -> bool:
+        fence = _FENCE_OPEN_RE.search(self._text)
+        select = _LINE_SELECT_RE.search(self._text)
+        if fence is not None and (select is None or fence.start() < select.start()):
+            self._start = fence.end()
+            self._fenced = True
+        elif select is not None:
+            self._start = select.start()
+        else:
+            return False
+        self._position = self._start
+        return True
+
+    def _scan(self) -> str | None:
+        assert self._start is not None
+        text = self._text
+        index = self._position
+        while index < len(text):
+            char = text[index]
+            if self._quote is not None:
+                if char == self._quote:
+                    self._quote = None  # A doubled quote reopens on the next char
+            elif char in "'\"":
+                self._quote = char
+            elif char == "(":
+                self._depth += 1
+            elif char == ")":
+                self._depth -= 1
+            elif char == ";":
+                return self._complete(index)
+            elif char == "`" and self._fenced:
+                if len(text) - index < len(_FENCE):
+                    break  # Wait to see whether this is the closing fence
+                if text.startswith(_FENCE, index):
+                    return self._complete(index)
+            elif char == "\n" and not self._fenced and self._depth == 0:
+                if _BLANK_LINE_RE.match(text, index):
+                    return self._complete(index)
+                if not text[index:].strip(" \t"):
+                    break  # Wait to see whether the next line is blank
+            index += 1
+        self._position = index
+        return None
+
+    def _complete(self, end: int) -> str:
+        assert self._start is not None
+        self.sql = self._text[self._start : end].strip()
+        return self.sql
@@ -0,0 +1,71 @@
+"""Webhook ingestion of Telegram updates.
+
+In polling mode a single process asks Telegram for updates in a loop,
+so each message waits for the next poll and only one process can
+consume updates. In webhook mode Telegram posts every update to an
+aiohttp server as soon as it arrives. The server checks the secret
+token Telegram sends in ``X-Telegram-Bot-Api-Secret-Token``, answers
+200 at once and handles the update in the background, so several bot
+replicas can run behind a load balancer.
+"""
+
+import asyncio
+from urllib.parse import urlsplit
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from app.config import Settings
+
+
+def webhook_path(url: str) -> str:
+    """Return the path of the public webhook URL the server listens on."""
+    return urlsplit(url).path or "/"
+
+
+async def _health(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+def build_app(dispatcher: Dispatcher, bot: Bot, settings: Settings) -> web.Application:
+    """Create the aiohttp application serving the webhook and a health check."""
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher, bot, handle_in_background=True, secret_token=settings.webhook_secret
+    ).register(app, path=webhook_path(settings.webhook_url))
+    app.router.add_get("/healthz", _health)
+    # Runs the dispatcher's startup and shutdown hooks with the server
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot, settings: Settings) -> None:
+    """Serve webhook updates until cancelled.
+
+    With WEBHOOK_REGISTER the webhook URL is registered with Telegram on
+    startup; with several replicas only one of them needs to do that.
+    """
+    import structlog
+
+    logger = structlog.get_logger()
+    runner = web.AppRunner(build_app(dispatcher, bot, settings))
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+        await site.start()
+        if settings.webhook_register:
+            await bot.set_webhook(
+                settings.webhook_url,
+                secret_token=settings.webhook_secret,
+                allowed_updates=dispatcher.resolve_used_update_types(),
+            )
+        logger.info(
+            "webhook_listening",
+            host=settings.webhook_host,
+            port=settings.webhook_port,
+            path=webhook_path(settings.webhook_url),
+        )
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,206 @@
+"""Bounded worker pool for incoming questions.
+
+aiogram starts a task per update, so a traffic spike would run every
+question at once: the LLM and the database pool are shared by all of
+them and every user gets slow. ``WorkerPool`` runs questions on a fixed
+number of workers from a bounded queue instead. When the queue is full,
+``submit`` refuses the question so the bot can reply that it is
+overloaded, and only the users beyond capacity wait.
+
+Questions of one user run one at a time, in the order they arrived.
+Users take turns, so one user's burst cannot hold every worker. Within
+a question, ``stage`` bounds how many workers are inside the LLM or the
+database at once.
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class StageStats:
+    """Concurrency and wait time of one stage."""
+
+    limit: int
+    running: int
+    waiting: int
+    entered: int
+    mean_wait_ms: float
+    max_wait_ms: float
+
+
+@dataclass(frozen=True)
+class WorkerPoolStats:
+    """Snapshot of queue depth, wait times and job counters."""
+
+    workers: int
+    running: int
+    queued: int
+    max_queued: int  # Deepest queue seen
+    submitted: int
+    rejected: int
+    completed: int
+    failed: int
+    mean_wait_ms: float  # From submit until a worker picks the job up
+    max_wait_ms: float
+    stages: dict[str, StageStats]
+
+
+@dataclass
+class _Job:
+    run: Callable[[], Awaitable[None]]
+    submitted: float
+
+
+class _Stage:
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.running = 0
+        self.waiting = 0
+        self.entered = 0
+        self.wait_sum = 0.0
+        self.max_wait = 0.0
+
+    def stats(self) -> StageStats:
+        return StageStats(
+            limit=self.limit,
+            running=self.running,
+            waiting=self.waiting,
+            entered=self.entered,
+            mean_wait_ms=self.wait_sum / self.entered if self.entered else 0.0,
+            max_wait_ms=self.max_wait,
+        )
+
+
+class WorkerPool:
+    """Run jobs on ``workers`` tasks from a queue of at most ``queue_size`` jobs.
+
+    Args:
+        workers: Jobs running at once
+        queue_size: Jobs waiting for a worker before ``submit`` refuses more
+        stage_limits: Concurrency limit of each named stage, see ``stage``
+    """
+
+    def __init__(self, workers: int, queue_size: int, stage_limits: dict[str, int]) -> None:
+        self._workers = workers
+        self._queue_size = queue_size
+        self._stages = {name: _Stage(limit) for name, limit in stage_limits.items()}
+        # Jobs per key; a key is present while it is in _ready or being worked on
+        self._pending: dict[int, deque[_Job]] = {}
+        self._ready: asyncio.Queue[int] = asyncio.Queue()
+        self._tasks: list[asyncio.Task[None]] = []
+        self._queued = 0
+        self._max_queued = 0
+        self._running = 0
+        self._submitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_sum = 0.0
+        self._max_wait = 0.0
+
+    def start(self) -> None:
+        """Start the worker tasks."""
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self._workers)]
+
+    async def close(self) -> None:
+        """Cancel the workers; queued jobs are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key: int, job: Callable[[], Awaitable[None]]) -> bool:
+        """Queue ``job`` behind the earlier jobs of ``key``.
+
+        Args:
+            key: Ordering key, the Telegram user id
+            job: Coroutine function to run on a worker
+
+        Returns:
+            bool: False if the queue is full and the job was not accepted
+        """
+        if self._queued >= self._queue_size:
+            self._rejected += 1
+            return False
+        self._submitted += 1
+        self._queued += 1
+        self._max_queued = max(self._max_queued, self._queued)
+        entry = _Job(job, time.monotonic())
+        jobs = self._pending.get(key)
+        if jobs is None:
+            self._pending[key] = deque([entry])
+            self._ready.put_nowait(key)
+        else:
+            jobs.append(entry)
+        return True
+
+    @asynccontextmanager
+    async def stage(self, name: str) -> AsyncIterator[None]:
+        """Wait until fewer than the stage's limit of jobs are inside it."""
+        stage = self._stages[name]
+        started = time.monotonic()
+        stage.waiting += 1
+        try:
+            await stage.semaphore.acquire()
+        finally:
+            stage.waiting -= 1
+        waited = (time.monotonic() - started) * 1000
+        stage.entered += 1
+        stage.wait_sum += waited
+        stage.max_wait = max(stage.max_wait, waited)
+        stage.running += 1
+        try:
+            yield
+        finally:
+            stage.running -= 1
+            stage.semaphore.release()
+
+    def stats(self) -> WorkerPoolStats:
+        """Return queue depth, wait times and job counters."""
+        started = self._submitted - self._queued
+        return WorkerPoolStats(
+            workers=self._workers,
+            running=self._running,
+            queued=self._queued,
+            max_queued=self._max_queued,
+            submitted=self._submitted,
+            rejected=self._rejected,
+            completed=self._completed,
+            failed=self._failed,
+            mean_wait_ms=self._wait_sum / started if started else 0.0,
+            max_wait_ms=self._max_wait,
+            stages={name: stage.stats() for name, stage in self._stages.items()},
+        )
+
+    async def _work(self) -> None:
+        import structlog
+
+        logger = structlog.get_logger()
+        while True:
+            key = await self._ready.get()
+            jobs = self._pending[key]
+            job = jobs.popleft()
+            self._queued -= 1
+            waited = (time.monotonic() - job.submitted) * 1000
+            self._wait_sum += waited
+            self._max_wait = max(self._max_wait, waited)
+            self._running += 1
+            try:
+                await job.run()
+                self._completed += 1
+            except Exception as exc:
+                self._failed += 1
+                logger.exception("worker_job_failed", error=str(exc))
+            finally:
+                self._running -= 1
+                # Back of the line, so other users' questions go first
+                if jobs:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
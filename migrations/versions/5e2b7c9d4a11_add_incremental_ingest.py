@@ -0,0 +1,41 @@
+"""add incremental ingest state
+
+Revision ID: 5e2b7c9d4a11
+Revises: 3c9a1d5e8b20
+Create Date: 2026-10-17 11:03:54.120977
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5e2b7c9d4a11"
+down_revision: Union[str, Sequence[str], None] = "3c9a1d5e8b20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("videos", sa.Column("content_hash", sa.String(length=32), nullable=True))
+    op.create_table(
+        "ingest_checkpoints",
+        sa.Column("source", sa.String(length=512), primary_key=True, nullable=False),
+        sa.Column("fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("position", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("ingest_checkpoints")
+    op.drop_column("videos", "content_hash")
@@ -0,0 +1,82 @@
+"""add daily rollup tables
+
+Revision ID: 8d4f6a2c1e37
+Revises: 5e2b7c9d4a11
+Create Date: 2026-10-17 13:27:10.664031
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d4f6a2c1e37"
+down_revision: Union[str, Sequence[str], None] = "5e2b7c9d4a11"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_METRICS = (
+    "delta_views_count",
+    "delta_likes_count",
+    "delta_comments_count",
+    "delta_reports_count",
+    "snapshot_count",
+)
+
+
+def _metric_columns() -> list[sa.Column]:
+    return [
+        sa.Column(metric, sa.BigInteger(), nullable=False, server_default="0")
+        for metric in _METRICS
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "video_daily_stats",
+        sa.Column("video_id", sa.String(length=36), primary_key=True, nullable=False),
+        sa.Column("day", sa.Date(), primary_key=True, nullable=False),
+        *_metric_columns(),
+    )
+    op.create_index("ix_video_daily_stats_day", "video_daily_stats", ["day"], unique=False)
+    op.create_table(
+        "creator_daily_stats",
+        sa.Column("creator_id", sa.String(length=36), primary_key=True, nullable=False),
+        sa.Column("day", sa.Date(), primary_key=True, nullable=False),
+        *_metric_columns(),
+    )
+    op.create_index("ix_creator_daily_stats_day", "creator_daily_stats", ["day"], unique=False)
+
+    # Backfill from the snapshots that are already loaded
+    op.execute(
+        """
+        INSERT INTO video_daily_stats
+        SELECT s.video_id, DATE(s.created_at),
+               SUM(s.delta_views_count), SUM(s.delta_likes_count),
+               SUM(s.delta_comments_count), SUM(s.delta_reports_count), COUNT(*)
+        FROM video_snapshots s
+        GROUP BY 1, 2
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO creator_daily_stats
+        SELECT v.creator_id, DATE(s.created_at),
+               SUM(s.delta_views_count), SUM(s.delta_likes_count),
+               SUM(s.delta_comments_count), SUM(s.delta_reports_count), COUNT(*)
+        FROM video_snapshots s
+        JOIN videos v ON v.id = s.video_id
+        GROUP BY 1, 2
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_creator_daily_stats_day", table_name="creator_daily_stats")
+    op.drop_table("creator_daily_stats")
+    op.drop_index("ix_video_daily_stats_day", table_name="video_daily_stats")
+    op.drop_table("video_daily_stats")
@@ -0,0 +1,141 @@
+"""partition video_snapshots by month
+
+Revision ID: b6e3f0a9c214
+Revises: 8d4f6a2c1e37
+Create Date: 2026-10-17 15:02:41.318220
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b6e3f0a9c214"
+down_revision: Union[str, Sequence[str], None] = "8d4f6a2c1e37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_METRICS = (
+    "views_count",
+    "likes_count",
+    "comments_count",
+    "reports_count",
+    "delta_views_count",
+    "delta_likes_count",
+    "delta_comments_count",
+    "delta_reports_count",
+)
+
+# Monthly UTC partitions from the oldest snapshot through three months ahead
+_CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    month timestamp;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', COALESCE(
+                (SELECT min(created_at) FROM video_snapshots_unpartitioned), now()
+            ) AT TIME ZONE 'UTC'),
+            date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months',
+            interval '1 month'
+        )
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF video_snapshots FOR VALUES FROM (%L) TO (%L)',
+            'video_snapshots_p' || to_char(month, 'YYYYMM'),
+            to_char(month, 'YYYY-MM-DD') || ' 00:00:00+00',
+            to_char(month + interval '1 month', 'YYYY-MM-DD') || ' 00:00:00+00'
+        );
+    END LOOP;
+END
+$$
+"""
+
+
+def _snapshot_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("video_id", sa.String(length=36), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        *(
+            sa.Column(metric, sa.BigInteger(), nullable=False, server_default="0")
+            for metric in _METRICS
+        ),
+    ]
+
+
+def _create_indexes() -> None:
+    op.create_index("ix_video_snapshots_video_id", "video_snapshots", ["video_id"], unique=False)
+    op.create_index(
+        "ix_video_snapshots_created_at",
+        "video_snapshots",
+        ["created_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_video_snapshots_video_id_created_at",
+        "video_snapshots",
+        ["video_id", "created_at"],
+        unique=False,
+    )
+
+
+def _drop_indexes() -> None:
+    op.drop_index("ix_video_snapshots_video_id_created_at", table_name="video_snapshots")
+    op.drop_index("ix_video_snapshots_created_at", table_name="video_snapshots")
+    op.drop_index("ix_video_snapshots_video_id", table_name="video_snapshots")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _drop_indexes()
+    op.drop_constraint("video_snapshots_video_id_fkey", "video_snapshots", type_="foreignkey")
+    op.rename_table("video_snapshots", "video_snapshots_unpartitioned")
+
+    # The partition key must be part of every unique constraint
+    op.create_table(
+        "video_snapshots",
+        *_snapshot_columns(),
+        sa.PrimaryKeyConstraint("id", "created_at", name="video_snapshots_pkey_partitioned"),
+        sa.ForeignKeyConstraint(
+            ["video_id"], ["videos.id"], ondelete="CASCADE", name="video_snapshots_video_id_fkey"
+        ),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.execute(_CREATE_PARTITIONS)
+    _create_indexes()
+
+    op.execute("INSERT INTO video_snapshots SELECT * FROM video_snapshots_unpartitioned")
+    op.drop_table("video_snapshots_unpartitioned")
+    op.execute(
+        "ALTER TABLE video_snapshots "
+        "RENAME CONSTRAINT video_snapshots_pkey_partitioned TO video_snapshots_pkey"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _drop_indexes()
+    op.drop_constraint("video_snapshots_video_id_fkey", "video_snapshots", type_="foreignkey")
+    op.rename_table("video_snapshots", "video_snapshots_partitioned")
+    op.create_table(
+        "video_snapshots",
+        *_snapshot_columns(),
+        sa.PrimaryKeyConstraint("id", name="video_snapshots_pkey_unpartitioned"),
+        sa.ForeignKeyConstraint(
+            ["video_id"], ["videos.id"], ondelete="CASCADE", name="video_snapshots_video_id_fkey"
+        ),
+    )
+    _create_indexes()
+
+    op.execute("INSERT INTO video_snapshots SELECT * FROM video_snapshots_partitioned")
+    # Dropping the parent drops every partition with it
+    op.drop_table("video_snapshots_partitioned")
+    op.execute(
+        "ALTER TABLE video_snapshots "
+        "RENAME CONSTRAINT video_snapshots_pkey_unpartitioned TO video_snapshots_pkey"
+    )
@@ -0,0 +1,46 @@
+"""add snapshot watermarks and the checkpoint watermark
+
+Revision ID: d1a7c3e5f902
+Revises: b6e3f0a9c214
+Create Date: 2026-10-17 18:24:07.503116
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d1a7c3e5f902"
+down_revision: Union[str, Sequence[str], None] = "b6e3f0a9c214"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "snapshot_watermarks",
+        sa.Column("video_id", sa.String(length=36), primary_key=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.add_column(
+        "ingest_checkpoints",
+        sa.Column("watermark", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Seed from the data already loaded; the loader keeps the rows current from here on
+    op.execute(
+        "INSERT INTO snapshot_watermarks (video_id, created_at) "
+        "SELECT video_id, max(created_at) FROM video_snapshots GROUP BY video_id"
+    )
+    op.execute(
+        "INSERT INTO snapshot_watermarks (video_id, created_at) "
+        "SELECT '*', max(created_at) FROM video_snapshots HAVING count(*) > 0"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("ingest_checkpoints", "watermark")
+    op.drop_table("snapshot_watermarks")
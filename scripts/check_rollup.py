@@ -0,0 +1,94 @@
+"""Compare rollup-rewritten queries against the base tables.
+
+Runs every query twice, as written and as rewritten by
+``rewrite_for_rollup``, and exits non-zero on the first mismatch.
+Without arguments a built-in corpus is used, filled in with a real
+video and creator from the database.
+"""
+
+import asyncio
+import sys
+from datetime import timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from app.db import dispose_engines, get_engine
+from app.rollup import rewrite_for_rollup
+
+CORPUS = (
+    "SELECT COUNT(*) FROM video_snapshots",
+    "SELECT SUM(delta_views_count) FROM video_snapshots",
+    "SELECT SUM(delta_views_count) FROM video_snapshots WHERE DATE(created_at) = '{day}'",
+    "SELECT SUM(delta_likes_count) FROM video_snapshots WHERE created_at::date >= '{day}'",
+    "SELECT SUM(delta_comments_count) FROM video_snapshots WHERE DATE(created_at) < '{day}'",
+    (
+        "SELECT COUNT(*) FROM video_snapshots "
+        "WHERE created_at >= '{day}' AND created_at < '{next_day}'"
+    ),
+    (
+        "SELECT SUM(delta_reports_count) FROM video_snapshots "
+        "WHERE DATE(created_at) BETWEEN '{day}' AND '{day}'"
+    ),
+    (
+        "SELECT SUM(delta_views_count) FROM video_snapshots "
+        "WHERE video_id = '{video_id}' AND DATE(created_at) = '{day}'"
+    ),
+    (
+        "SELECT SUM(vs.delta_views_count) FROM video_snapshots vs "
+        "JOIN videos v ON vs.video_id = v.id "
+        "WHERE v.creator_id = '{creator_id}' AND DATE(vs.created_at) > '{day}'"
+    ),
+    (
+        "SELECT COUNT(*) FROM video_snapshots vs JOIN videos v ON v.id = vs.video_id "
+        "WHERE v.creator_id = '{creator_id}'"
+    ),
+)
+
+
+async def main() -> None:
+    load_dotenv()
+    engine = get_engine()
+    try:
+        async with engine.connect() as conn:
+            sample = (
+                await conn.execute(
+                    text(
+                        "SELECT s.video_id, v.creator_id, DATE(s.created_at) "
+                        "FROM video_snapshots s JOIN videos v ON v.id = s.video_id "
+                        "ORDER BY s.created_at LIMIT 1"
+                    )
+                )
+            ).one_or_none()
+            if sample is None:
+                raise SystemExit("No snapshots loaded")
+            video_id, creator_id, day = sample
+            queries = sys.argv[1:] or [
+                sql.format(
+                    video_id=video_id,
+                    creator_id=creator_id,
+                    day=day,
+                    next_day=day + timedelta(days=1),
+                )
+                for sql in CORPUS
+            ]
+
+            checked = 0
+            for sql in queries:
+                rewritten = rewrite_for_rollup(sql)
+                if rewritten is None:
+                    print(f"SKIP  {sql}")
+                    continue
+                expected = (await conn.execute(text(sql))).scalar() or 0
+                actual = (await conn.execute(text(rewritten))).scalar() or 0
+                if expected != actual:
+                    raise SystemExit(f"MISMATCH {sql}\n  base={expected} rollup={actual}")
+                checked += 1
+                print(f"OK    {sql} = {expected}")
+            print(f"{checked} queries match")
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
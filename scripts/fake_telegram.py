@@ -0,0 +1,149 @@
+"""Local stand-in for Telegram to exercise webhook mode.
+
+Serves a minimal Bot API (getMe, setWebhook, deleteWebhook, sendMessage)
+and posts questions from several fake users to the bot's webhook, then
+reports how fast updates were acknowledged and answered.
+
+Start it first, then the bot pointed at it:
+
+    python scripts/fake_telegram.py --users 10 &
+    TELEGRAM_MODE=webhook TELEGRAM_API_URL=http://127.0.0.1:8081 \\
+    WEBHOOK_URL=http://127.0.0.1:8080/telegram WEBHOOK_SECRET=local-secret \\
+    python -m app.main
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import statistics
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from aiohttp import ClientSession, web
+
+QUESTIONS = [
+    "Сколько всего видео в системе?",
+    "Сколько просмотров было 28 ноября 2025?",
+    "Сколько видео набрало больше 100 000 просмотров за всё время?",
+    "Какое максимальное количество лайков у видео?",
+]
+
+
+class FakeTelegram:
+    """Bot API endpoints that record the bot's replies."""
+
+    def __init__(self) -> None:
+        self.sent: dict[int, float] = {}  # chat id -> time the question was posted
+        self.answer_ms: list[float] = []
+        self.answers: dict[int, list[str]] = {}
+        self.message_ids = itertools.count(1)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post()) if request.can_read_body else {}
+        if method == "getMe":
+            result: object = {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake"}
+        elif method in ("setWebhook", "deleteWebhook"):
+            result = True
+        elif method == "sendMessage":
+            chat_id = int(str(params["chat_id"]))
+            text = str(params.get("text", ""))
+            self.answers.setdefault(chat_id, []).append(text)
+            if chat_id in self.sent:
+                self.answer_ms.append((time.perf_counter() - self.sent.pop(chat_id)) * 1000)
+            result = {
+                "message_id": next(self.message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": text,
+            }
+        else:
+            return web.json_response(
+                {"ok": False, "error_code": 404, "description": f"{method} not faked"}
+            )
+        return web.json_response({"ok": True, "result": result})
+
+
+def _update(update_id: int, user_id: int, text: str) -> dict[str, object]:
+    user = {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user,
+            "text": text,
+        },
+    }
+
+
+async def _wait_for_bot(session: ClientSession, webhook_url: str, timeout: float) -> None:
+    parts = urlsplit(webhook_url)
+    health = urlunsplit((parts.scheme, parts.netloc, "/healthz", "", ""))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError):
+            async with session.get(health) as response:
+                if response.status == 200:
+                    return
+        await asyncio.sleep(0.5)
+    raise SystemExit(f"Bot did not come up at {health}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--webhook-url", default="http://127.0.0.1:8080/telegram")
+    parser.add_argument("--secret", default="local-secret")
+    parser.add_argument("--api-port", type=int, default=8081)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    fake = FakeTelegram()
+    app = web.Application()
+    app.router.add_route("*", "/bot{token}/{method}", fake.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.api_port).start()
+    print(f"Fake Bot API on http://127.0.0.1:{args.api_port}")
+
+    ack_ms: list[float] = []
+    try:
+        async with ClientSession() as session:
+            await _wait_for_bot(session, args.webhook_url, args.timeout)
+            headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret}
+
+            async def post(update_id: int, user_id: int, text: str) -> None:
+                fake.sent[user_id] = time.perf_counter()
+                started = time.perf_counter()
+                async with session.post(
+                    args.webhook_url, json=_update(update_id, user_id, text), headers=headers
+                ) as response:
+                    response.raise_for_status()
+                ack_ms.append((time.perf_counter() - started) * 1000)
+
+            await asyncio.gather(
+                *(
+                    post(user, 1000 + user, QUESTIONS[user % len(QUESTIONS)])
+                    for user in range(args.users)
+                )
+            )
+            deadline = time.monotonic() + args.timeout
+            while fake.sent and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+    finally:
+        await runner.cleanup()
+
+    for chat_id, answers in sorted(fake.answers.items()):
+        print(f"{chat_id}: {' | '.join(answers)}")
+    print(f"Acknowledged: {len(ack_ms)}, median {statistics.median(ack_ms):.1f} ms")
+    if fake.answer_ms:
+        print(f"Answered: {len(fake.answer_ms)}, median {statistics.median(fake.answer_ms):.1f} ms")
+    if fake.sent:
+        print(f"Unanswered: {len(fake.sent)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,72 @@
+import argparse
 import asyncio
+import codecs
+import csv
+import hashlib
+import io
 import json
-from datetime import datetime
+import re
+import resource
+import time
+import zlib
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
-from sqlalchemy import insert
-from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+import structlog
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
 from app.config import get_settings
-from app.models import Video, VideoSnapshot
+from app.db import dispose_engines, get_engine, get_session_factory
+from app.models import (
+    BUMP_GENERATION_SQL,
+    GLOBAL_WATERMARK,
+    IngestCheckpoint,
+    SnapshotWatermark,
+    Video,
+    VideoSnapshot,
+)
+from app.partitions import PartitionSet, list_partitions_sql, month_of
+from app.rollup import rollup_refresh_statements
+
+logger = structlog.get_logger()
 
 DATA_PATH = Path("data/videos.json")
 BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 1 << 20  # 1 MiB of text per read
+RANGE_SIZE = 1 << 20  # Bytes of the export decoded by one worker task
+_VIDEOS_KEY_RE = re.compile(r'"videos"\s*:\s*\[')
+_VIDEOS_KEY_BYTES_RE = re.compile(rb'"videos"\s*:\s*\[')
+_JSON_WS = " \t\n\r"
+# A decode error this close to the end of the text may just need more text
+_TRUNCATION_SLACK = 8
+
+RowBatch = list[dict[str, Any]]
+Record = tuple[Any, ...]
+
+VIDEO_COLUMNS = tuple(column.name for column in Video.__table__.columns)
+SNAPSHOT_COLUMNS = tuple(column.name for column in VideoSnapshot.__table__.columns)
+# Snapshots are partitioned by created_at, which is therefore part of their key
+_CONFLICT_KEYS = {
+    "videos": ("id",),
+    "video_snapshots": ("id", "created_at"),
+}
+
+
+@dataclass(frozen=True)
+class LoadStats:
+    videos: int
+    snapshots: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return (self.videos + self.snapshots) / self.seconds if self.seconds else 0.0
 
 
 def _parse_datetime(value: str | None) -> datetime:
@@ -24,8 +79,163 @@ def _parse_datetime(value: str | None) -> datetime:
         return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
 
 
-def _chunked(items: list[dict[str, Any]], size: int) -> list[list[dict[str, Any]]]:
-    return [items[i : i + size] for i in range(0, len(items), size)]
+def _iter_videos(path: Path, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict[str, Any]]:
+    """Stream video objects from the ``videos`` array of the export.
+
+    The array is located by the first ``"videos": [`` in the document.
+    Only the text of the video currently being decoded is buffered, so
+    memory use is bounded by the largest single video (with its nested
+    snapshots) instead of by the size of the file.
+    """
+    decoder = json.JSONDecoder()
+    with path.open(encoding="utf-8") as handle:
+        buffer = ""
+        while (match := _VIDEOS_KEY_RE.search(buffer)) is None:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                raise ValueError(f'{path}: no "videos" array found')
+            # Keep a tail so a key split across two reads is still found
+            buffer = buffer[-64:] + chunk
+        buffer = buffer[match.end() :]
+        pos = 0
+        eof = False
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in _JSON_WS + ",":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                if pos == len(buffer):
+                    raise json.JSONDecodeError("Need more data", buffer, pos)
+                video, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Grow reads with the pending object so re-decoding stays linear
+                chunk = handle.read(max(chunk_size, len(buffer) - pos))
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield video
+
+
+def _array_offset(path: Path, chunk_size: int = READ_CHUNK_SIZE) -> int:
+    """Return the byte offset just past the ``[`` of the ``videos`` array."""
+    with path.open("rb") as handle:
+        buffer = b""
+        offset = 0  # File offset of buffer[0]
+        while (match := _VIDEOS_KEY_BYTES_RE.search(buffer)) is None:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                raise ValueError(f'{path}: no "videos" array found')
+            # Keep a tail so a key split across two reads is still found
+            offset += max(len(buffer) - 64, 0)
+            buffer = buffer[-64:] + chunk
+        return offset + match.end()
+
+
+def _char_start(handle: IO[bytes], offset: int) -> int:
+    """Move ``offset`` forward past UTF-8 continuation bytes to a character start."""
+    handle.seek(offset)
+    head = handle.read(4)
+    for index, byte in enumerate(head):
+        if byte & 0xC0 != 0x80:
+            return offset + index
+    return offset + len(head)
+
+
+def _iter_range_videos(path: Path, start: int, end: int, first: int) -> Iterator[dict[str, Any]]:
+    """Decode the videos whose opening brace lies in bytes ``start:end`` of the export.
+
+    ``first`` is the offset just past the array's ``[``. A range that
+    begins mid-array does not know where the next video starts, so it
+    decodes an object at every ``{`` until one has a ``creator_id``; the
+    objects passed over are snapshots of a video the previous range
+    finishes. The last video of a range is read past ``end`` as far as
+    it extends. Every video therefore belongs to exactly one range.
+    """
+    decoder = json.JSONDecoder()
+    reader = codecs.getincrementaldecoder("utf-8")()
+    with path.open("rb") as handle:
+        start, end = _char_start(handle, start), _char_start(handle, end)
+        handle.seek(start)
+        buffer = reader.decode(handle.read(end - start))
+        limit = len(buffer)  # Objects starting at or after this belong to the next range
+        aligned = start == first
+        eof = False
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in _JSON_WS + ",":
+                pos += 1
+            if not aligned and pos < len(buffer):
+                pos = buffer.find("{", pos)
+                if pos < 0:
+                    pos = len(buffer)
+            if pos >= limit or (aligned and buffer[pos] == "]"):
+                return
+            try:
+                video, after = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as exc:
+                truncated = exc.pos >= len(buffer) - _TRUNCATION_SLACK or exc.msg.startswith(
+                    "Unterminated string"
+                )
+                if truncated and not eof:
+                    chunk = handle.read(READ_CHUNK_SIZE)
+                    eof = not chunk
+                    buffer += reader.decode(chunk, final=eof)
+                    continue
+                if aligned:
+                    raise
+                pos += 1  # A brace inside a string
+                continue
+            if not aligned and not (isinstance(video, dict) and "creator_id" in video):
+                pos = after  # A nested object; the next video cannot start inside it
+                continue
+            aligned = True
+            yield video
+            pos = after
+
+
+def _byte_ranges(first: int, size: int, step: int = RANGE_SIZE) -> list[tuple[int, int]]:
+    return [(start, min(start + step, size)) for start in range(first, size, step)]
+
+
+def _iter_batches(
+    videos: Iterable[dict[str, Any]], size: int = BATCH_SIZE
+) -> Iterator[tuple[RowBatch, RowBatch]]:
+    """Turn streamed videos into fixed-size row batches.
+
+    Each yielded pair holds video rows and snapshot rows; the video rows
+    must be written first because the snapshots reference them.
+    """
+    video_rows: RowBatch = []
+    snapshot_rows: RowBatch = []
+    for video in videos:
+        video_rows.append(_video_payload(video))
+        for snapshot in video.get("snapshots", []):
+            snapshot_rows.append(_snapshot_payload(video["id"], snapshot))
+            if len(snapshot_rows) >= size:
+                yield video_rows, snapshot_rows
+                video_rows, snapshot_rows = [], []
+        if len(video_rows) >= size:
+            yield video_rows, snapshot_rows
+            video_rows, snapshot_rows = [], []
+    if video_rows or snapshot_rows:
+        yield video_rows, snapshot_rows
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _content_hash(video: dict[str, Any]) -> str:
+    """Hash the video record itself; its snapshots are tracked by watermark."""
+    record = {key: value for key, value in video.items() if key != "snapshots"}
+    encoded = json.dumps(record, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
 
 
 def _video_payload(video: dict[str, Any]) -> dict[str, Any]:
@@ -39,6 +249,7 @@ def _video_payload(video: dict[str, Any]) -> dict[str, Any]:
         "reports_count": video.get("reports_count", 0),
         "created_at": _parse_datetime(video["created_at"]),
         "updated_at": _parse_datetime(video["updated_at"]),
+        "content_hash": _content_hash(video),
     }
 
 
@@ -59,33 +270,558 @@ def _snapshot_payload(video_id: int, snapshot: dict[str, Any]) -> dict[str, Any]
     }
 
 
-async def _insert_batches(session_factory: async_sessionmaker) -> None:
-    payload = json.loads(DATA_PATH.read_text())
-    videos: list[dict[str, Any]] = payload.get("videos", [])
+async def _refresh_rollups(session: AsyncSession, since: date | None = None) -> None:
+    for statement in rollup_refresh_statements(since):
+        await session.execute(text(statement))
+
+
+async def _bump_generation(session: AsyncSession) -> None:
+    # Runs in the load transaction so caches see the new generation only with the new data
+    await session.execute(text(BUMP_GENERATION_SQL))
 
-    video_rows = [_video_payload(video) for video in videos]
-    snapshot_rows: list[dict[str, Any]] = []
-    for video in videos:
-        video_id = video["id"]
-        for snapshot in video.get("snapshots", []):
-            snapshot_rows.append(_snapshot_payload(video_id, snapshot))
 
+async def _load_partitions(engine: AsyncEngine) -> PartitionSet:
+    """Read the existing snapshot partitions and create the coming months' ones."""
+    async with engine.begin() as connection:
+        result = await connection.exec_driver_sql(list_partitions_sql())
+        partitions = PartitionSet(name for (name,) in result.all())
+        for statement in partitions.ahead_statements(date.today()):
+            await connection.exec_driver_sql(statement)
+    return partitions
+
+
+async def _insert_batches(
+    session_factory: async_sessionmaker, partitions: PartitionSet, path: Path = DATA_PATH
+) -> LoadStats:
+    started = time.perf_counter()
+    videos = snapshots = 0
     async with session_factory() as session:
-        for batch in _chunked(video_rows, BATCH_SIZE):
-            await session.execute(insert(Video), batch)
-        for batch in _chunked(snapshot_rows, BATCH_SIZE):
-            await session.execute(insert(VideoSnapshot), batch)
+        for video_rows, snapshot_rows in _iter_batches(_iter_videos(path)):
+            if video_rows:
+                await session.execute(insert(Video), video_rows)
+            if snapshot_rows:
+                for statement in partitions.ensure_statements(
+                    row["created_at"] for row in snapshot_rows
+                ):
+                    await session.execute(text(statement))
+                await session.execute(insert(VideoSnapshot), snapshot_rows)
+            videos += len(video_rows)
+            snapshots += len(snapshot_rows)
+        await _refresh_rollups(session)
+        await _bump_generation(session)
         await session.commit()
+    return LoadStats(videos=videos, snapshots=snapshots, seconds=time.perf_counter() - started)
+
+
+def _records(rows: RowBatch, columns: tuple[str, ...]) -> list[Record]:
+    return [tuple(row[column] for column in columns) for row in rows]
+
+
+def _merge_sql(table: str, columns: tuple[str, ...]) -> str:
+    keys = _CONFLICT_KEYS[table]
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column not in keys)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"SELECT {', '.join(columns)} FROM {table}_staging "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}"
+    )
+
+
+def _iter_video_groups(
+    videos: Iterable[dict[str, Any]], size: int = BATCH_SIZE
+) -> Iterator[list[dict[str, Any]]]:
+    """Group streamed videos so each group holds roughly ``size`` rows."""
+    group: list[dict[str, Any]] = []
+    rows = 0
+    for video in videos:
+        group.append(video)
+        rows += 1 + len(video.get("snapshots", []))
+        if rows >= size:
+            yield group
+            group, rows = [], 0
+    if group:
+        yield group
+
+
+def _build_records(videos: list[dict[str, Any]]) -> tuple[list[Record], list[Record]]:
+    """Build COPY records for a group of decoded videos."""
+    video_records: list[Record] = []
+    snapshot_records: list[Record] = []
+    for video_rows, snapshot_rows in _iter_batches(videos, size=len(videos) + 1):
+        video_records.extend(_records(video_rows, VIDEO_COLUMNS))
+        snapshot_records.extend(_records(snapshot_rows, SNAPSHOT_COLUMNS))
+    return video_records, snapshot_records
+
+
+_SNAPSHOT_VIDEO_ID = SNAPSHOT_COLUMNS.index("video_id")
+_SNAPSHOT_CREATED_AT = SNAPSHOT_COLUMNS.index("created_at")
+_DONE = None
+
+
+@dataclass(frozen=True)
+class _CopyChunk:
+    """COPY input built by a worker process from one byte range of the export.
+
+    ``videos`` and ``snapshots`` hold one CSV document per writer; every
+    row goes to the writer its video id is partitioned to.
+    """
+
+    videos: list[bytes]
+    snapshots: list[bytes]
+    video_count: int
+    snapshot_count: int
+    snapshot_months: list[datetime]  # One snapshot time per month, for partitions
+
+
+def _writer_of(video_id: str, writers: int) -> int:
+    return zlib.crc32(video_id.encode()) % writers
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return f"{value.isoformat()}+00:00"  # Naive times are UTC, as asyncpg sends them
+    return value
+
+
+def _to_csv(records: list[Record]) -> bytes:
+    output = io.StringIO()
+    csv.writer(output).writerows([_csv_value(value) for value in record] for record in records)
+    return output.getvalue().encode()
+
+
+def _build_copy_chunk(path: Path, start: int, end: int, first: int, writers: int) -> _CopyChunk:
+    """Decode one byte range and render its COPY input (runs in a worker process).
+
+    The worker reads the file itself and returns CSV bytes, so the parent
+    neither decodes JSON nor pickles rows in either direction.
+    """
+    videos = list(_iter_range_videos(path, start, end, first))
+    video_records, snapshot_records = _build_records(videos)
+    video_parts: list[list[Record]] = [[] for _ in range(writers)]
+    for record in video_records:
+        video_parts[_writer_of(record[0], writers)].append(record)
+    snapshot_parts: list[list[Record]] = [[] for _ in range(writers)]
+    months: dict[date, datetime] = {}
+    for record in snapshot_records:
+        snapshot_parts[_writer_of(record[_SNAPSHOT_VIDEO_ID], writers)].append(record)
+        created_at = record[_SNAPSHOT_CREATED_AT]
+        months.setdefault(month_of(created_at), created_at)
+    return _CopyChunk(
+        videos=[_to_csv(part) for part in video_parts],
+        snapshots=[_to_csv(part) for part in snapshot_parts],
+        video_count=len(video_records),
+        snapshot_count=len(snapshot_records),
+        snapshot_months=list(months.values()),
+    )
+
+
+class _Writer:
+    """One database connection applying CSV batches from its own queue.
+
+    Every batch is copied into a per-connection staging table and merged
+    into the target table in its own transaction.
+    """
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self._engine = engine
+        self.queue: asyncio.Queue[
+            tuple[str, tuple[str, ...], bytes, asyncio.Future[None] | None] | None
+        ] = asyncio.Queue(maxsize=4)
+
+    async def run(self) -> None:
+        async with self._engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            driver = raw_connection.driver_connection
+            for table in ("videos", "video_snapshots"):
+                await driver.execute(
+                    f"CREATE TEMP TABLE {table}_staging (LIKE {table} INCLUDING DEFAULTS) "
+                    "ON COMMIT DELETE ROWS"
+                )
+            while (job := await self.queue.get()) is not _DONE:
+                table, columns, data, committed = job
+                async with driver.transaction():
+                    await driver.copy_to_table(
+                        f"{table}_staging", source=io.BytesIO(data), columns=columns, format="csv"
+                    )
+                    await driver.execute(_merge_sql(table, columns))
+                if committed is not None:
+                    committed.set_result(None)
+
+
+async def _parallel_copy(
+    engine: AsyncEngine,
+    strategy: str,
+    workers: int,
+    partitions: PartitionSet,
+    path: Path = DATA_PATH,
+) -> LoadStats:
+    """Load with a process pool for parsing and ``workers`` DB connections.
+
+    The export is cut into byte ranges; each worker process reads its
+    range from the file, decodes the JSON, builds the rows and renders
+    them as COPY CSV (see ``_build_copy_chunk``). The parent only finds
+    the array and hands out offsets. Rows are fanned out over the
+    writers partitioned by video id. For every range, the video rows are
+    committed before any of its snapshots are queued, so the snapshot
+    foreign keys always resolve.
+
+    Unlike the single-connection COPY path each batch commits on its own,
+    so ``replace`` truncates up front and readers can observe a partial load.
+    """
+    started = time.perf_counter()
+    videos = snapshots = 0
+    loop = asyncio.get_running_loop()
+    writers = [_Writer(engine) for _ in range(workers)]
+
+    if strategy == "replace":
+        async with engine.begin() as connection:
+            await connection.exec_driver_sql(
+                "TRUNCATE video_snapshots, videos, snapshot_watermarks"
+            )
+
+    first = _array_offset(path)
+    ranges = iter(_byte_ranges(first, path.stat().st_size))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async with asyncio.TaskGroup() as group:
+            for writer in writers:
+                group.create_task(writer.run())
+
+            pending: list[asyncio.Future[_CopyChunk]] = []
+            while True:
+                # Keep every worker process busy while earlier ranges are written
+                while len(pending) < workers and (span := next(ranges, None)) is not None:
+                    pending.append(
+                        loop.run_in_executor(pool, _build_copy_chunk, path, *span, first, workers)
+                    )
+                if not pending:
+                    break
+                chunk = await pending.pop(0)
+
+                committed: list[asyncio.Future[None]] = []
+                for writer, data in zip(writers, chunk.videos, strict=True):
+                    if data:
+                        future: asyncio.Future[None] = loop.create_future()
+                        committed.append(future)
+                        await writer.queue.put(("videos", VIDEO_COLUMNS, data, future))
+                await asyncio.gather(*committed)
+
+                statements = partitions.ensure_statements(chunk.snapshot_months)
+                if statements:
+                    async with engine.begin() as connection:
+                        for statement in statements:
+                            await connection.exec_driver_sql(statement)
+
+                for writer, data in zip(writers, chunk.snapshots, strict=True):
+                    if data:
+                        await writer.queue.put(("video_snapshots", SNAPSHOT_COLUMNS, data, None))
+
+                videos += chunk.video_count
+                snapshots += chunk.snapshot_count
+
+            for writer in writers:
+                await writer.queue.put(_DONE)
+
+    async with engine.begin() as connection:
+        for statement in rollup_refresh_statements():
+            await connection.exec_driver_sql(statement)
+        await connection.exec_driver_sql(BUMP_GENERATION_SQL)
+    return LoadStats(videos=videos, snapshots=snapshots, seconds=time.perf_counter() - started)
+
+
+async def _copy_batches(
+    engine: AsyncEngine, strategy: str, partitions: PartitionSet, path: Path = DATA_PATH
+) -> LoadStats:
+    """Bulk load through binary COPY into staging tables.
+
+    Rows are streamed with asyncpg's ``copy_records_to_table`` into
+    temporary staging tables, then moved into the real tables in the same
+    transaction: ``merge`` upserts by primary key, ``replace`` truncates
+    the targets first. Readers see either the old or the new data set.
+    """
+    started = time.perf_counter()
+    videos = snapshots = 0
+    partition_statements: list[str] = []
+    async with engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        driver = raw_connection.driver_connection
+        async with driver.transaction():
+            for table in ("videos", "video_snapshots"):
+                await driver.execute(
+                    f"CREATE TEMP TABLE {table}_staging (LIKE {table} INCLUDING DEFAULTS) "
+                    "ON COMMIT DROP"
+                )
+            for video_rows, snapshot_rows in _iter_batches(_iter_videos(path)):
+                if video_rows:
+                    await driver.copy_records_to_table(
+                        "videos_staging",
+                        records=_records(video_rows, VIDEO_COLUMNS),
+                        columns=VIDEO_COLUMNS,
+                    )
+                if snapshot_rows:
+                    partition_statements += partitions.ensure_statements(
+                        row["created_at"] for row in snapshot_rows
+                    )
+                    await driver.copy_records_to_table(
+                        "video_snapshots_staging",
+                        records=_records(snapshot_rows, SNAPSHOT_COLUMNS),
+                        columns=SNAPSHOT_COLUMNS,
+                    )
+                videos += len(video_rows)
+                snapshots += len(snapshot_rows)
+
+            for statement in partition_statements:
+                await driver.execute(statement)
+            if strategy == "replace":
+                await driver.execute("TRUNCATE video_snapshots, videos, snapshot_watermarks")
+            await driver.execute(_merge_sql("videos", VIDEO_COLUMNS))
+            await driver.execute(_merge_sql("video_snapshots", SNAPSHOT_COLUMNS))
+            for statement in rollup_refresh_statements():
+                await driver.execute(statement)
+            await driver.execute(BUMP_GENERATION_SQL)
+    return LoadStats(videos=videos, snapshots=snapshots, seconds=time.perf_counter() - started)
+
+
+def _file_fingerprint(path: Path) -> str:
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+async def _global_watermark(session: AsyncSession) -> datetime | None:
+    return await session.scalar(
+        select(SnapshotWatermark.created_at).where(SnapshotWatermark.video_id == GLOBAL_WATERMARK)
+    )
+
+
+async def _video_watermarks(session: AsyncSession, video_ids: list[str]) -> dict[str, datetime]:
+    """Return the stored snapshot watermark of each of ``video_ids`` that has one."""
+    result = await session.execute(
+        select(SnapshotWatermark.video_id, SnapshotWatermark.created_at).where(
+            SnapshotWatermark.video_id.in_(video_ids)
+        )
+    )
+    return {video_id: created_at for video_id, created_at in result.all()}
+
+
+async def _advance_watermarks(session: AsyncSession, snapshot_rows: RowBatch) -> None:
+    """Raise the stored watermarks to the newest of ``snapshot_rows``."""
+    newest: dict[str, datetime] = {}
+    for row in snapshot_rows:
+        created_at = _as_utc(row["created_at"])
+        current = newest.get(row["video_id"])
+        if current is None or created_at > current:
+            newest[row["video_id"]] = created_at
+    newest[GLOBAL_WATERMARK] = max(newest.values())
+    statement = pg_insert(SnapshotWatermark)
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[SnapshotWatermark.video_id],
+            set_={
+                "created_at": func.greatest(
+                    SnapshotWatermark.created_at, statement.excluded.created_at
+                )
+            },
+        ),
+        [
+            {"video_id": video_id, "created_at": created_at}
+            for video_id, created_at in newest.items()
+        ],
+    )
+
+
+def _is_new(
+    watermarks: dict[str, datetime] | datetime | None, video_id: str, created_at: datetime
+) -> bool:
+    watermark = watermarks.get(video_id) if isinstance(watermarks, dict) else watermarks
+    return watermark is None or _as_utc(created_at) > watermark
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Naive export times are UTC, as asyncpg stores them; stored watermarks are aware
+    return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
+
+
+async def _incremental_load(
+    session_factory: async_sessionmaker,
+    partitions: PartitionSet,
+    watermark_mode: str,
+    path: Path = DATA_PATH,
+    resume: bool = True,
+) -> LoadStats:
+    """Upsert changed videos and append snapshots newer than the watermark.
+
+    Videos are upserted by id and skipped when their content hash is
+    unchanged. Snapshots at or before the stored watermark (per video or
+    global) are skipped. The watermarks live in ``snapshot_watermarks``
+    and are read per group, so the cost follows the file rather than the
+    stored history. Every group of rows commits together with its
+    watermarks and the checkpoint, so an interrupted load resumes after
+    the last committed group instead of starting over.
+
+    Rollups are rebuilt from the first day that received new snapshots,
+    or fully when resuming or when a video moved to another creator.
+    """
+    started = time.perf_counter()
+    videos = snapshots = 0
+    first_new: datetime | None = None
+    full_refresh = False
+    source = str(path.resolve())
+    fingerprint = _file_fingerprint(path)
+
+    async with session_factory() as session:
+        checkpoint = await session.get(IngestCheckpoint, source)
+        watermark = await _global_watermark(session)
+    position = 0
+    if resume and checkpoint is not None and checkpoint.fingerprint == fingerprint:
+        position = checkpoint.position
+        watermark = checkpoint.watermark  # The committed groups have advanced the stored one
+        full_refresh = True  # Rows committed before the interruption are not tracked
+        logger.info("load_resumed", source=source, position=position)
+
+    video_insert = pg_insert(Video)
+    upsert_videos = video_insert.on_conflict_do_update(
+        index_elements=[Video.id],
+        set_={column: video_insert.excluded[column] for column in VIDEO_COLUMNS if column != "id"},
+        where=Video.content_hash.is_distinct_from(video_insert.excluded.content_hash),
+    ).returning(Video.id)
+    append_snapshots = (
+        pg_insert(VideoSnapshot)
+        .on_conflict_do_nothing(index_elements=[VideoSnapshot.id, VideoSnapshot.created_at])
+        .returning(VideoSnapshot.id)
+    )
+
+    index = 0
+    for group in _iter_video_groups(_iter_videos(path)):
+        end = index + len(group)
+        if end <= position:
+            index = end
+            continue
+        group = group[max(position - index, 0) :]
+        index = end
+
+        video_rows = [_video_payload(video) for video in group]
+
+        async with session_factory() as session, session.begin():
+            watermarks = (
+                watermark
+                if watermark_mode == "global"
+                else await _video_watermarks(session, [row["id"] for row in video_rows])
+            )
+            snapshot_rows = [
+                row
+                for video in group
+                for row in (
+                    _snapshot_payload(video["id"], snapshot)
+                    for snapshot in video.get("snapshots", [])
+                )
+                if _is_new(watermarks, row["video_id"], row["created_at"])
+            ]
+            creators = {row["id"]: row["creator_id"] for row in video_rows}
+            stored = await session.execute(
+                select(Video.id, Video.creator_id).where(Video.id.in_(creators))
+            )
+            if any(creators[video_id] != creator_id for video_id, creator_id in stored.all()):
+                full_refresh = True
+            videos += len((await session.execute(upsert_videos, video_rows)).all())
+            if snapshot_rows:
+                for statement in partitions.ensure_statements(
+                    row["created_at"] for row in snapshot_rows
+                ):
+                    await session.execute(text(statement))
+                snapshots += len((await session.execute(append_snapshots, snapshot_rows)).all())
+                await _advance_watermarks(session, snapshot_rows)
+            await session.merge(
+                IngestCheckpoint(
+                    source=source, fingerprint=fingerprint, position=end, watermark=watermark
+                )
+            )
+
+        if snapshot_rows:
+            earliest = min(row["created_at"] for row in snapshot_rows)
+            first_new = earliest if first_new is None else min(first_new, earliest)
+
+    async with session_factory() as session, session.begin():
+        await session.execute(delete(IngestCheckpoint).where(IngestCheckpoint.source == source))
+        if full_refresh:
+            await _refresh_rollups(session)
+        elif first_new is not None:
+            # One day of slack covers the session time zone differing from the source offset
+            await _refresh_rollups(session, since=first_new.date() - timedelta(days=1))
+        await _bump_generation(session)
+    return LoadStats(videos=videos, snapshots=snapshots, seconds=time.perf_counter() - started)
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load the JSON export into Postgres.")
+    parser.add_argument("--path", type=Path, default=DATA_PATH, help="JSON export to load")
+    parser.add_argument(
+        "--method",
+        choices=("insert", "copy", "incremental"),
+        default="insert",
+        help=(
+            "insert: batched ORM inserts; copy: binary COPY through staging tables; "
+            "incremental: upsert changed rows with resumable checkpoints"
+        ),
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=("merge", "replace"),
+        default="merge",
+        help="copy only: upsert into existing data or replace it atomically",
+    )
+    parser.add_argument(
+        "--watermark",
+        choices=("per-video", "global"),
+        default="per-video",
+        help="incremental only: skip snapshots not newer than this stored watermark",
+    )
+    parser.add_argument(
+        "--no-resume",
+        dest="resume",
+        action="store_false",
+        help="incremental only: ignore a stored checkpoint and start from the beginning",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="copy only: worker processes and database connections for a parallel load",
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and args.method != "copy":
+        parser.error("--workers requires --method copy")
+    return args
 
 
-async def main() -> None:
-    settings = get_settings()
-    engine: AsyncEngine = create_async_engine(settings.database_url, pool_pre_ping=True)
-    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+async def main(argv: list[str] | None = None) -> None:
+    args = _parse_args(argv)
+    engine = get_engine(pool_size=max(args.workers + 1, get_settings().db_pool_size))
+    session_factory = get_session_factory()
     try:
-        await _insert_batches(session_factory)
+        partitions = await _load_partitions(engine)
+        if args.workers > 1:
+            stats = await _parallel_copy(engine, args.strategy, args.workers, partitions, args.path)
+        elif args.method == "copy":
+            stats = await _copy_batches(engine, args.strategy, partitions, args.path)
+        elif args.method == "incremental":
+            stats = await _incremental_load(
+                session_factory, partitions, args.watermark, args.path, args.resume
+            )
+        else:
+            stats = await _insert_batches(session_factory, partitions, args.path)
+        logger.info(
+            "load_complete",
+            method=args.method,
+            workers=args.workers,
+            videos=stats.videos,
+            snapshots=stats.snapshots,
+            seconds=round(stats.seconds, 2),
+            rows_per_second=round(stats.rows_per_second),
+            peak_rss_mb=round(_peak_rss_mb(), 1),
+        )
     finally:
-        await engine.dispose()
+        await dispose_engines()
 
 
 if __name__ == "__main__":
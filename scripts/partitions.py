@@ -0,0 +1,86 @@
+"""Maintain the monthly partitions of video_snapshots.
+
+    python scripts/partitions.py list
+    python scripts/partitions.py ensure --months-ahead 3
+    python scripts/partitions.py drop --before 2026-01-01
+
+``ensure`` pre-creates partitions for the coming months (the loader also
+does this on every run). ``drop`` is retention: every partition that
+lies entirely before the cutoff is detached and dropped, the rollups
+for those days are removed and the data generation is bumped, all in
+one transaction.
+"""
+
+import argparse
+import asyncio
+from datetime import date, timedelta
+
+import structlog
+
+from app.db import dispose_engines, get_engine
+from app.models import BUMP_GENERATION_SQL
+from app.partitions import (
+    MONTHS_AHEAD,
+    PartitionSet,
+    add_months,
+    list_partitions_sql,
+    partition_name,
+)
+from app.rollup import rollup_refresh_statements, rollup_trim_statements
+
+logger = structlog.get_logger()
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Maintain video_snapshots partitions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="log the attached partitions")
+    ensure = commands.add_parser("ensure", help="create partitions for the coming months")
+    ensure.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    drop = commands.add_parser("drop", help="drop partitions entirely before a date")
+    drop.add_argument("--before", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    return parser.parse_args(argv)
+
+
+async def main(argv: list[str] | None = None) -> None:
+    args = _parse_args(argv)
+    engine = get_engine()
+    try:
+        async with engine.begin() as connection:
+            result = await connection.exec_driver_sql(list_partitions_sql())
+            partitions = PartitionSet(name for (name,) in result.all())
+
+            if args.command == "list":
+                names = [partition_name(month) for month in partitions.months()]
+                logger.info("partitions", count=len(names), partitions=names)
+                return
+
+            if args.command == "ensure":
+                statements = partitions.ahead_statements(date.today(), args.months_ahead)
+                for statement in statements:
+                    await connection.exec_driver_sql(statement)
+                logger.info("partitions_created", count=len(statements))
+                return
+
+            expired = partitions.expired(args.before)
+            if not expired:
+                logger.info("partitions_dropped", count=0)
+                return
+            for statement in partitions.drop_statements(args.before):
+                await connection.exec_driver_sql(statement)
+            # Rollup days are session-local; one day of slack covers the UTC month edge
+            since = add_months(expired[-1], 1) - timedelta(days=1)
+            for statement in rollup_trim_statements(since) + rollup_refresh_statements(since):
+                await connection.exec_driver_sql(statement)
+            await connection.exec_driver_sql(BUMP_GENERATION_SQL)
+            logger.info(
+                "partitions_dropped",
+                count=len(expired),
+                partitions=[partition_name(month) for month in expired],
+            )
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
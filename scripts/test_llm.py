@@ -13,8 +13,11 @@ async def main() -> None:
     load_dotenv()
     question = " ".join(sys.argv[1:])
     client = OpenRouterClient()
-    response = await client.generate_sql(question)
-    print(response.sql)
+    try:
+        response = await client.generate_sql(question)
+        print(response.sql)
+    finally:
+        await client.close()
 
 
 if __name__ == "__main__":
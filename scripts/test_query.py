@@ -3,6 +3,7 @@ import sys
 
 from dotenv import load_dotenv
 
+from app.db import dispose_engines
 from app.llm import OpenRouterClient, SqlGenerationError
 from app.query_executor import QueryExecutor, SqlExecutionError
 
@@ -24,7 +25,8 @@ async def main() -> None:
     except (SqlGenerationError, SqlExecutionError) as exc:
         raise SystemExit(f"Error: {exc}") from exc
     finally:
-        await executor.close()
+        await llm.close()
+        await dispose_engines()
 
 
 if __name__ == "__main__":
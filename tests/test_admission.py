@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+from app.admission import AdmissionBusyError, CostGate, PlanEstimate, Verdict, parse_plan
+
+PLAN = [
+    {
+        "Plan": {
+            "Node Type": "Aggregate",
+            "Total Cost": 1250.5,
+            "Plan Rows": 1,
+            "Plans": [
+                {
+                    "Node Type": "Nested Loop",
+                    "Total Cost": 1200.0,
+                    "Plan Rows": 40000,
+                    "Plans": [
+                        {"Node Type": "Seq Scan", "Total Cost": 4.0, "Plan Rows": 200},
+                        {"Node Type": "Seq Scan", "Total Cost": 4.0, "Plan Rows": 200},
+                    ],
+                }
+            ],
+        }
+    }
+]
+
+
+def _gate(heavy_slots: int = 1) -> CostGate:
+    return CostGate(soft_cost=100, hard_cost=10_000, hard_rows=1_000_000, heavy_slots=heavy_slots)
+
+
+@pytest.mark.parametrize("explain", [PLAN, json.dumps(PLAN)])
+def test_parse_plan_reads_cost_and_largest_node(explain):
+    assert parse_plan(explain) == PlanEstimate(total_cost=1250.5, rows=1.0, max_rows=40000.0)
+
+
+@pytest.mark.parametrize(
+    ("cost", "rows", "verdict"),
+    [
+        (50, 10, Verdict.ADMIT),
+        (500, 10, Verdict.QUEUE),
+        (50_000, 10, Verdict.REJECT_COST),
+        (500, 5_000_000, Verdict.REJECT_ROWS),
+    ],
+)
+def test_check_classifies_against_limits(cost, rows, verdict):
+    gate = _gate()
+    assert gate.check(PlanEstimate(total_cost=cost, rows=1, max_rows=rows)) is verdict
+
+
+def test_rejects_soft_limit_above_hard_limit():
+    with pytest.raises(ValueError):
+        CostGate(soft_cost=10, hard_cost=1, hard_rows=1, heavy_slots=1)
+
+
+async def test_queued_queries_share_heavy_slots():
+    gate = _gate(heavy_slots=1)
+    async with gate.slot(Verdict.QUEUE, timeout=1):
+        async with gate.slot(Verdict.ADMIT, timeout=1):
+            pass  # Cheap queries never wait
+        with pytest.raises(AdmissionBusyError):
+            async with gate.slot(Verdict.QUEUE, timeout=0.01):
+                pass
+    async with gate.slot(Verdict.QUEUE, timeout=1):
+        pass
+
+    stats = gate.stats()
+    assert (stats.rejected_busy, stats.waiting) == (1, 0)
+
+
+async def test_waiting_query_runs_when_slot_frees():
+    gate = _gate(heavy_slots=1)
+    order = []
+
+    async def heavy(name: str) -> None:
+        async with gate.slot(Verdict.QUEUE, timeout=1):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(heavy("first"), heavy("second"))
+    assert order == ["first", "second"]
+
+
+def test_stats_track_estimated_against_actual_cost():
+    gate = _gate()
+    gate.check(PlanEstimate(total_cost=50, rows=1, max_rows=10))
+    gate.check(PlanEstimate(total_cost=50_000, rows=1, max_rows=10))
+    gate.record(PlanEstimate(total_cost=50, rows=1, max_rows=10), elapsed_ms=5.0)
+    gate.record(PlanEstimate(total_cost=150, rows=1, max_rows=10), elapsed_ms=15.0)
+
+    stats = gate.stats()
+    assert (stats.checked, stats.admitted, stats.rejected_cost) == (2, 1, 1)
+    assert stats.executed == 2
+    assert stats.mean_estimated_cost == pytest.approx(100.0)
+    assert stats.ms_per_cost_unit == pytest.approx(0.1)
+    assert stats.max_estimated_cost == 150
@@ -0,0 +1,65 @@
+from app.cache import LruCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hit_and_miss_counters():
+    cache: LruCache[str, int] = LruCache(max_entries=2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+
+
+def test_evicts_least_recently_used():
+    cache: LruCache[str, int] = LruCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats().evictions == 1
+
+
+def test_ttl_expires_entries():
+    clock = FakeClock()
+    cache: LruCache[str, int] = LruCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.put("a", 1)
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+    assert cache.stats().expirations == 1
+    assert len(cache) == 0
+
+
+def test_weight_budget_evicts_until_under_limit():
+    cache: LruCache[str, str] = LruCache(
+        max_entries=10, max_weight=10, weigher=lambda key, value: len(value)
+    )
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    cache.put("c", "xxxx")
+    assert cache.get("a") is None
+    assert cache.stats().weight == 8
+    cache.put("huge", "x" * 11)
+    assert cache.get("huge") is None
+    assert cache.get("c") == "xxxx"
+
+
+def test_hit_rate():
+    cache: LruCache[str, int] = LruCache(max_entries=2)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert cache.stats().hit_rate == 0.5
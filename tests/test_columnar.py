@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+pytest.importorskip("duckdb")
+
+from sqlalchemy import text
+
+from app.columnar import ColumnarFallback, ColumnarStore, _Copy, to_duckdb
+from app.config import get_settings
+from app.db import dispose_engines, get_engine
+
+# Postgres-dialect queries of the kind the LLM generates
+CORPUS = [
+    "SELECT COUNT(*) FROM videos",
+    "SELECT COUNT(DISTINCT creator_id) FROM videos WHERE views_count > 10000",
+    "SELECT SUM(views_count) FROM videos WHERE video_created_at >= '2025-11-01'",
+    "SELECT COUNT(*) FROM videos WHERE DATE(video_created_at) = '2025-11-28'",
+    "SELECT COUNT(*) FROM videos WHERE EXTRACT(HOUR FROM video_created_at) = 23",
+    "SELECT SUM(delta_views_count) FROM video_snapshots WHERE DATE(created_at) = '2025-11-28'",
+    (
+        "SELECT COUNT(DISTINCT video_id) FROM video_snapshots "
+        "WHERE created_at::date BETWEEN '2025-11-26' AND '2025-11-28' AND delta_likes_count > 0"
+    ),
+    "SELECT SUM(likes_count) / COUNT(*) FROM videos",
+    "SELECT SUM(likes_count) / COUNT(*) * 100 FROM videos",
+    "SELECT AVG(views_count) FROM videos",
+    "SELECT CAST(AVG(comments_count) AS INTEGER) FROM videos",
+    "SELECT MAX(views_count) - MIN(views_count) FROM videos",
+    (
+        "SELECT COUNT(*) FROM (SELECT creator_id FROM videos GROUP BY creator_id "
+        "HAVING COUNT(*) > 1) AS t"
+    ),
+    (
+        "SELECT MAX(share) FROM (SELECT views_count * 100 / "
+        "SUM(views_count) OVER (PARTITION BY creator_id) AS share FROM videos) AS t"
+    ),
+]
+
+
+def test_sums_keep_postgres_numeric_division():
+    assert to_duckdb("SELECT SUM(likes_count) / COUNT(*) FROM videos") == (
+        "SELECT CAST(SUM(likes_count) AS DECIMAL(38, 6)) / COUNT(*) FROM videos"
+    )
+    assert "CAST(SUM(x) OVER (PARTITION BY y) AS DECIMAL(38, 6))" in to_duckdb(
+        "SELECT SUM(x) OVER (PARTITION BY y) FROM t"
+    )
+
+
+async def test_stale_copy_falls_back_without_refreshing_twice(monkeypatch):
+    store = ColumnarStore(timeout=1)
+    started = []
+    monkeypatch.setattr(store, "schedule_refresh", lambda: started.append(True))
+
+    with pytest.raises(ColumnarFallback):
+        await store.scalar("SELECT COUNT(*) FROM videos", generation=1)
+
+    assert started == [True]
+    assert store.stats().fallbacks == 1
+    assert store.stats().generation is None
+
+
+async def test_multi_column_result_counts_only_as_fallback():
+    import duckdb
+
+    store = ColumnarStore(timeout=1)
+    store._copy = _Copy(database=duckdb.connect(), generation=1, videos=0, snapshots=0)
+
+    assert await store.scalar("SELECT 42", generation=1) == 42
+    with pytest.raises(ColumnarFallback, match="single value"):
+        await store.scalar("SELECT 1, 2", generation=1)
+
+    stats = store.stats()
+    assert (stats.answered, stats.fallbacks) == (1, 1)
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_TOKEN", "token")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "key")
+    get_settings.cache_clear()
+    yield get_settings()
+    get_settings.cache_clear()
+
+
+@pytest.mark.skipif("DATABASE_URL" not in os.environ, reason="DATABASE_URL not set")
+async def test_local_answers_match_postgres(settings, monkeypatch):
+    try:
+        store = ColumnarStore(timeout=5)
+        await store.refresh()
+        monkeypatch.setattr(store, "schedule_refresh", lambda: None)
+        generation = store.stats().generation
+        assert generation is not None
+
+        async with get_engine().connect() as connection:
+            for sql in CORPUS:
+                expected = (await connection.execute(text(sql))).scalar()
+                local = await store.scalar(sql, generation=generation)
+                assert int(local or 0) == int(expected or 0), sql
+
+        with pytest.raises(ColumnarFallback):
+            await store.scalar("SELECT COUNT(*) FROM creator_daily_stats", generation)
+        with pytest.raises(ColumnarFallback):
+            await store.scalar("SELECT COUNT(*) FROM videos", generation + 1)
+        assert store.stats().answered == len(CORPUS)
+    finally:
+        await dispose_engines()
@@ -0,0 +1,53 @@
+import asyncio
+import os
+
+import pytest
+
+from app import db
+from app.config import get_settings
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", os.environ.get("DATABASE_URL", "postgresql+asyncpg://x/y"))
+    monkeypatch.setenv("TELEGRAM_TOKEN", "token")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "key")
+    monkeypatch.setenv("DB_POOL_SIZE", "2")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    get_settings.cache_clear()
+    yield get_settings()
+    get_settings.cache_clear()
+
+
+async def test_registry_shares_one_engine_per_url(settings):
+    try:
+        engine = db.get_engine()
+        assert db.get_engine() is engine
+        assert db.get_engine("postgresql+asyncpg://other/db") is not engine
+        assert db.get_session_factory().kw["bind"] is engine
+        assert db.pool_stats(engine).size == 2
+    finally:
+        await db.dispose_engines()
+    assert db.get_engine() is not engine
+    await db.dispose_engines()
+
+
+@pytest.mark.skipif("DATABASE_URL" not in os.environ, reason="DATABASE_URL not set")
+async def test_pool_stats_report_warm_up_and_waiting(settings):
+    try:
+        engine = db.get_engine()
+        await db.warm_up(engine, 5)
+        assert db.pool_stats(engine).checked_in == 2
+
+        async def hold() -> None:
+            async with engine.connect():
+                await asyncio.sleep(0.1)
+
+        tasks = [asyncio.create_task(hold()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        stats = db.pool_stats(engine)
+        assert (stats.checked_out, stats.waiting) == (2, 1)
+        await asyncio.gather(*tasks)
+        assert db.pool_stats(engine).peak_waiting >= 1
+    finally:
+        await db.dispose_engines()
@@ -0,0 +1,200 @@
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from app.intents import IntentSqlGenerator, extract_entities, parse_question
+from app.llm import LlmResponse
+from app.sql_guard import validate_sql
+from app.sql_shapes import match_delta_query
+
+TODAY = date(2025, 12, 2)
+CREATOR = "e4b06ce6-0741-c7a8-7ce4-2c8218072e8c"
+
+# Questions from tests/test_llm_integration.py and their common variations
+CORPUS = [
+    ("Сколько всего видео в системе?", "SELECT COUNT(*) FROM videos"),
+    ("Сколько видео?", "SELECT COUNT(*) FROM videos"),
+    ("Сколько всего просмотров?", "SELECT SUM(views_count) FROM videos"),
+    (
+        "Сколько просмотров было 1 декабря?",
+        (
+            "SELECT SUM(delta_views_count) FROM video_snapshots "
+            "WHERE created_at >= '2025-12-01' AND created_at < '2025-12-02'"
+        ),
+    ),
+    ("Сколько всего лайков?", "SELECT SUM(likes_count) FROM videos"),
+    ("Какое максимальное количество лайков у видео?", "SELECT MAX(likes_count) FROM videos"),
+    ("Среднее количество просмотров", "SELECT AVG(views_count) FROM videos"),
+    (
+        f"Сколько видео у креатора с id {CREATOR} вышло с 1 ноября по 5 ноября 2025 включительно?",
+        (
+            f"SELECT COUNT(*) FROM videos WHERE creator_id = '{CREATOR}' "
+            "AND video_created_at >= '2025-11-01' AND video_created_at < '2025-11-06'"
+        ),
+    ),
+    (
+        f"Сколько видео у креатора {CREATOR.upper()}?",  # Ids keep their casing
+        f"SELECT COUNT(*) FROM videos WHERE creator_id = '{CREATOR.upper()}'",
+    ),
+    (
+        "Сколько видео набрало больше 100 000 просмотров за всё время?",
+        "SELECT COUNT(*) FROM videos WHERE views_count > 100000",
+    ),
+    (
+        "На сколько просмотров в сумме выросли все видео 28 ноября 2025?",
+        (
+            "SELECT SUM(delta_views_count) FROM video_snapshots "
+            "WHERE created_at >= '2025-11-28' AND created_at < '2025-11-29'"
+        ),
+    ),
+    (
+        "Сколько новых комментариев было вчера?",
+        (
+            "SELECT SUM(delta_comments_count) FROM video_snapshots "
+            "WHERE created_at >= '2025-12-01' AND created_at < '2025-12-02'"
+        ),
+    ),
+    (
+        f"Прирост лайков за ноябрь у креатора {CREATOR}",
+        (
+            "SELECT SUM(s.delta_likes_count) FROM video_snapshots s JOIN videos v "
+            "ON v.id = s.video_id WHERE s.created_at >= '2025-11-01' "
+            f"AND s.created_at < '2025-12-01' AND v.creator_id = '{CREATOR}'"
+        ),
+    ),
+    (
+        "Сколько видео вышло в декабре 2024 года?",
+        (
+            "SELECT COUNT(*) FROM videos "
+            "WHERE video_created_at >= '2024-12-01' AND video_created_at < '2025-01-01'"
+        ),
+    ),
+    (
+        "Сколько жалоб было с 30 декабря по 2 января?",  # Year-less range across New Year
+        (
+            "SELECT SUM(delta_reports_count) FROM video_snapshots "
+            "WHERE created_at >= '2024-12-30' AND created_at < '2025-01-03'"
+        ),
+    ),
+    (
+        "сколько лайков 28.11.2025",
+        (
+            "SELECT SUM(delta_likes_count) FROM video_snapshots "
+            "WHERE created_at >= '2025-11-28' AND created_at < '2025-11-29'"
+        ),
+    ),
+]
+
+# Questions the LLM has to answer
+NOT_UNDERSTOOD = [
+    "Сколько видео у каждого создателя?",
+    "Покажи мне id всех видео",
+    "Расскажи про видео",
+    "Удали все видео",
+    "Сколько просмотров и лайков было 1 декабря?",  # Two metrics
+    "Сколько видео 1 декабря?",  # Published or measured that day?
+    "На сколько выросли просмотры?",  # Growth over no period
+    "Сколько просмотров было 31 февраля?",
+    "Сколько просмотров у видео 9b810e76-6ec9-d286-63ca-828dd5f4b3b2?",  # Not a creator id
+    "Сколько просмотров было 1 декабря и 2 декабря?",
+]
+
+
+@pytest.mark.parametrize(("question", "sql"), CORPUS)
+def test_common_questions_become_template_sql(question, sql):
+    intent = parse_question(question, TODAY)
+    assert intent is not None
+    assert intent.to_sql() == sql
+    assert validate_sql(sql) == sql
+
+
+@pytest.mark.parametrize("question", NOT_UNDERSTOOD)
+def test_unrecognised_questions_go_to_the_llm(question):
+    assert parse_question(question, TODAY) is None
+
+
+def test_growth_questions_use_the_range_sum_shape():
+    for question, sql in CORPUS:
+        intent = parse_question(question, TODAY)
+        if intent is not None and intent.kind == "metric_growth":
+            assert match_delta_query(sql) is not None, question
+
+
+class CountingGenerator:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def generate_sql(self, user_question: str) -> LlmResponse:
+        self.calls += 1
+        return LlmResponse(sql="SELECT COUNT(*) FROM videos")
+
+
+async def test_generator_falls_back_and_reports_coverage():
+    inner = CountingGenerator()
+    generator = IntentSqlGenerator(inner, today=lambda: TODAY)
+    for question, _ in CORPUS[:3]:
+        await generator.generate_sql(question)
+    await generator.generate_sql(NOT_UNDERSTOOD[0])
+
+    stats = generator.stats()
+    assert inner.calls == 1
+    assert (stats.questions, stats.answered, stats.fallbacks) == (4, 3, 1)
+    assert stats.coverage == 0.75
+    assert stats.intents == {"video_count": 2, "metric_total": 1}
+
+
+@pytest.mark.skipif("DATABASE_URL" not in os.environ, reason="DATABASE_URL not set")
+async def test_template_sql_runs_on_the_database():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    try:
+        async with engine.connect() as connection:
+            for _, sql in CORPUS:
+                value = (await connection.execute(text(sql))).scalar()
+                assert value is None or value >= 0, sql
+    finally:
+        await engine.dispose()
+
+
+def test_ordinal_days_are_understood():
+    intent = parse_question("Сколько просмотров было первое декабря?", TODAY)
+    assert intent is not None
+    assert intent.to_sql() == CORPUS[3][1]
+
+
+def test_entities_ignore_wording_but_not_meaning():
+    one = extract_entities("Сколько просмотров 1 декабря?", TODAY)
+    same = extract_entities("просмотры за первое декабря", TODAY)
+    creators = extract_entities("Сколько креаторов опубликовали видео в ноябре?", TODAY)
+    videos = extract_entities("Сколько видео опубликовали в ноябре?", TODAY)
+    assert one is not None and same is not None
+    assert one.values == same.values
+    assert "2025-12-01..2025-12-02" in one.values
+    assert creators is not None and videos is not None
+    assert creators.values != videos.values
+    upper = extract_entities(f"Сколько видео у креатора {CREATOR.upper()}?", TODAY)
+    lower = extract_entities(f"Сколько видео у креатора {CREATOR}?", TODAY)
+    assert upper is not None and lower is not None
+    assert CREATOR.upper() in upper.values
+    assert upper.values != lower.values
+
+
+@pytest.mark.parametrize(
+    ("plain", "marked", "value"),
+    [
+        ("Сколько просмотров в ноябре?", "Сколько новых просмотров в ноябре?", "growth"),
+        ("Какой прирост просмотров в ноябре?", "Сколько просмотров в ноябре?", "growth"),
+        ("Сколько лайков у видео?", "Сколько лайков за день у видео?", "growth"),
+        ("Сколько видео у креатора 42?", "Сколько видео не у креатора 42?", "not"),
+        ("Сколько видео с лайками?", "Сколько видео без лайков?", "not"),
+        ("Сколько видео у креаторов?", "Сколько видео у всех, кроме креатора 42?", "not"),
+    ],
+)
+def test_growth_and_negation_are_entities(plain, marked, value):
+    plain_entities = extract_entities(plain, TODAY)
+    marked_entities = extract_entities(marked, TODAY)
+    assert plain_entities is not None and marked_entities is not None
+    assert value in plain_entities.values ^ marked_entities.values
@@ -0,0 +1,188 @@
+import asyncio
+import contextlib
+import json
+import os
+
+import httpx
+import pytest
+import structlog
+from tenacity import stop_after_attempt
+
+from app.config import get_settings
+from app.llm import OpenRouterClient, SqlGenerationError
+from app.main import report_stats
+from app.sql_stream import SqlStreamExtractor
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", os.environ.get("DATABASE_URL", "postgresql+asyncpg://x/y"))
+    monkeypatch.setenv("TELEGRAM_TOKEN", "token")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "key")
+    get_settings.cache_clear()
+    yield get_settings()
+    get_settings.cache_clear()
+
+
+def _events(*contents: str) -> list[bytes]:
+    events = [b": OPENROUTER PROCESSING\n\n"]
+    for content in contents:
+        chunk = {"choices": [{"delta": {"content": content}}]}
+        events.append(f"data: {json.dumps(chunk)}\n\n".encode())
+    events.append(b"data: [DONE]\n\n")
+    return events
+
+
+class StreamingServer:
+    """Mock OpenRouter that records requests and how much of the stream was read."""
+
+    def __init__(self, events: list[bytes]) -> None:
+        self.events = events
+        self.sent = 0
+        self.payloads: list[dict] = []
+
+    async def _body(self):
+        for event in self.events:
+            self.sent += 1
+            yield event
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.payloads.append(json.loads(request.content))
+        return httpx.Response(200, content=self._body())
+
+
+class PooledServer(StreamingServer):
+    """Mock OpenRouter whose transport dials a connection only for the first request."""
+
+    def __init__(self, events: list[bytes]) -> None:
+        super().__init__(events)
+        self.connected = False
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if not self.connected:
+            self.connected = True
+            await request.extensions["trace"]("connection.connect_tcp.complete", {})
+        return super().handler(request)
+
+
+def _client(server: StreamingServer) -> OpenRouterClient:
+    client = OpenRouterClient()
+    client._client = httpx.AsyncClient(
+        base_url="https://openrouter.test", transport=httpx.MockTransport(server.handler)
+    )
+    return client
+
+
+@pytest.mark.parametrize(
+    ("chunks", "sql"),
+    [
+        (
+            ["```sql\nSELECT COUNT(*)", " FROM videos\n```", "\nExplanation"],
+            "SELECT COUNT(*) FROM videos",
+        ),
+        (
+            ["SELECT SUM(views_count) FROM videos WHERE x = 'a;b'", ";", " -- done"],
+            "SELECT SUM(views_count) FROM videos WHERE x = 'a;b'",
+        ),
+        (
+            ["Запрос:\nSELECT MAX(likes_count)\n", "FROM videos\n\n", "Он вернёт"],
+            "SELECT MAX(likes_count)\nFROM videos",
+        ),
+        (
+            ["SELECT COUNT(*) FROM (\n\nSELECT 1) t", "\n\nok"],
+            "SELECT COUNT(*) FROM (\n\nSELECT 1) t",
+        ),
+    ],
+)
+def test_extractor_stops_at_the_end_of_the_statement(chunks, sql):
+    extractor = SqlStreamExtractor()
+    results = [extractor.feed(chunk) for chunk in chunks]
+    assert next(result for result in results if result is not None) == sql
+    assert results[-1] == sql  # Later text changes nothing
+
+
+def test_unfinished_statement_is_returned_whole():
+    extractor = SqlStreamExtractor()
+    assert extractor.feed("SELECT COUNT(*) FROM videos") is None
+    assert extractor.finish() == "SELECT COUNT(*) FROM videos"
+
+
+async def test_stream_is_closed_once_the_statement_is_complete(settings):
+    server = StreamingServer(
+        _events("```sql\nSELECT COUNT(*) FROM videos", "\n```", "\nЭтот запрос", " считает видео")
+    )
+    client = _client(server)
+    try:
+        response = await client.generate_sql("Сколько видео?")
+    finally:
+        await client.close()
+
+    assert response.sql == "SELECT COUNT(*) FROM videos"
+    assert server.sent < len(server.events)
+    payload = server.payloads[0]
+    assert payload["stream"] is True
+    assert (payload["max_tokens"], payload["stop"]) == (300, [";"])
+    stats = client.stream_stats()
+    assert (stats.streams, stats.early_closes) == (1, 1)
+
+
+async def test_stream_without_statement_end_uses_the_whole_text(settings):
+    server = StreamingServer(_events("SELECT SUM(likes_count) ", "FROM videos"))
+    client = _client(server)
+    try:
+        response = await client.generate_sql("Сколько лайков?")
+    finally:
+        await client.close()
+
+    assert response.sql == "SELECT SUM(likes_count) FROM videos"
+    assert client.stream_stats().early_closes == 0
+
+
+async def test_stream_error_event_fails_generation(settings):
+    error = b'data: {"error": {"message": "overloaded"}}\n\n'
+    client = _client(StreamingServer([error]))
+    try:
+        with pytest.raises(SqlGenerationError, match="overloaded"):
+            generate_once = client.generate_sql.retry_with(stop=stop_after_attempt(1), reraise=True)
+            await generate_once(client, "Сколько видео?")
+    finally:
+        await client.close()
+
+
+async def test_open_creates_the_pool_once(settings):
+    client = OpenRouterClient()
+    await client.open()
+    pooled = client._client
+    await client.open()
+    assert pooled is not None and client._client is pooled
+
+    await client.close()
+    await client.close()  # Closing twice is harmless
+    assert client._client is None and pooled.is_closed
+
+
+async def test_requests_reuse_the_pooled_connection(settings):
+    server = PooledServer(_events("SELECT COUNT(*) FROM videos;"))
+    client = _client(server)
+    pooled = client._client
+    try:
+        for _ in range(3):
+            await client.generate_sql("Сколько видео?")
+    finally:
+        await client.close()
+
+    assert len(server.payloads) == 3
+    assert pooled is not None and pooled.is_closed
+    stats = client.stats()
+    assert (stats.requests, stats.connections_opened, stats.connections_reused) == (3, 1, 2)
+
+
+async def test_pool_stats_are_reported(settings):
+    client = OpenRouterClient()
+    with structlog.testing.capture_logs() as logs:
+        task = asyncio.create_task(report_stats(0.001, {"llm": client.stats}))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    assert {"component": "llm", "requests": 0, "connections_reused": 0}.items() <= logs[0].items()
@@ -13,6 +13,7 @@ import os
 import pytest
 from tenacity import RetryError
 
+from app.db import dispose_engines
 from app.llm import OpenRouterClient, SqlGenerationError
 from app.query_executor import QueryExecutor, SqlExecutionError
 from app.sql_guard import SqlValidationError, validate_sql
@@ -35,7 +36,7 @@ async def query_executor():
     """Create query executor for testing."""
     executor = QueryExecutor()
     yield executor
-    await executor.close()
+    await dispose_engines()
 
 
 class TestVideoCountQueries:
@@ -0,0 +1,331 @@
+import json
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import text
+
+from app.models import IngestCheckpoint
+from app.partitions import PartitionSet, list_partitions_sql
+from scripts.load_data import (
+    _array_offset,
+    _build_copy_chunk,
+    _byte_ranges,
+    _copy_batches,
+    _file_fingerprint,
+    _incremental_load,
+    _iter_batches,
+    _iter_range_videos,
+    _iter_videos,
+    _parallel_copy,
+    _writer_of,
+)
+
+requires_database = pytest.mark.skipif(
+    "DATABASE_URL" not in os.environ, reason="DATABASE_URL not set"
+)
+
+
+def _video(video_id: str, snapshots: int) -> dict:
+    return {
+        "id": video_id,
+        "creator_id": "creator",
+        "video_created_at": "2025-11-01T10:00:00+00:00",
+        "views_count": 10,
+        "created_at": "2025-11-01T10:00:00+00:00",
+        "updated_at": "2025-11-02T10:00:00+00:00",
+        "snapshots": [
+            {
+                "id": f"{video_id}-{index}",
+                "created_at": "2025-11-01 11:00:00",
+                "updated_at": "2025-11-01 11:00:00",
+                "delta_views_count": index,
+            }
+            for index in range(snapshots)
+        ],
+    }
+
+
+def _export(tmp_path, videos: list[dict]):
+    path = tmp_path / "videos.json"
+    path.write_text(json.dumps({"videos": videos}))
+    return path
+
+
+class OneConnection:
+    """Engine stand-in that hands every caller the test's connection."""
+
+    def __init__(self, connection) -> None:
+        self.connection = connection
+
+    @asynccontextmanager
+    async def connect(self):
+        yield self.connection
+
+    @asynccontextmanager
+    async def begin(self):
+        async with self.connection.begin_nested():
+            yield self.connection
+
+
+@pytest.fixture
+async def connection():
+    """A connection inside a transaction that is rolled back after the test.
+
+    The loaders' own transactions become savepoints, so a test can
+    truncate or merge into the real tables without leaving a trace.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    try:
+        async with engine.connect() as connection:
+            await connection.begin()
+            await connection.exec_driver_sql("SELECT 1")  # Starts the transaction on the driver
+            try:
+                yield connection
+            finally:
+                await connection.rollback()
+    finally:
+        await engine.dispose()
+
+
+async def _partitions(connection) -> PartitionSet:
+    result = await connection.exec_driver_sql(list_partitions_sql())
+    return PartitionSet(name for (name,) in result.all())
+
+
+async def _count(connection, sql: str) -> int:
+    return (await connection.execute(text(sql))).scalar_one()
+
+
+def _sessions(connection):
+    """Session factory whose transactions are savepoints on the test connection."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(
+        bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False
+    )
+
+
+def test_iter_videos_streams_across_small_reads(tmp_path):
+    videos = [_video(f"v{index}", snapshots=index) for index in range(20)]
+    path = tmp_path / "videos.json"
+    path.write_text(json.dumps({"meta": {"videos": 1}, "videos": videos}, indent=2))
+
+    streamed = list(_iter_videos(path, chunk_size=7))
+
+    assert streamed == videos
+
+
+def test_iter_videos_handles_empty_array(tmp_path):
+    path = tmp_path / "videos.json"
+    path.write_text('{"videos": []}')
+    assert list(_iter_videos(path)) == []
+
+
+@pytest.mark.parametrize("step", [1, 7, 64, 1 << 20])
+def test_byte_ranges_decode_every_video_once(tmp_path, step):
+    videos = [_video(f"v{index}", snapshots=index % 3) for index in range(10)]
+    videos[3]["creator_id"] = 'brace } quote " {"creator_id": 1} backslash \\ ё'
+    videos[5]["creator_id"] = "кириллица {}"
+    path = tmp_path / "videos.json"
+    path.write_text(json.dumps({"meta": {"x": {}}, "videos": videos}, indent=2, ensure_ascii=False))
+    first = _array_offset(path, chunk_size=5)
+
+    decoded = [
+        video
+        for start, end in _byte_ranges(first, path.stat().st_size, step)
+        for video in _iter_range_videos(path, start, end, first)
+    ]
+
+    assert decoded == videos
+
+
+def test_byte_ranges_of_an_empty_array(tmp_path):
+    path = _export(tmp_path, [])
+    first = _array_offset(path)
+
+    assert [
+        video
+        for span in _byte_ranges(first, path.stat().st_size, 1)
+        for video in _iter_range_videos(path, *span, first)
+    ] == []
+
+
+def test_copy_chunk_is_rendered_per_writer(tmp_path):
+    path = _export(tmp_path, [_video(f"v{index}", snapshots=2) for index in range(6)])
+    first = _array_offset(path)
+
+    chunk = _build_copy_chunk(path, first, path.stat().st_size, first, writers=2)
+
+    assert (chunk.video_count, chunk.snapshot_count) == (6, 12)
+    for writer, data in enumerate(chunk.videos):
+        for row in data.decode().splitlines():
+            assert _writer_of(row.split(",")[0], 2) == writer
+    assert b"2025-11-01T11:00:00+00:00" in b"".join(chunk.snapshots)  # Naive times are UTC
+    assert len(chunk.snapshot_months) == 1
+
+
+def test_iter_batches_keeps_videos_before_their_snapshots():
+    videos = [_video(f"v{index}", snapshots=3) for index in range(5)]
+
+    batches = list(_iter_batches(videos, size=4))
+
+    seen_videos: set[str] = set()
+    for video_rows, snapshot_rows in batches:
+        assert len(video_rows) <= 4
+        assert len(snapshot_rows) <= 4
+        seen_videos.update(row["id"] for row in video_rows)
+        assert all(row["video_id"] in seen_videos for row in snapshot_rows)
+    assert sum(len(snapshots) for _, snapshots in batches) == 15
+    assert len(seen_videos) == 5
+
+
+@requires_database
+async def test_copy_merge_upserts_staged_rows(connection, tmp_path):
+    videos = [_video(f"copy-{index}", snapshots=2) for index in range(3)]
+    videos[0]["views_count"] = 99
+    await connection.execute(
+        text(
+            "INSERT INTO videos (id, creator_id, video_created_at, created_at, updated_at) "
+            "VALUES ('copy-0', 'creator', now(), now(), now())"
+        )
+    )
+    before = await _count(connection, "SELECT COUNT(*) FROM videos")
+    generation = await _count(connection, "SELECT generation FROM data_generation")
+
+    stats = await _copy_batches(
+        OneConnection(connection), "merge", await _partitions(connection), _export(tmp_path, videos)
+    )
+
+    assert (stats.videos, stats.snapshots) == (3, 6)
+    assert await _count(connection, "SELECT COUNT(*) FROM videos") == before + 2
+    assert await _count(connection, "SELECT views_count FROM videos WHERE id = 'copy-0'") == 99
+    assert (
+        await _count(
+            connection, "SELECT COUNT(*) FROM video_snapshots WHERE video_id LIKE 'copy-%'"
+        )
+        == 6
+    )
+    assert await _count(connection, "SELECT generation FROM data_generation") == generation + 1
+
+
+@requires_database
+async def test_copy_replace_swaps_the_whole_data_set(connection, tmp_path):
+    videos = [_video(f"copy-{index}", snapshots=2) for index in range(3)]
+
+    await _copy_batches(
+        OneConnection(connection),
+        "replace",
+        await _partitions(connection),
+        _export(tmp_path, videos),
+    )
+
+    assert await _count(connection, "SELECT COUNT(*) FROM videos") == 3
+    assert await _count(connection, "SELECT COUNT(*) FROM video_snapshots") == 6
+    assert await _count(connection, "SELECT SUM(delta_views_count) FROM video_daily_stats") == 3
+
+
+@requires_database
+async def test_parallel_copy_loads_worker_csv(connection, tmp_path):
+    videos = [_video(f"copy-{index}", snapshots=2) for index in range(3)]
+
+    stats = await _parallel_copy(
+        OneConnection(connection),
+        "merge",
+        1,
+        await _partitions(connection),
+        _export(tmp_path, videos),
+    )
+
+    assert (stats.videos, stats.snapshots) == (3, 6)
+    assert (
+        await _count(connection, "SELECT SUM(views_count) FROM videos WHERE id LIKE 'copy-%'") == 30
+    )
+    assert (
+        await _count(
+            connection,
+            "SELECT COUNT(*) FROM video_snapshots WHERE video_id LIKE 'copy-%' "
+            "AND created_at = '2025-11-01 11:00:00+00'",
+        )
+        == 6
+    )
+
+
+@requires_database
+async def test_incremental_load_skips_unchanged_videos_and_old_snapshots(connection, tmp_path):
+    videos = [_video(f"inc-{index}", snapshots=2) for index in range(2)]
+    sessions, partitions = _sessions(connection), await _partitions(connection)
+
+    first = await _incremental_load(sessions, partitions, "per-video", _export(tmp_path, videos))
+    again = await _incremental_load(sessions, partitions, "per-video", _export(tmp_path, videos))
+    videos[0]["views_count"] = 11
+    videos[0]["snapshots"].append(
+        {"id": "inc-0-late", "created_at": "2025-11-02 11:00:00", "updated_at": "2025-11-02"}
+    )
+    videos[1]["snapshots"].append(
+        {"id": "inc-1-old", "created_at": "2025-11-01 09:00:00", "updated_at": "2025-11-01"}
+    )
+    changed = await _incremental_load(sessions, partitions, "per-video", _export(tmp_path, videos))
+
+    assert (first.videos, first.snapshots) == (2, 4)
+    assert (again.videos, again.snapshots) == (0, 0)
+    assert (changed.videos, changed.snapshots) == (1, 1)
+    assert (
+        await _count(
+            connection,
+            "SELECT COUNT(*) FROM video_snapshots WHERE id IN ('inc-0-late', 'inc-1-old')",
+        )
+        == 1
+    )
+    assert (
+        await _count(
+            connection,
+            "SELECT COUNT(*) FROM snapshot_watermarks WHERE video_id = 'inc-0' "
+            "AND created_at = '2025-11-02 11:00:00+00'",
+        )
+        == 1
+    )
+
+
+@requires_database
+async def test_incremental_load_filters_against_the_global_watermark(connection, tmp_path):
+    await connection.execute(
+        text(
+            "INSERT INTO snapshot_watermarks (video_id, created_at) "
+            "VALUES ('*', '2025-11-01 12:00:00+00') "
+            "ON CONFLICT (video_id) DO UPDATE SET created_at = excluded.created_at"
+        )
+    )
+    video = _video("inc-new", snapshots=1)
+    video["snapshots"].append(
+        {"id": "inc-new-late", "created_at": "2025-11-01 13:00:00", "updated_at": "2025-11-01"}
+    )
+
+    stats = await _incremental_load(
+        _sessions(connection), await _partitions(connection), "global", _export(tmp_path, [video])
+    )
+
+    assert (stats.videos, stats.snapshots) == (1, 1)
+    assert (
+        await _count(connection, "SELECT created_at FROM snapshot_watermarks WHERE video_id = '*'")
+    ).isoformat() == "2025-11-01T13:00:00+00:00"
+
+
+@requires_database
+async def test_incremental_load_resumes_after_the_checkpoint(connection, tmp_path):
+    path = _export(tmp_path, [_video(f"inc-{index}", snapshots=1) for index in range(2)])
+    sessions = _sessions(connection)
+    async with sessions() as session, session.begin():
+        session.add(
+            IngestCheckpoint(
+                source=str(path.resolve()), fingerprint=_file_fingerprint(path), position=1
+            )
+        )
+
+    stats = await _incremental_load(sessions, await _partitions(connection), "per-video", path)
+
+    assert (stats.videos, stats.snapshots) == (1, 1)
+    assert await _count(connection, "SELECT COUNT(*) FROM videos WHERE id LIKE 'inc-%'") == 1
+    assert await _count(connection, "SELECT COUNT(*) FROM ingest_checkpoints") == 0
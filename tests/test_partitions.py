@@ -0,0 +1,61 @@
+from datetime import UTC, date, datetime, timedelta, timezone
+
+from app.partitions import (
+    PartitionSet,
+    add_months,
+    create_partition_sql,
+    month_of,
+    parse_partition_name,
+    partition_name,
+)
+
+
+def test_month_of_uses_utc():
+    moscow = timezone(timedelta(hours=3))
+    assert month_of(datetime(2025, 12, 1, 1, 0, tzinfo=moscow)) == date(2025, 11, 1)
+    assert month_of(datetime(2025, 12, 1, 1, 0)) == date(2025, 12, 1)
+
+
+def test_add_months_crosses_years():
+    assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+
+def test_partition_name_round_trip():
+    assert partition_name(date(2025, 11, 1)) == "video_snapshots_p202511"
+    assert parse_partition_name("video_snapshots_p202511") == date(2025, 11, 1)
+    assert parse_partition_name("video_snapshots_pkey") is None
+
+
+def test_create_partition_sql_bounds():
+    assert create_partition_sql(date(2025, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS video_snapshots_p202512 PARTITION OF video_snapshots "
+        "FOR VALUES FROM ('2025-12-01 00:00:00+00') TO ('2026-01-01 00:00:00+00')"
+    )
+
+
+def test_ensure_statements_only_for_missing_months():
+    partitions = PartitionSet(["video_snapshots_p202511"])
+    timestamps = [
+        datetime(2025, 11, 20, tzinfo=UTC),
+        datetime(2025, 12, 2, tzinfo=UTC),
+        datetime(2025, 12, 3, tzinfo=UTC),
+    ]
+    statements = partitions.ensure_statements(timestamps)
+    assert len(statements) == 1
+    assert "video_snapshots_p202512" in statements[0]
+    assert partitions.ensure_statements(timestamps) == []
+
+
+def test_drop_statements_keep_partial_months():
+    partitions = PartitionSet(
+        ["video_snapshots_p202510", "video_snapshots_p202511", "video_snapshots_p202512"]
+    )
+    statements = partitions.drop_statements(date(2025, 12, 15))
+    assert statements == [
+        "ALTER TABLE video_snapshots DETACH PARTITION video_snapshots_p202510",
+        "DROP TABLE video_snapshots_p202510",
+        "ALTER TABLE video_snapshots DETACH PARTITION video_snapshots_p202511",
+        "DROP TABLE video_snapshots_p202511",
+    ]
+    assert partitions.months() == [date(2025, 12, 1)]
@@ -0,0 +1,106 @@
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.db import dispose_engines, get_engine
+from app.prefix_sums import PrefixSumIndex, _build
+
+SUM_VIEWS = "SELECT SUM(delta_views_count) FROM video_snapshots"
+FOR_CREATOR = (
+    "SELECT SUM(s.delta_views_count) FROM video_snapshots s JOIN videos v ON v.id = s.video_id "
+    "WHERE v.creator_id = '{creator}' AND DATE(s.created_at) BETWEEN '{start}' AND '{end}'"
+)
+
+
+def _index() -> PrefixSumIndex:
+    index = PrefixSumIndex()
+    # Views, likes, comments, reports, snapshot count; Nov 2 has no rows
+    index._index = _build(
+        7,
+        [
+            ("a", date(2025, 11, 1), (10, 1, 0, 0, 2)),
+            ("b", date(2025, 11, 1), (5, 0, 0, 0, 1)),
+            ("a", date(2025, 11, 3), (20, 2, 1, 0, 3)),
+            ("b", date(2025, 11, 4), (-1, 0, 0, 0, 1)),
+        ],
+    )
+    return index
+
+
+@pytest.mark.parametrize(
+    ("sql", "expected"),
+    [
+        (SUM_VIEWS, 34),
+        (f"{SUM_VIEWS} WHERE DATE(created_at) = '2025-11-02'", 0),
+        (f"{SUM_VIEWS} WHERE created_at::date BETWEEN '2025-11-01' AND '2025-11-03'", 35),
+        (f"{SUM_VIEWS} WHERE created_at >= '2025-11-03' AND created_at < '2025-12-01'", 19),
+        (f"{SUM_VIEWS} WHERE DATE(created_at) < '2025-10-01'", 0),
+        ("SELECT COUNT(*) FROM video_snapshots WHERE DATE(created_at) >= '2025-11-02'", 4),
+        (FOR_CREATOR.format(creator="a", start="2025-11-02", end="2025-11-30"), 20),
+        (FOR_CREATOR.format(creator="unknown", start="2025-11-01", end="2025-11-30"), 0),
+    ],
+)
+def test_range_sums_are_differences_of_running_totals(sql, expected):
+    assert _index().lookup(sql, generation=7) == expected
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        f"{SUM_VIEWS} WHERE video_id = 'v1'",  # Not indexed per video
+        "SELECT MAX(delta_views_count) FROM video_snapshots",
+        "SELECT COUNT(*) FROM videos",
+    ],
+)
+def test_other_shapes_run_on_the_database(sql):
+    index = _index()
+    assert index.lookup(sql, generation=7) is None
+    assert index.stats().misses == 1
+
+
+def test_stale_index_schedules_a_rebuild(monkeypatch):
+    index = _index()
+    started = []
+    monkeypatch.setattr(index, "schedule_refresh", lambda: started.append(True))
+
+    assert index.lookup(SUM_VIEWS, generation=8) is None
+    assert started == [True]
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_TOKEN", "token")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "key")
+    get_settings.cache_clear()
+    yield get_settings()
+    get_settings.cache_clear()
+
+
+@pytest.mark.skipif("DATABASE_URL" not in os.environ, reason="DATABASE_URL not set")
+async def test_index_matches_base_tables(settings):
+    try:
+        index = PrefixSumIndex()
+        await index.refresh()
+        generation = index.stats().generation
+        assert generation is not None
+
+        async with get_engine().connect() as connection:
+            creator = await connection.scalar(text("SELECT MIN(creator_id) FROM videos"))
+            corpus = [
+                SUM_VIEWS,
+                f"{SUM_VIEWS} WHERE DATE(created_at) = '2025-11-28'",
+                (
+                    "SELECT SUM(delta_likes_count) FROM video_snapshots "
+                    "WHERE created_at >= '2025-11-27' AND created_at < '2025-11-29'"
+                ),
+                "SELECT COUNT(*) FROM video_snapshots WHERE created_at::date >= '2025-11-28'",
+                FOR_CREATOR.format(creator=creator, start="2025-11-01", end="2025-11-30"),
+            ]
+            for sql in corpus:
+                expected = (await connection.execute(text(sql))).scalar()
+                assert index.lookup(sql, generation) == int(expected or 0), sql
+    finally:
+        await dispose_engines()
@@ -0,0 +1,167 @@
+import asyncio
+import contextlib
+import os
+import time
+
+import pytest
+
+from app.admission import Verdict
+from app.config import get_settings
+from app.db import dispose_engines, get_engine, pool_stats
+from app.query_executor import QueryExecutor, QueryResult, QueryTimeoutError
+from app.runners import AsyncpgRunner, SessionRunner
+
+requires_database = pytest.mark.skipif(
+    "DATABASE_URL" not in os.environ, reason="DATABASE_URL not set"
+)
+
+
+@pytest.fixture
+async def executor(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", os.environ.get("DATABASE_URL", "postgresql+asyncpg://x/y"))
+    monkeypatch.setenv("TELEGRAM_TOKEN", "token")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "key")
+    monkeypatch.setenv("PREFIX_SUM_INDEX", "false")
+    get_settings.cache_clear()
+    executor = QueryExecutor()
+    runs: list[str] = []
+    reads: list[int] = []
+    executor.stored_generation = 1
+
+    async def read_generation():
+        # Stands in for the database read; keeps the real bookkeeping
+        reads.append(executor.stored_generation)
+        executor._generation_read_at = time.monotonic()
+        if executor._generation != executor.stored_generation:
+            executor._results.clear()
+        executor._generation = executor.stored_generation
+        return executor._generation
+
+    async def run(sql, key, cache=True):
+        runs.append(sql)
+        if cache:
+            executor._results.put(key, len(runs))
+        return QueryResult(value=len(runs))
+
+    monkeypatch.setattr(executor, "_read_generation", read_generation)
+    monkeypatch.setattr(executor, "_run", run)
+    executor.runs = runs
+    executor.reads = reads
+    yield executor
+    await dispose_engines()
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+async def database_settings(monkeypatch):
+    """Settings for an executor on the real database, with one heavy slot."""
+    monkeypatch.setenv("TELEGRAM_TOKEN", "token")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "key")
+    monkeypatch.setenv("PREFIX_SUM_INDEX", "false")
+    monkeypatch.setenv("QUERY_COST_SOFT_LIMIT", "0.001")  # Every statement queues
+    monkeypatch.setenv("QUERY_HEAVY_CONCURRENCY", "1")
+    get_settings.cache_clear()
+    yield monkeypatch
+    await dispose_engines()
+    get_settings.cache_clear()
+
+
+async def test_results_are_cached_within_a_generation(executor):
+    sql = "SELECT COUNT(*) FROM videos WHERE video_created_at >= '2025-11-01'"
+    first = await executor.fetch_scalar(sql)
+    second = await executor.fetch_scalar(sql)
+
+    assert first == second
+    assert len(executor.runs) == 1
+    assert len(executor.reads) == 1  # The hit did not touch the database
+
+
+async def test_watcher_notices_a_new_generation(executor):
+    sql = "SELECT COUNT(*) FROM videos"
+    await executor.fetch_scalar(sql)
+    executor.stored_generation = 2
+    watcher = asyncio.create_task(executor.watch_generation())
+    await asyncio.sleep(0.01)
+    watcher.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await watcher
+    await executor.fetch_scalar(sql)
+
+    assert len(executor.runs) == 2
+    assert executor.reads[-1] == 2
+
+
+async def test_generation_is_reread_without_a_watcher(executor, monkeypatch):
+    await executor.fetch_scalar("SELECT COUNT(*) FROM videos")
+    monkeypatch.setattr(executor, "_generation_read_at", time.monotonic() - 60)
+    await executor.fetch_scalar("SELECT COUNT(*) FROM videos")
+
+    assert len(executor.reads) == 2
+
+
+async def test_clock_dependent_queries_are_not_cached(executor):
+    sql = "SELECT COUNT(*) FROM videos WHERE video_created_at > NOW() - INTERVAL '7 days'"
+    await executor.fetch_scalar(sql)
+    await executor.fetch_scalar(sql)
+
+    assert len(executor.runs) == 2
+    assert executor.stats().size == 0
+
+
+async def test_clock_dependent_queries_do_not_share_a_flight(executor, monkeypatch):
+    release = asyncio.Event()
+    runs = executor.runs
+
+    async def slow_run(sql, key, cache=True):
+        runs.append(sql)
+        await release.wait()
+        return QueryResult(value=len(runs))
+
+    monkeypatch.setattr(executor, "_run", slow_run)
+    sql = "SELECT COUNT(*) FROM videos WHERE video_created_at >= CURRENT_DATE - 7"
+    calls = [asyncio.create_task(executor.fetch_scalar(sql)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.gather(*calls)
+
+    assert len(runs) == 3
+    assert executor.flight_stats().collapsed == 0
+
+
+@requires_database
+async def test_queued_statement_waits_without_a_connection(database_settings):
+    executor = QueryExecutor()
+    engine = get_engine()
+
+    async with executor._gate.slot(Verdict.QUEUE, timeout=5):
+        call = asyncio.create_task(executor.fetch_scalar("SELECT COUNT(*) FROM videos"))
+        while executor.admission_stats().waiting == 0:
+            await asyncio.sleep(0.01)
+        assert pool_stats(engine).checked_out == 0
+
+    assert (await call).value > 0
+    assert pool_stats(engine).checked_out == 0
+
+
+@requires_database
+@pytest.mark.parametrize("db_engine", ["sqlalchemy", "asyncpg"])
+async def test_abandoned_statement_is_cancelled_on_an_exhausted_pool(database_settings, db_engine):
+    async def no_limit(self, statement_timeout_ms, lock_timeout_ms):
+        pass  # Leaves the statement for the client to abandon
+
+    monkeypatch = database_settings
+    monkeypatch.setenv("DB_ENGINE", db_engine)
+    monkeypatch.setenv("DB_TIMEOUT", "1")
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    get_settings.cache_clear()
+    monkeypatch.setattr(SessionRunner, "limit", no_limit)
+    monkeypatch.setattr(AsyncpgRunner, "limit", no_limit)
+    executor = QueryExecutor()
+
+    with pytest.raises(QueryTimeoutError, match="abandoned"):
+        await executor.fetch_scalar("SELECT pg_sleep(30)")
+
+    stats = executor.execution_stats()
+    assert (stats.client_timeouts, stats.cancels_sent, stats.cancel_failures) == (1, 1, 0)
+    assert pool_stats(get_engine()).checked_out == 0
@@ -0,0 +1,41 @@
+import pytest
+
+from app.query_stats import QueryStats
+
+
+def test_counts_hits_and_executions_per_fingerprint():
+    stats = QueryStats()
+    stats.record_execution("a", "SELECT $1", 10.0)
+    stats.record_execution("a", "SELECT $1", 30.0)
+    stats.record_hit("a", "SELECT $1")
+    stats.record_execution("b", "SELECT 2", 5.0, failed=True)
+
+    shape = stats.get("a")
+    assert shape is not None
+    assert (shape.calls, shape.cache_hits, shape.executions) == (3, 1, 2)
+    assert shape.mean_ms == pytest.approx(20.0)
+    assert shape.max_ms == pytest.approx(30.0)
+    assert stats.get("b").errors == 1
+
+
+def test_snapshot_orders_by_total_time():
+    stats = QueryStats(top=2)
+    stats.record_execution("fast", "q1", 1.0)
+    stats.record_execution("slow", "q2", 50.0)
+    stats.record_execution("medium", "q3", 10.0)
+
+    snapshot = stats.snapshot()
+    assert snapshot.fingerprints == 3
+    assert [shape.fingerprint for shape in snapshot.top] == ["slow", "medium"]
+
+
+def test_evicts_least_recently_used_fingerprint():
+    stats = QueryStats(max_fingerprints=2)
+    stats.record_execution("a", "q1", 1.0)
+    stats.record_execution("b", "q2", 1.0)
+    stats.record_hit("a", "q1")
+    stats.record_execution("c", "q3", 1.0)
+
+    assert stats.get("b") is None
+    assert stats.get("a") is not None
+    assert stats.snapshot().evicted == 1
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import date
+
+from app.cache import LruCache
+from app.llm import LlmResponse
+from app.question_cache import CachingSqlGenerator, normalize_question
+
+TODAY = date(2025, 12, 2)
+
+
+class CountingGenerator:
+    def __init__(self, sql: str = "SELECT COUNT(*) FROM videos") -> None:
+        self.calls = 0
+        self.sql = sql
+
+    async def generate_sql(self, user_question: str) -> LlmResponse:
+        self.calls += 1
+        return LlmResponse(sql=self.sql)
+
+
+def test_normalize_ignores_case_punctuation_and_whitespace():
+    assert normalize_question("Сколько всего видео?", TODAY) == normalize_question(
+        "  сколько   ВСЕГО видео ", TODAY
+    )
+
+
+def test_normalize_folds_word_forms():
+    assert normalize_question("Сколько просмотров?", TODAY) == normalize_question(
+        "сколько просмотры", TODAY
+    )
+
+
+def test_normalize_resolves_relative_dates():
+    assert "2025-12-01" in normalize_question("Сколько просмотров вчера?", TODAY)
+    assert normalize_question("просмотры вчера", TODAY) != normalize_question(
+        "просмотры вчера", date(2025, 12, 3)
+    )
+
+
+def test_normalize_keeps_identifiers_and_numbers():
+    key = normalize_question("Видео креатора aca1061a-9d32 за 1 декабря", TODAY)
+    assert "aca1061a-9d32" in key
+    assert "1" in key.split()
+
+
+async def test_caching_generator_serves_repeats_from_cache():
+    inner = CountingGenerator()
+    generator = CachingSqlGenerator(inner, cache=LruCache(max_entries=10), today=lambda: TODAY)
+    await generator.generate_sql("Сколько всего видео?")
+    response = await generator.generate_sql("сколько всего видео")
+    assert response.sql == "SELECT COUNT(*) FROM videos"
+    assert inner.calls == 1
+    stats = generator.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+
+
+async def test_caching_generator_coalesces_concurrent_misses():
+    inner = CountingGenerator()
+    generator = CachingSqlGenerator(inner, cache=LruCache(max_entries=10), today=lambda: TODAY)
+    await asyncio.gather(*(generator.generate_sql("Сколько всего видео?") for _ in range(3)))
+    assert inner.calls == 1
+    assert generator.flight_stats().collapsed == 2
+
+
+async def test_clock_relative_sql_is_not_cached():
+    inner = CountingGenerator(
+        "SELECT SUM(delta_views_count) FROM video_snapshots "
+        "WHERE created_at >= CURRENT_DATE - INTERVAL '1 day' AND created_at < CURRENT_DATE"
+    )
+    generator = CachingSqlGenerator(inner, cache=LruCache(max_entries=10), today=lambda: TODAY)
+    await generator.generate_sql("Сколько просмотров вчера?")
+    await generator.generate_sql("Сколько просмотров вчера?")
+
+    assert inner.calls == 2
+    assert generator.stats().size == 0
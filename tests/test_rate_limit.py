@@ -0,0 +1,89 @@
+import pytest
+
+from app.rate_limit import MemoryBackend, RateLimiter, SqliteBackend
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _limiter(backend, clock: Clock, **kwargs) -> RateLimiter:
+    options = {"interval": 3.0, "burst": 3}
+    options.update(kwargs)
+    return RateLimiter(backend, clock=clock, **options)
+
+
+async def test_burst_then_steady_rate():
+    clock = Clock()
+    limiter = _limiter(MemoryBackend(), clock)
+
+    for _ in range(3):
+        assert (await limiter.check(1)).allowed
+    refused = await limiter.check(1)
+    assert not refused.allowed
+    assert refused.limit == "user"
+    assert refused.retry_after == pytest.approx(3.0)
+    assert (await limiter.check(2)).allowed  # Other users have their own bucket
+
+    clock.now += 3.0
+    assert (await limiter.check(1)).allowed
+    assert not (await limiter.check(1)).allowed
+
+
+async def test_global_limit_applies_to_all_users():
+    clock = Clock()
+    limiter = _limiter(MemoryBackend(), clock, global_interval=1.0, global_burst=2)
+
+    assert (await limiter.check(1)).allowed
+    assert (await limiter.check(2)).allowed
+    refused = await limiter.check(3)
+    assert refused.limit == "global"
+    assert refused.retry_after == pytest.approx(1.0)
+
+    stats = limiter.stats()
+    assert (stats.allowed, stats.limited_user, stats.limited_global) == (2, 0, 1)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_global_refusal_keeps_the_user_token(backend, tmp_path):
+    clock = Clock()
+    store = MemoryBackend() if backend == "memory" else SqliteBackend(str(tmp_path / "limits"))
+    limiter = _limiter(store, clock, burst=1, global_interval=1.0, global_burst=1)
+
+    assert (await limiter.check(1)).allowed
+    assert (await limiter.check(2)).limit == "global"
+    clock.now += 1.0  # Only the global bucket has refilled
+    assert (await limiter.check(2)).allowed
+
+
+async def test_full_buckets_are_evicted():
+    clock = Clock()
+    backend = MemoryBackend()
+    limiter = _limiter(backend, clock)
+    for user in range(100):
+        await limiter.check(user)
+    assert backend.size() == 100
+
+    clock.now += 3.0  # Every bucket is full again
+    await limiter.check(0)
+    assert backend.size() == 1
+
+
+async def test_sqlite_backend_is_shared_between_limiters(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "limits.sqlite3")
+    first, second = SqliteBackend(path), SqliteBackend(path)
+    try:
+        one = _limiter(first, clock, burst=2)
+        other = _limiter(second, clock, burst=2)
+        assert (await one.check(1)).allowed
+        assert (await other.check(1)).allowed
+        assert not (await one.check(1)).allowed
+        assert first.size() == 1
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,94 @@
+from datetime import date
+
+import pytest
+
+from app.rollup import rewrite_for_rollup, rollup_refresh_statements
+from app.sql_shapes import DeltaQuery, match_delta_query
+
+
+def test_match_day_equality():
+    sql = "SELECT SUM(delta_views_count) FROM video_snapshots WHERE DATE(created_at) = '2025-11-28'"
+    assert match_delta_query(sql) == DeltaQuery(
+        metric="delta_views_count", start=date(2025, 11, 28), end=date(2025, 11, 29)
+    )
+
+
+def test_match_between_and_cast():
+    sql = (
+        "SELECT SUM(delta_likes_count) FROM video_snapshots "
+        "WHERE created_at::date BETWEEN '2025-11-01' AND '2025-11-05'"
+    )
+    assert match_delta_query(sql) == DeltaQuery(
+        metric="delta_likes_count", start=date(2025, 11, 1), end=date(2025, 11, 6)
+    )
+
+
+def test_match_half_open_midnight_range():
+    sql = (
+        "SELECT COUNT(*) FROM video_snapshots "
+        "WHERE created_at >= '2025-11-01' AND created_at < '2025-12-01 00:00:00'"
+    )
+    assert match_delta_query(sql) == DeltaQuery(
+        metric="count", start=date(2025, 11, 1), end=date(2025, 12, 1)
+    )
+
+
+def test_match_creator_join():
+    sql = (
+        "SELECT SUM(vs.delta_views_count) FROM video_snapshots vs "
+        "JOIN videos v ON vs.video_id = v.id "
+        "WHERE v.creator_id = 'abc' AND DATE(vs.created_at) >= '2025-11-01'"
+    )
+    assert match_delta_query(sql) == DeltaQuery(
+        metric="delta_views_count", start=date(2025, 11, 1), creator_id="abc"
+    )
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT SUM(views_count) FROM videos",
+        "SELECT COUNT(DISTINCT video_id) FROM video_snapshots",
+        "SELECT SUM(delta_views_count) FROM video_snapshots WHERE delta_views_count > 0",
+        "SELECT SUM(delta_views_count) FROM video_snapshots WHERE created_at >= '2025-11-01 10:00'",
+        "SELECT SUM(delta_views_count) FROM video_snapshots WHERE created_at <= '2025-11-01'",
+        (
+            "SELECT SUM(delta_views_count) FROM video_snapshots "
+            "WHERE DATE(created_at) = '2025-11-01' OR DATE(created_at) = '2025-11-02'"
+        ),
+        (
+            "SELECT SUM(delta_views_count) FROM video_snapshots vs "
+            "LEFT JOIN videos v ON vs.video_id = v.id WHERE v.creator_id = 'abc'"
+        ),
+        "SELECT SUM(delta_views_count) FROM video_snapshots GROUP BY video_id",
+        # video_snapshots has no creator_id; Postgres rejects this query
+        "SELECT SUM(delta_views_count) FROM video_snapshots WHERE creator_id = 'abc'",
+    ],
+)
+def test_ineligible_shapes(sql):
+    assert match_delta_query(sql) is None
+    assert rewrite_for_rollup(sql) is None
+
+
+def test_rewrite_video_uses_video_rollup():
+    sql = (
+        "SELECT SUM(delta_views_count) FROM video_snapshots "
+        "WHERE video_id = 'v1' AND DATE(created_at) = '2025-11-28'"
+    )
+    assert rewrite_for_rollup(sql) == (
+        "SELECT SUM(delta_views_count) FROM video_daily_stats "
+        "WHERE day >= '2025-11-28' AND day < '2025-11-29' AND video_id = 'v1'"
+    )
+
+
+def test_rewrite_count_sums_snapshot_count():
+    sql = "SELECT COUNT(*) FROM video_snapshots"
+    assert rewrite_for_rollup(sql) == (
+        "SELECT COALESCE(SUM(snapshot_count), 0) FROM creator_daily_stats"
+    )
+
+
+def test_refresh_statements_since():
+    statements = rollup_refresh_statements(since=date(2025, 11, 28))
+    assert statements[0] == "DELETE FROM video_daily_stats WHERE day >= DATE '2025-11-28'"
+    assert all("2025-11-28" in statement for statement in statements)
@@ -0,0 +1,74 @@
+import os
+from datetime import UTC, date, datetime
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.runners import ParamCoercionError, coerce_param
+
+MOSCOW = ZoneInfo("Europe/Moscow")
+
+
+@pytest.mark.parametrize(
+    ("value", "type_name", "expected"),
+    [
+        ("abc", "text", "abc"),
+        (1000, "int8", 1000),
+        ("500", "int4", 500),
+        (Decimal("2.0"), "int8", 2),
+        (Decimal("1.5"), "numeric", Decimal("1.5")),
+        (3, "float8", 3.0),
+        ("2025-11-28", "date", date(2025, 11, 28)),
+        ("2025-11-28 10:00", "timestamp", datetime(2025, 11, 28, 10)),
+        ("2025-11-28", "timestamptz", datetime(2025, 11, 28, tzinfo=MOSCOW)),
+        (
+            "2025-11-28T10:00+00:00",
+            "timestamptz",
+            datetime(2025, 11, 28, 10, tzinfo=UTC),
+        ),
+    ],
+)
+def test_coerces_literals_to_placeholder_types(value, type_name, expected):
+    assert coerce_param(value, type_name, MOSCOW) == expected
+
+
+@pytest.mark.parametrize(
+    ("value", "type_name"),
+    [
+        (Decimal("1.5"), "int8"),  # Would truncate the comparison
+        (5, "text"),  # Postgres rejects text = integer
+        ("Nov 28 2025", "date"),  # Valid for Postgres, not for fromisoformat
+        ("7 days", "interval"),
+        ("true", "bool"),
+    ],
+)
+def test_refuses_lossy_or_unknown_coercions(value, type_name):
+    with pytest.raises(ParamCoercionError):
+        coerce_param(value, type_name, MOSCOW)
+
+
+@pytest.mark.skipif("DATABASE_URL" not in os.environ, reason="DATABASE_URL not set")
+async def test_asyncpg_runner_reuses_prepared_shapes():
+    import asyncpg
+
+    from app.runners import AsyncpgRunner, PreparedStatementCache
+
+    connection = await asyncpg.connect(os.environ["DATABASE_URL"].replace("+asyncpg", ""))
+    try:
+        cache = PreparedStatementCache(max_statements=8)
+        runner = AsyncpgRunner(connection, cache)
+        values = [
+            await runner.scalar(f"SELECT COUNT(*) FROM videos WHERE views_count > {bound}")
+            for bound in (0, 1000, 1000.5)
+        ]
+        for bound, value in zip((0, 1000, 1000.5), values, strict=True):
+            assert value == await connection.fetchval(
+                f"SELECT COUNT(*) FROM videos WHERE views_count > {bound}"
+            )
+
+        stats = cache.stats()
+        assert (stats.misses, stats.hits, stats.statements) == (1, 2, 1)
+        assert stats.literal_fallbacks == 1  # 1000.5 against a bigint placeholder
+    finally:
+        await connection.close()
@@ -0,0 +1,169 @@
+"""The sargable rewrite must not change which rows a query selects.
+
+Every corpus predicate is evaluated before and after the rewrite on
+timestamps around day, month and year boundaries with a small evaluator
+that follows PostgreSQL semantics for the constructs involved. When
+DATABASE_URL is set, the corpus is also checked against the database.
+"""
+
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+import sqlglot
+from sqlglot import exp
+
+from app.sql_guard import rewrite_sargable, validate_sql
+
+CORPUS = [
+    "DATE(created_at) = '2025-11-28'",
+    "DATE(created_at) >= '2025-11-28'",
+    "DATE(created_at) > '2025-11-28'",
+    "DATE(created_at) <= '2025-11-28'",
+    "DATE(created_at) < '2025-11-28'",
+    "'2025-11-28' > DATE(created_at)",
+    "created_at::date = '2025-12-31'",
+    "CAST(created_at AS DATE) >= DATE '2025-12-01'",
+    "DATE(created_at) BETWEEN '2025-11-30' AND '2025-12-01'",
+    "NOT DATE(created_at) = '2025-11-28'",
+    "DATE(created_at) = '2025-11-28' OR DATE(created_at) = '2025-12-01'",
+    "EXTRACT(YEAR FROM created_at) = 2025",
+    "EXTRACT(YEAR FROM created_at) > 2025",
+    "EXTRACT(YEAR FROM created_at) <= 2025",
+    "EXTRACT(YEAR FROM created_at) = 2025 AND EXTRACT(MONTH FROM created_at) = 12",
+    "EXTRACT(MONTH FROM created_at) = 11 AND EXTRACT(YEAR FROM created_at) = 2025",
+    "DATE_PART('year', created_at) = 2026",
+]
+
+_DAYS = [date(2024, 12, 31) + timedelta(days=offset) for offset in range(0, 400, 1)]
+TIMESTAMPS = [
+    datetime.combine(day, datetime.min.time()) + delta
+    for day in _DAYS
+    for delta in (timedelta(0), timedelta(microseconds=-1), timedelta(hours=12))
+]
+
+
+def _value(node: exp.Expression, row: datetime) -> object:
+    if isinstance(node, exp.Paren):
+        return _value(node.this, row)
+    if isinstance(node, exp.Column):
+        return row
+    if isinstance(node, exp.Literal):
+        return node.name if node.is_string else int(node.name)
+    if isinstance(node, exp.Date):
+        return _value(node.this, row).date()
+    if isinstance(node, exp.Cast) and node.to.is_type(exp.DataType.Type.DATE):
+        value = _value(node.this, row)
+        return date.fromisoformat(value) if isinstance(value, str) else value.date()
+    if isinstance(node, exp.Extract):
+        return getattr(_value(node.expression, row), node.name.lower())
+    raise AssertionError(f"evaluator does not support {node.sql()}")
+
+
+def _coerce(left: object, right: object) -> tuple[object, object]:
+    """Cast an untyped string literal to the type of the other operand."""
+    if isinstance(left, str):
+        right, left = _coerce(right, left)
+        return left, right
+    if isinstance(right, str):
+        if isinstance(left, datetime):
+            return left, datetime.fromisoformat(right)
+        if isinstance(left, date):
+            return left, date.fromisoformat(right)
+    return left, right
+
+
+_OPERATORS = {
+    exp.EQ: lambda a, b: a == b,
+    exp.GT: lambda a, b: a > b,
+    exp.GTE: lambda a, b: a >= b,
+    exp.LT: lambda a, b: a < b,
+    exp.LTE: lambda a, b: a <= b,
+}
+
+
+def _holds(node: exp.Expression, row: datetime) -> bool:
+    if isinstance(node, exp.Paren):
+        return _holds(node.this, row)
+    if isinstance(node, exp.And):
+        return _holds(node.this, row) and _holds(node.expression, row)
+    if isinstance(node, exp.Or):
+        return _holds(node.this, row) or _holds(node.expression, row)
+    if isinstance(node, exp.Not):
+        return not _holds(node.this, row)
+    if isinstance(node, exp.Between):
+        value = _value(node.this, row)
+        low = _coerce(value, _value(node.args["low"], row))[1]
+        high = _coerce(value, _value(node.args["high"], row))[1]
+        return low <= value <= high
+    left, right = _coerce(_value(node.this, row), _value(node.expression, row))
+    return _OPERATORS[type(node)](left, right)
+
+
+def _where(sql: str) -> exp.Expression:
+    return sqlglot.parse_one(sql, read="postgres").args["where"].this
+
+
+def _query(predicate: str) -> str:
+    return f"SELECT COUNT(*) FROM video_snapshots WHERE {predicate}"
+
+
+@pytest.mark.parametrize("predicate", CORPUS)
+def test_rewrite_selects_the_same_rows(predicate):
+    original = _query(predicate)
+    rewritten = rewrite_sargable(original)
+
+    assert rewritten != original
+    before, after = _where(original), _where(rewritten)
+    for row in TIMESTAMPS:
+        assert _holds(before, row) == _holds(after, row), (row, rewritten)
+
+
+@pytest.mark.parametrize("predicate", CORPUS)
+def test_rewrite_leaves_the_column_bare(predicate):
+    where = _where(rewrite_sargable(_query(predicate)))
+    for column in where.find_all(exp.Column):
+        assert isinstance(column.parent, (exp.GTE, exp.LT, exp.Extract)), column.parent.sql()
+    # Only a lone EXTRACT(MONTH ...) may remain, and the corpus has none
+    assert not list(where.find_all(exp.Extract))
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT COUNT(*) FROM videos",
+        "SELECT COUNT(*) FROM video_snapshots WHERE created_at >= '2025-11-28'",
+        "SELECT COUNT(*) FROM video_snapshots WHERE EXTRACT(MONTH FROM created_at) = 11",
+        "SELECT COUNT(*) FROM video_snapshots WHERE DATE(created_at) = CURRENT_DATE",
+        "SELECT COUNT(*) FROM videos WHERE DATE(creator_id) = '2025-11-28'",
+    ],
+)
+def test_rewrite_keeps_other_queries_verbatim(sql):
+    assert rewrite_sargable(sql) == sql
+
+
+def test_validate_sql_rewrites_generated_dates():
+    sql = (
+        "SELECT SUM(delta_views_count) FROM video_snapshots WHERE DATE(created_at) = '2025-11-28';"
+    )
+    assert validate_sql(sql) == (
+        "SELECT SUM(delta_views_count) FROM video_snapshots "
+        "WHERE created_at >= '2025-11-28' AND created_at < '2025-11-29'"
+    )
+
+
+@pytest.mark.skipif("DATABASE_URL" not in os.environ, reason="DATABASE_URL not set")
+async def test_rewrite_matches_on_database():
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    try:
+        async with engine.connect() as connection:
+            for predicate in CORPUS:
+                original = _query(predicate)
+                expected = await connection.scalar(text(original))
+                actual = await connection.scalar(text(rewrite_sargable(original)))
+                assert expected == actual, predicate
+    finally:
+        await engine.dispose()
@@ -0,0 +1,137 @@
+import time
+from datetime import date
+
+from app.intents import extract_entities
+from app.llm import LlmResponse
+from app.semantic_cache import SemanticSqlCache, embed
+
+TODAY = date(2025, 12, 2)
+
+
+class CountingGenerator:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def generate_sql(self, user_question: str) -> LlmResponse:
+        self.calls.append(user_question)
+        return LlmResponse(sql=f"SELECT {len(self.calls)}")
+
+
+def _cache(inner: CountingGenerator, **kwargs) -> SemanticSqlCache:
+    options = {"threshold": 0.85, "max_entries": 100, "ttl_seconds": 3600.0}
+    options.update(kwargs)
+    return SemanticSqlCache(inner, today=lambda: TODAY, **options)
+
+
+def _similarity(a: str, b: str) -> float:
+    left, right = embed(a), embed(b)
+    return sum(weight * right.get(bucket, 0.0) for bucket, weight in left.items())
+
+
+def test_inflected_words_share_ngrams():
+    inflected = _similarity("опубликовали видео", "опубликовано видео")
+    assert inflected > 0.8
+    assert inflected > _similarity("опубликовали видео", "удалили комментарии")
+    assert embed("") == {}
+
+
+async def test_paraphrase_reuses_sql():
+    inner = CountingGenerator()
+    cache = _cache(inner)
+    first = await cache.generate_sql("Сколько просмотров набрали видео 1 декабря?")
+    second = await cache.generate_sql("Сколько просмотров набрали все видео первое декабря")
+
+    assert second.sql == first.sql
+    assert len(inner.calls) == 1
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+    assert stats.mean_similarity >= 0.85
+
+
+async def test_other_entities_never_share_sql():
+    inner = CountingGenerator()
+    cache = _cache(inner)
+    await cache.generate_sql("Сколько просмотров набрали видео 1 декабря?")
+    await cache.generate_sql("Сколько просмотров набрали видео 2 декабря?")
+    await cache.generate_sql("Сколько лайков набрали видео 1 декабря?")
+
+    assert len(inner.calls) == 3
+    assert cache.stats().entity_mismatches >= 1
+
+
+async def test_growth_and_negation_never_share_sql():
+    inner = CountingGenerator()
+    cache = _cache(inner)
+    pairs = [
+        (
+            "Сколько лайков получили опубликованные в ноябре видео",
+            "Сколько новых лайков получили опубликованные в ноябре видео",
+        ),
+        ("Сколько видео у креатора с id 42?", "Сколько видео не у креатора с id 42?"),
+    ]
+    for plain, marked in pairs:
+        plain_entities = extract_entities(plain, TODAY)
+        marked_entities = extract_entities(marked, TODAY)
+        assert plain_entities is not None and marked_entities is not None
+        # The wording alone would pass as a paraphrase
+        assert _similarity(plain_entities.words, marked_entities.words) >= 0.85
+        await cache.generate_sql(plain)
+        await cache.generate_sql(marked)
+
+    assert len(inner.calls) == 4
+    assert cache.stats().entity_mismatches == 2
+
+
+async def test_clock_relative_sql_is_not_reused():
+    inner = CountingGenerator()
+    cache = _cache(inner)
+    entities = extract_entities("Сколько просмотров набрали видео вчера", TODAY)
+    assert entities is not None
+    cache.put(
+        "вчера", entities, "SELECT COUNT(*) FROM videos WHERE video_created_at >= CURRENT_DATE"
+    )
+
+    assert cache.stats().entries == 0
+    assert cache.lookup(entities) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = _cache(CountingGenerator(), max_entries=2)
+    questions = [
+        "Сколько видео опубликовали в ноябре",
+        "Какое среднее число просмотров у видео",
+        "Сколько всего жалоб получили видео",
+    ]
+    entities = [extract_entities(question, TODAY) for question in questions]
+    cache.put(questions[0], entities[0], "SELECT 1")
+    cache.put(questions[1], entities[1], "SELECT 2")
+    assert cache.lookup(entities[0]) == "SELECT 1"  # Now the most recently used
+    cache.put(questions[2], entities[2], "SELECT 3")
+
+    assert cache.lookup(entities[1]) is None
+    assert cache.lookup(entities[0]) == "SELECT 1"
+    assert cache.stats().evictions == 1
+
+
+def test_expired_entries_are_dropped():
+    cache = _cache(CountingGenerator(), ttl_seconds=60.0)
+    entities = extract_entities("Сколько видео опубликовали в ноябре", TODAY)
+    cache.put("old", entities, "SELECT 1", created=time.time() - 120)
+
+    assert cache.lookup(entities) is None
+    assert cache.stats().entries == 0
+
+
+def test_saved_cache_loads_unexpired_entries(tmp_path):
+    path = tmp_path / "cache" / "semantic.json"
+    cache = _cache(CountingGenerator(), ttl_seconds=60.0)
+    fresh = extract_entities("Сколько видео опубликовали в ноябре", TODAY)
+    stale = extract_entities("Сколько всего жалоб получили видео", TODAY)
+    cache.put("fresh", fresh, "SELECT 1")
+    cache.put("stale", stale, "SELECT 2", created=time.time() - 120)
+    cache.save(path)
+
+    restored = _cache(CountingGenerator(), ttl_seconds=60.0)
+    assert restored.load(path) == 1
+    assert restored.lookup(fresh) == "SELECT 1"
+    assert restored.load(tmp_path / "missing.json") == 0
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_execution():
+    flights: SingleFlight[str, int] = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def work() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return 42
+
+    waiters = [asyncio.create_task(flights.do("q", work)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*waiters) == [42] * 5
+    assert calls == 1
+    stats = flights.stats()
+    assert stats.leaders == 1
+    assert stats.collapsed == 4
+    assert stats.in_flight == 0
+
+
+async def test_errors_reach_every_waiter():
+    flights: SingleFlight[str, int] = SingleFlight()
+
+    async def work() -> int:
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        flights.do("q", work), flights.do("q", work), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_cancelled_leader_does_not_cancel_followers():
+    flights: SingleFlight[str, int] = SingleFlight()
+    release = asyncio.Event()
+
+    async def work() -> int:
+        await release.wait()
+        return 7
+
+    leader = asyncio.create_task(flights.do("q", work))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do("q", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+    assert await follower == 7
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_sequential_calls_are_not_cached():
+    flights: SingleFlight[str, int] = SingleFlight()
+    calls = 0
+
+    async def work() -> int:
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await flights.do("q", work) == 1
+    assert await flights.do("q", work) == 2
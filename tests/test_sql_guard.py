@@ -1,6 +1,6 @@
 import pytest
 
-from app.sql_guard import SqlValidationError, validate_sql
+from app.sql_guard import SqlValidationError, canonicalize, validate_sql
 
 
 def test_valid_select_with_count():
@@ -85,3 +85,87 @@ def test_min_aggregate():
     sql = "SELECT MIN(created_at) FROM videos"
     result = validate_sql(sql)
     assert result == "SELECT MIN(created_at) FROM videos"
+
+
+def test_canonicalize_collapses_whitespace_and_case():
+    assert canonicalize("SELECT  COUNT(*)\nFROM Videos;") == canonicalize(
+        "select count(*) from videos"
+    )
+
+
+def test_canonicalize_preserves_quoted_literals():
+    canonical = canonicalize("SELECT COUNT(*) FROM videos WHERE creator_id = 'AbC  D'")
+    assert "'AbC  D'" in canonical.sql
+    assert canonical.params == ("AbC  D",)
+
+
+def test_canonicalize_ignores_alias_names():
+    first = canonicalize(
+        "SELECT SUM(s.delta_views_count) AS total FROM video_snapshots s "
+        "JOIN videos v ON v.id = s.video_id WHERE v.creator_id = 'a'"
+    )
+    second = canonicalize(
+        "select sum(vs.delta_views_count) from video_snapshots as vs "
+        "join videos as vid on vid.id = vs.video_id where vid.creator_id = 'a'"
+    )
+    assert first == second
+
+
+def test_canonicalize_extracts_literals_into_params():
+    monday = canonicalize(
+        "SELECT COUNT(*) FROM video_snapshots "
+        "WHERE created_at >= '2025-11-24' AND created_at < '2025-11-25' AND views_count > 10"
+    )
+    tuesday = canonicalize(
+        "SELECT COUNT(*) FROM video_snapshots "
+        "WHERE created_at >= '2025-11-25' AND created_at < '2025-11-26' AND views_count > 10"
+    )
+    assert monday.fingerprint == tuesday.fingerprint
+    assert monday.template == (
+        "SELECT COUNT(*) FROM video_snapshots AS t1 "
+        "WHERE created_at >= $1 AND created_at < $2 AND views_count > $3"
+    )
+    assert tuesday.params == ("2025-11-25", "2025-11-26", 10)
+    assert monday.sql != tuesday.sql
+
+
+def test_canonicalize_keeps_referenced_aliases_and_structural_literals():
+    query = canonicalize(
+        "SELECT COUNT(*) AS n FROM videos WHERE created_at > NOW() - INTERVAL '7 days' "
+        "HAVING COUNT(*) > 0 ORDER BY n LIMIT 1"
+    )
+    assert "AS n" in query.template
+    assert "INTERVAL '7 DAYS'" in query.template
+    assert "LIMIT 1" in query.template
+    assert query.params == (0,)
+
+
+def test_canonicalize_falls_back_for_unparsable_sql():
+    query = canonicalize("SELECT  COUNT(*) FROM videos WHERE (")
+    assert query.sql == "select count(*) from videos where ("
+    assert query.params == ()
+
+
+def test_canonicalize_unqualifies_single_table_columns():
+    assert canonicalize(
+        "SELECT COUNT(*) FROM video_snapshots s WHERE s.created_at >= '2025-11-25'"
+    ) == canonicalize("SELECT COUNT(*) FROM video_snapshots WHERE created_at >= '2025-11-25'")
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT COUNT(*) FROM videos WHERE video_created_at > NOW() - INTERVAL '7 days'",
+        "SELECT COUNT(*) FROM videos WHERE video_created_at >= CURRENT_DATE - 7",
+        "SELECT COUNT(*) FROM videos WHERE video_created_at >= CURRENT_TIMESTAMP",
+        "SELECT COUNT(*) FROM videos WHERE video_created_at >= 'today'::date",
+        "SELECT COUNT(*) FROM videos WHERE video_created_at >= clock_timestamp()",
+    ],
+)
+def test_canonicalize_marks_clock_dependent_queries_volatile(sql):
+    assert canonicalize(sql).volatile
+
+
+def test_canonicalize_fixed_dates_are_not_volatile():
+    query = canonicalize("SELECT COUNT(*) FROM videos WHERE video_created_at >= '2025-11-01'")
+    assert not query.volatile
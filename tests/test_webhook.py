@@ -0,0 +1,76 @@
+import asyncio
+import os
+
+import pytest
+from aiogram import Bot, Dispatcher, F
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+from pydantic import ValidationError
+
+from app.config import get_settings
+from app.webhook import build_app, webhook_path
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", os.environ.get("DATABASE_URL", "postgresql+asyncpg://x/y"))
+    monkeypatch.setenv("TELEGRAM_TOKEN", "123456:token")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "key")
+    monkeypatch.setenv("TELEGRAM_MODE", "webhook")
+    monkeypatch.setenv("WEBHOOK_URL", "https://bot.example.com/telegram/updates")
+    monkeypatch.setenv("WEBHOOK_SECRET", "secret")
+    get_settings.cache_clear()
+    yield get_settings()
+    get_settings.cache_clear()
+
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 7, "type": "private"},
+        "from": {"id": 7, "is_bot": False, "first_name": "User"},
+        "text": "Сколько видео?",
+    },
+}
+
+
+async def test_updates_need_the_secret_and_are_handled_in_background(settings):
+    received: list[str] = []
+    dispatcher = Dispatcher()
+
+    async def handler(message: Message) -> None:
+        received.append(message.text or "")
+
+    dispatcher.message.register(handler, F.text)
+    bot = Bot(token=settings.telegram_token)
+    client = TestClient(TestServer(build_app(dispatcher, bot, settings)))
+    await client.start_server()
+    try:
+        path = webhook_path(settings.webhook_url)
+        assert path == "/telegram/updates"
+
+        response = await client.post(path, json=UPDATE)
+        assert response.status == 401
+
+        headers = {"X-Telegram-Bot-Api-Secret-Token": "secret"}
+        response = await client.post(path, json=UPDATE, headers=headers)
+        assert response.status == 200
+        for _ in range(100):
+            if received:
+                break
+            await asyncio.sleep(0.01)
+        assert received == ["Сколько видео?"]
+
+        assert (await client.get("/healthz")).status == 200
+    finally:
+        await client.close()
+        await bot.session.close()
+
+
+def test_webhook_mode_requires_url_and_secret(settings, monkeypatch):
+    monkeypatch.delenv("WEBHOOK_SECRET")
+    get_settings.cache_clear()
+    with pytest.raises(ValidationError, match="WEBHOOK_SECRET"):
+        get_settings()
@@ -0,0 +1,102 @@
+import asyncio
+
+from app.workers import WorkerPool
+
+
+async def _drain(pool: WorkerPool) -> None:
+    while pool.stats().queued or pool.stats().running:
+        await asyncio.sleep(0.001)
+
+
+async def test_jobs_of_one_user_run_in_order():
+    pool = WorkerPool(workers=4, queue_size=100, stage_limits={})
+    order: list[int] = []
+
+    def job(number: int):
+        async def run() -> None:
+            await asyncio.sleep(0.005 if number == 0 else 0)
+            order.append(number)
+
+        return run
+
+    pool.start()
+    try:
+        for number in range(5):
+            assert pool.submit(1, job(number))
+        await _drain(pool)
+    finally:
+        await pool.close()
+    assert order == [0, 1, 2, 3, 4]
+
+
+async def test_full_queue_refuses_jobs():
+    pool = WorkerPool(workers=1, queue_size=2, stage_limits={})
+    release = asyncio.Event()
+
+    async def blocked() -> None:
+        await release.wait()
+
+    pool.start()
+    try:
+        assert pool.submit(1, blocked)
+        await asyncio.sleep(0)  # The worker picks up the first job
+        assert pool.submit(2, blocked)
+        assert pool.submit(3, blocked)
+        assert not pool.submit(4, blocked)
+        release.set()
+        await _drain(pool)
+    finally:
+        await pool.close()
+
+    stats = pool.stats()
+    assert (stats.submitted, stats.rejected, stats.completed) == (3, 1, 3)
+    assert stats.max_queued == 2
+
+
+async def test_stage_limits_concurrency():
+    pool = WorkerPool(workers=8, queue_size=100, stage_limits={"db": 2})
+    inside = 0
+    peak = 0
+
+    async def query() -> None:
+        nonlocal inside, peak
+        async with pool.stage("db"):
+            inside += 1
+            peak = max(peak, inside)
+            await asyncio.sleep(0.002)
+            inside -= 1
+
+    pool.start()
+    try:
+        for user in range(8):
+            pool.submit(user, query)
+        await _drain(pool)
+    finally:
+        await pool.close()
+
+    assert peak == 2
+    stage = pool.stats().stages["db"]
+    assert (stage.entered, stage.running, stage.waiting) == (8, 0, 0)
+    assert stage.max_wait_ms > 0
+
+
+async def test_failed_job_does_not_stop_the_worker():
+    pool = WorkerPool(workers=1, queue_size=10, stage_limits={})
+    done: list[bool] = []
+
+    async def fail() -> None:
+        raise RuntimeError("boom")
+
+    async def succeed() -> None:
+        done.append(True)
+
+    pool.start()
+    try:
+        pool.submit(1, fail)
+        pool.submit(1, succeed)
+        await _drain(pool)
+    finally:
+        await pool.close()
+
+    assert done == [True]
+    assert (pool.stats().failed, pool.stats().completed) == (1, 1)